@@ -0,0 +1,110 @@
+"""
+benchmarks
+
+Each module is runnable from ``back/`` with ``python -m benchmarks.<name>``.
+The environment is pointed at a throwaway SQLite database and a freshly
+generated RSA key pair, so no ``.env`` is needed.
+"""
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def setup_environment(**overrides: str) -> str:
+    """ prepare the settings environment, must run before importing src """
+    workdir = tempfile.mkdtemp(prefix="shop-bench-")
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key_path = os.path.join(workdir, "private.pem")
+    public_key_path = os.path.join(workdir, "public.pem")
+
+    with open(private_key_path, "wb") as f:
+        f.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+
+    with open(public_key_path, "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+
+    environment = {
+        "DATABASE": "bench",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "POOL_SIZE": "10",
+        "POOL_TIMEOUT": "30",
+        "POOL_RECYCLE": "3600",
+        "ECHO": "false",
+        "API_VERSION_PREFIX": "/api/v1",
+        "JWT_ALGORITHM": "RS256",
+        "ACCESS_TOKEN_EXPIRE_SECONDS": "3600",
+        "USER_REPOSITORY_PATH": workdir,
+        "PRIVATE_KEY": private_key_path,
+        "PUBLIC_KEY": public_key_path,
+        "SHOP_ITEM_DEFAULT_LIMIT": "10",
+        "SHOP_ITEM_DEFAULT_PAGE": "1",
+    }
+    environment.update(overrides)
+    os.environ.update(environment)
+
+    return workdir
+
+
+def create_schema() -> None:
+    """ create the tables, in a server the app lifespan does this at startup """
+    from src import asgi  # noqa: F401  registers every model
+    from src.core.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """ latency summary in milliseconds """
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+class Timer:
+    """ perf_counter context manager """
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+
+async def signed_in_headers(client, prefix: str, email: str, password: str = "benchmark") -> Dict[str, str]:
+    """ sign up and sign in a user through the api, returning auth headers """
+    await client.post(f"{prefix}/user/signup", json={
+        "username": email.split("@")[0],
+        "email": email,
+        "full_name": email,
+        "plain_password": password,
+        "repeat_plain_password": password,
+    })
+    response = await client.post(f"{prefix}/user/signin", data={"username": email, "password": password})
+    response.raise_for_status()
+
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,208 @@
+"""
+API load test over the main user and shop endpoints
+
+Seeds users and shop items with the factory-boy factories into a temp SQLite
+database, then drives signin, list, get, count, create and patch through an
+ASGI client at the given concurrency. Reports req/s, errors and latency
+percentiles per endpoint as JSON. The seed makes runs reproducible, compare
+reports before deploying to catch regressions.
+
+    python -m benchmarks.api --users 20 --items 2000 --requests 500 --concurrency 10 --output report.json
+
+signin is bounded by bcrypt, so it gets its own, smaller --signin-requests.
+
+Settings come from the environment as usual, e.g. SHOP_CACHE_BACKEND=none to
+measure the database path of the shop reads.
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Callable, Dict, List
+
+from . import setup_environment, create_schema, percentiles, Timer
+
+setup_environment()
+
+import factory.random  # noqa: E402
+import httpx  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from src.asgi import app  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.core.database import engine, SessionLocal  # noqa: E402
+from src.apps.auth.service import create_hashed_password  # noqa: E402
+from src.apps.shop.model.domain.shop_item_count import ShopItemCountDB  # noqa: E402
+from src.apps.shop.service.counter import RECOUNT_STATEMENT  # noqa: E402
+from src.apps.shop.service.search import FTS_REBUILD_STATEMENTS  # noqa: E402
+
+from .factories import UserFactory, ShopItemFactory  # noqa: E402
+
+create_schema()
+
+PREFIX = settings.api_version_prefix
+PASSWORD = "benchmark"
+ENDPOINTS = ("signin", "list", "get", "count", "create", "patch")
+
+
+class Account:
+    """ seeded user with its items and, once signed in, its auth headers """
+
+    def __init__(self, email: str, item_ids: List[str]) -> None:
+        self.email = email
+        self.item_ids = item_ids
+        self.headers: Dict[str, str] = {}
+
+
+def seed(users: int, items: int, seed_value: int) -> List[Account]:
+    factory.random.reseed_random(seed_value)
+    hashed_password = create_hashed_password(PASSWORD)
+
+    with SessionLocal() as session:
+        people = UserFactory.build_batch(users, hashed_password=hashed_password)
+        shop_items = [ShopItemFactory.build(owner_id=people[i % users].id) for i in range(items)]
+        session.add_all(people)
+        session.add_all(shop_items)
+        session.commit()
+
+        accounts = {person.id: Account(person.email, []) for person in people}
+        for shop_item in shop_items:
+            accounts[shop_item.owner_id].item_ids.append(shop_item.id)
+
+    # counters and search index, filled in bulk like the repair jobs do
+    with engine.begin() as connection:
+        connection.execute(delete(ShopItemCountDB))
+        connection.execute(RECOUNT_STATEMENT)
+        for statement in FTS_REBUILD_STATEMENTS:
+            connection.execute(statement)
+
+    return list(accounts.values())
+
+
+def requests_for(endpoint: str, accounts: List[Account], rng: random.Random) -> Callable:
+    """ factory of (method, url, kwargs, expected status) for one endpoint """
+
+    def build():
+        account = rng.choice(accounts)
+
+        if endpoint == "signin":
+            return "POST", "/user/signin", {"data": {"username": account.email, "password": PASSWORD}}, 200
+        if endpoint == "list":
+            return "GET", "/shop/", {"headers": account.headers, "params": {"limit": 20, "page": rng.randint(1, 5)}}, 200
+        if endpoint == "get":
+            return "GET", f"/shop/{rng.choice(account.item_ids)}", {"headers": account.headers}, 200
+        if endpoint == "count":
+            return "GET", "/shop/count", {"headers": account.headers}, 200
+        if endpoint == "create":
+            json_body = {"name": f"item {rng.random()}", "description": "load test", "price": rng.randint(0, 1000)}
+            return "POST", "/shop/", {"headers": account.headers, "json": json_body}, 201
+        if endpoint == "patch":
+            json_body = {"price": rng.randint(0, 1000)}
+            return "PATCH", f"/shop/{rng.choice(account.item_ids)}", {"headers": account.headers, "json": json_body}, 200
+
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+    return build
+
+
+async def drive(client: httpx.AsyncClient, build: Callable, requests: int, concurrency: int) -> dict:
+    samples, errors = [], 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs, expected = build()
+            with Timer() as timer:
+                response = await client.request(method, PREFIX + url, **kwargs)
+            if response.status_code == expected:
+                samples.append(timer.elapsed)
+            else:
+                errors += 1
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(len(samples) / timer.elapsed, 1),
+        "latency_ms": percentiles(samples),
+    }
+
+
+async def run(
+        users: int,
+        items: int,
+        requests: int,
+        signin_requests: int,
+        concurrency: int,
+        endpoints: List[str],
+        seed_value: int,
+) -> dict:
+    with Timer() as seed_timer:
+        accounts = seed(users, items, seed_value)
+
+    rng = random.Random(seed_value)
+    report = {
+        "config": {
+            "users": users,
+            "items": items,
+            "requests": requests,
+            "signin_requests": signin_requests,
+            "concurrency": concurrency,
+            "seed": seed_value,
+            "seed_seconds": round(seed_timer.elapsed, 2),
+        },
+        "endpoints": {},
+    }
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for account in accounts:
+            response = await client.post(f"{PREFIX}/user/signin", data={"username": account.email, "password": PASSWORD})
+            response.raise_for_status()
+            account.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for endpoint in endpoints:
+            report["endpoints"][endpoint] = await drive(
+                client,
+                requests_for(endpoint, accounts, rng),
+                signin_requests if endpoint == "signin" else requests,
+                concurrency,
+            )
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--signin-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"comma separated, from {', '.join(ENDPOINTS)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(
+        args.users, args.items, args.requests, args.signin_requests, args.concurrency, endpoints, args.seed
+    ))
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
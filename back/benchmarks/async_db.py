@@ -0,0 +1,108 @@
+"""
+GET /shop/ latency while a slow query runs in another request
+
+Compares a slow query issued through the blocking ``SessionLocal`` against the
+same query issued through ``AsyncSessionLocal``. With the sync session the event
+loop stalls for the whole query and the p99 of ``GET /shop/`` follows it.
+
+    python -m benchmarks.async_db --requests 200 --slow-seconds 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from . import setup_environment, create_schema, percentiles, signed_in_headers, Timer
+
+setup_environment()
+
+import httpx  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+
+from src.asgi import app  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.core.database import engine, async_engine, SessionLocal, AsyncSessionLocal  # noqa: E402
+
+create_schema()
+
+
+def _register_sleep(dbapi_connection, _):
+    dbapi_connection.create_function("sleep", 1, lambda seconds: time.sleep(seconds) or 0)
+
+
+event.listen(engine, "connect", _register_sleep)
+event.listen(async_engine.sync_engine, "connect", _register_sleep)
+engine.dispose()
+
+
+async def slow_sync(seconds: float) -> dict:
+    session = SessionLocal()
+    try:
+        session.execute(text("SELECT sleep(:seconds)"), {"seconds": seconds})
+    finally:
+        session.close()
+    return {}
+
+
+async def slow_async(seconds: float) -> dict:
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("SELECT sleep(:seconds)"), {"seconds": seconds})
+    return {}
+
+
+app.add_api_route("/bench/slow-sync", slow_sync)
+app.add_api_route("/bench/slow-async", slow_async)
+
+
+async def run(requests: int, slow_seconds: float, items: int) -> dict:
+    prefix = settings.api_version_prefix
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await signed_in_headers(client, prefix, "async-db@bench.local")
+        for i in range(items):
+            await client.post(f"{prefix}/shop/", headers=headers, json={
+                "name": f"item {i}", "description": "benchmark item", "price": i,
+            })
+
+        report = {}
+        for mode in ("none", "sync", "async"):
+            stop = asyncio.Event()
+
+            async def slow_loop():
+                while not stop.is_set():
+                    await client.get(f"/bench/slow-{mode}", params={"seconds": slow_seconds})
+                    await asyncio.sleep(slow_seconds)
+
+            background = asyncio.create_task(slow_loop()) if mode != "none" else None
+            await asyncio.sleep(0)
+
+            samples = []
+            for _ in range(requests):
+                with Timer() as timer:
+                    response = await client.get(f"{prefix}/shop/", headers=headers)
+                response.raise_for_status()
+                samples.append(timer.elapsed)
+                await asyncio.sleep(0.001)
+
+            stop.set()
+            if background is not None:
+                await background
+
+            report[f"slow_query_{mode}"] = percentiles(samples)
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--slow-seconds", type=float, default=0.2)
+    parser.add_argument("--items", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.requests, args.slow_seconds, args.items)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
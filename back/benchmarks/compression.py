@@ -0,0 +1,117 @@
+"""
+Bytes on the wire and CPU per request of 100 item shop pages
+
+Fetches GET /shop/?limit=100 with each Accept-Encoding (identity, gzip, br)
+and reports the response size as sent and the process CPU time per request.
+A second section serializes the same page of response models the ways the
+app can: Pydantic straight to bytes (FastAPI's default for routes with a
+response model), dumped models through FastJSONResponse (JSON_RESPONSE=orjson)
+and jsonable_encoder with the stdlib JSONResponse.
+
+    python -m benchmarks.compression --items 1000 --requests 300
+
+COMPRESSION_* and SHOP_CACHE_BACKEND are read from the environment as usual.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from typing import List
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from .api import PREFIX, PASSWORD, app, seed, settings
+
+from src.apps.shop.model.schema.shop_item import ShopItemResponse  # noqa: E402
+from src.core.json import FastJSONResponse  # noqa: E402
+
+ENCODINGS = ("identity", "gzip", "br")
+PAGE_SIZE = 100
+
+
+async def fetch_pages(client: httpx.AsyncClient, headers: dict, encoding: str, requests: int) -> dict:
+    sizes = []
+
+    started = time.process_time()
+    for i in range(requests):
+        params = {"limit": PAGE_SIZE, "page": i % 5 + 1}
+        async with client.stream("GET", f"{PREFIX}/shop/", params=params, headers={**headers, "Accept-Encoding": encoding}) as response:
+            response.raise_for_status()
+            sizes.append(sum([len(chunk) async for chunk in response.aiter_raw()]))
+            content_encoding = response.headers.get("content-encoding", "identity")
+    cpu = time.process_time() - started
+
+    return {
+        "content_encoding": content_encoding,
+        "bytes_per_page": round(sum(sizes) / len(sizes)),
+        "cpu_ms_per_request": round(cpu / requests * 1000, 3),
+    }
+
+
+def render(page: List[ShopItemResponse], requests: int) -> dict:
+    adapter = TypeAdapter(List[ShopItemResponse])
+    paths = {
+        "pydantic": lambda: adapter.dump_json(page),
+        "orjson": lambda: FastJSONResponse(adapter.dump_python(page, mode="json")).body,
+        "jsonable_encoder": lambda: JSONResponse(jsonable_encoder(page)).body,
+    }
+
+    report = {}
+    for name, path in paths.items():
+        started = time.process_time()
+        for _ in range(requests):
+            path()
+        report[name] = {"cpu_us_per_page": round((time.process_time() - started) / requests * 1e6, 1)}
+    return report
+
+
+async def run(items: int, requests: int, seed_value: int) -> dict:
+    accounts = seed(1, items, seed_value)
+    report = {
+        "config": {
+            "items": items,
+            "requests": requests,
+            "page_size": PAGE_SIZE,
+            "compression_encodings": settings.compression_encodings,
+            "compression_minimum_size": settings.compression_minimum_size,
+            "shop_cache_backend": settings.shop_cache_backend,
+        },
+        "pages": {},
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post(f"{PREFIX}/user/signin", data={"username": accounts[0].email, "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # warm the response cache and the code paths first
+        for encoding in ENCODINGS:
+            await fetch_pages(client, headers, encoding, min(requests, 20))
+
+        for encoding in ENCODINGS:
+            report["pages"][encoding] = await fetch_pages(client, headers, encoding, requests)
+
+        response = await client.get(f"{PREFIX}/shop/", params={"limit": PAGE_SIZE}, headers=headers)
+        page = [ShopItemResponse.model_validate(item) for item in response.json()]
+
+    report["render"] = render(page, requests)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.items, args.requests, args.seed)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
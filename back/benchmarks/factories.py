@@ -0,0 +1,50 @@
+"""
+factory-boy factories for seeding benchmark databases
+
+Use ``build_batch`` and add the objects to one session, seed
+``factory.random`` first for reproducible data.
+"""
+from datetime import datetime
+
+import factory
+from factory.alchemy import SQLAlchemyModelFactory
+
+from src.apps.auth.constants import UserPermission
+from src.apps.auth.scopes import permission_scope_mask
+from src.apps.auth.model.domain.user import UserDB
+from src.apps.shop.model.domain.shop_item import ShopItemDB
+
+
+class UserFactory(SQLAlchemyModelFactory):
+    """ normal user, pass hashed_password to sign in with a known password """
+
+    class Meta:
+        model = UserDB
+
+    id = factory.Faker("uuid4")
+    username = factory.Sequence(lambda n: f"user{n}")
+    email = factory.LazyAttribute(lambda user: f"{user.username}@bench.local")
+    full_name = factory.Faker("name")
+    hashed_password = ""
+    disabled = False
+    permission = UserPermission.NORMAL
+    scope_mask = permission_scope_mask(UserPermission.NORMAL)
+    created_at = factory.LazyFunction(lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    updated_at = factory.SelfAttribute("created_at")
+
+
+class ShopItemFactory(SQLAlchemyModelFactory):
+    """ enabled shop item, pass owner_id """
+
+    class Meta:
+        model = ShopItemDB
+
+    id = factory.Faker("uuid4")
+    name = factory.Faker("catch_phrase")
+    description = factory.Faker("paragraph", nb_sentences=3)
+    price = factory.Faker("pyint", min_value=0, max_value=100000)
+    owner_id = ""
+    disabled = False
+    version = 1
+    created_at = factory.Faker("date_time_between", start_date="-1y")
+    updated_at = factory.SelfAttribute("created_at")
@@ -0,0 +1,142 @@
+"""
+shop_item write and read cost, single column indexes against the composite owner indexes
+
+Runs the same workload twice on one database: first with the current schema,
+then after ``m0001`` is reverted so every column carries its own index again.
+
+    python -m benchmarks.indexes --owners 20 --items 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime
+
+from . import setup_environment, create_schema, percentiles, Timer
+
+setup_environment()
+
+from sqlalchemy import delete, insert, update, text  # noqa: E402
+
+from src.core.database import engine, AsyncSessionLocal  # noqa: E402
+from src.apps.shop.constants import ShopItemOrder  # noqa: E402
+from src.apps.shop.model.domain.shop_item import ShopItemDB  # noqa: E402
+from src.apps.shop.service import shop  # noqa: E402
+from src.migrations import m0001_index_rationalization  # noqa: E402
+
+create_schema()
+
+
+def shop_item_indexes() -> list:
+    with engine.connect() as connection:
+        return list(connection.scalars(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'shop_item' AND sql IS NOT NULL"
+        )))
+
+
+def row(rng: random.Random, owner_id: str, now: datetime) -> dict:
+    return dict(
+        id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        name=f"item {rng.randint(0, 10 ** 6)}",
+        description="description " * rng.randint(1, 8),
+        price=rng.randint(0, 10000),
+        owner_id=owner_id,
+        disabled=rng.random() < 0.05,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+async def workload(owners: list, items: int, repeat: int, batch: int) -> dict:
+    rng = random.Random(42)
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        connection.execute(delete(ShopItemDB))
+
+    ids = []
+    with Timer() as bulk_timer:
+        for start in range(0, items, batch):
+            rows = [row(rng, owners[(start + i) % len(owners)], now) for i in range(min(batch, items - start))]
+            with engine.begin() as connection:
+                connection.execute(insert(ShopItemDB), rows)
+            ids += [(r["id"], r["owner_id"]) for r in rows]
+
+    single_insert, single_update = [], []
+    for _ in range(repeat):
+        with Timer() as timer:
+            with engine.begin() as connection:
+                connection.execute(insert(ShopItemDB), [row(rng, rng.choice(owners), now)])
+        single_insert.append(timer.elapsed)
+
+        shop_item_id, _ = rng.choice(ids)
+        with Timer() as timer:
+            with engine.begin() as connection:
+                connection.execute(
+                    update(ShopItemDB).filter_by(id=shop_item_id)
+                    .values(price=rng.randint(0, 10000), name=f"item {rng.randint(0, 10 ** 6)}", updated_at=datetime.now())
+                )
+        single_update.append(timer.elapsed)
+
+    first_page, deep_page, by_price, one = [], [], [], []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            owner_id = rng.choice(owners)
+            with Timer() as timer:
+                await shop.get_all(db, owner_id, limit=20, page=1)
+            first_page.append(timer.elapsed)
+
+            with Timer() as timer:
+                await shop.get_all(db, owner_id, limit=20, page=50)
+            deep_page.append(timer.elapsed)
+
+            with Timer() as timer:
+                await shop.get_all(db, owner_id, limit=20, page=1, order=ShopItemOrder.PRICE)
+            by_price.append(timer.elapsed)
+
+            shop_item_id, owner_id = rng.choice(ids)
+            with Timer() as timer:
+                await shop.get_one(db, shop_item_id, owner_id)
+            one.append(timer.elapsed)
+
+    return {
+        "indexes": shop_item_indexes(),
+        "bulk_insert_rows_per_second": round(items / bulk_timer.elapsed),
+        "insert_one": percentiles(single_insert),
+        "update_one": percentiles(single_update),
+        "get_all_first_page": percentiles(first_page),
+        "get_all_page_50": percentiles(deep_page),
+        "get_all_by_price": percentiles(by_price),
+        "get_one": percentiles(one),
+    }
+
+
+async def run(owner_count: int, items: int, repeat: int, batch: int) -> dict:
+    owners = [str(uuid.UUID(int=i + 1, version=4)) for i in range(owner_count)]
+
+    composite = await workload(owners, items, repeat, batch)
+
+    with engine.begin() as connection:
+        m0001_index_rationalization.downgrade(connection)
+    single_column = await workload(owners, items, repeat, batch)
+
+    with engine.begin() as connection:
+        m0001_index_rationalization.upgrade(connection)
+
+    return {"items": items, "owners": owner_count, "single_column": single_column, "composite": composite}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.owners, args.items, args.repeat, args.batch)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
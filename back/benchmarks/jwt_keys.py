@@ -0,0 +1,119 @@
+"""
+JWT signing and verification throughput by algorithm and key form
+
+For RS256 (2048 bit), ES256 (P-256) and EdDSA (Ed25519) key pairs, counts
+tokens per second signed and verified with the PEM string parsed on every
+call (the previous behaviour) and with the key objects of ``KeyRing``,
+the way the token service uses them.
+
+    python -m benchmarks.jwt_keys --seconds 1
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from . import setup_environment
+
+setup_environment()
+
+import jwt  # noqa: E402
+
+from src.core.keys import KeyRing  # noqa: E402
+
+KEY_PAIRS = {
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "EdDSA": lambda: ed25519.Ed25519PrivateKey.generate(),
+}
+
+PAYLOAD = {
+    "user_id": "0b7c5f0e-8f5e-4d7a-9b1e-3c2d1a0f9e8d",
+    "token_type": "bearer",
+    "scopes": ["shop:read", "shop:write"],
+    "created_at": 1700000000,
+    "expire_at": 4100000000,
+}
+
+
+def throughput(operation: Callable, seconds: float) -> float:
+    """ operations per second over at least the given time """
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    while time.perf_counter() < deadline:
+        operation()
+        count += 1
+
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def write_pair(workdir: str, algorithm: str, private_key) -> KeyRing:
+    private_key_path = os.path.join(workdir, f"{algorithm}.pem")
+    public_key_path = os.path.join(workdir, f"{algorithm}.pub.pem")
+
+    with open(private_key_path, "wb") as f:
+        f.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+    with open(public_key_path, "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+
+    return KeyRing(private_key_path, public_key_path, algorithm)
+
+
+def run(seconds: float) -> dict:
+    workdir = tempfile.mkdtemp(prefix="shop-bench-keys-")
+    report = {"config": {"seconds": seconds}, "algorithms": {}}
+
+    for algorithm, generate in KEY_PAIRS.items():
+        keyring = write_pair(workdir, algorithm, generate())
+        private_pem = open(keyring.private_key_path).read()
+        public_pem = open(keyring.public_key_path).read()
+
+        token = jwt.encode(PAYLOAD, keyring.signing_key, algorithm=algorithm, headers={"kid": keyring.kid})
+
+        def verify_with_keyring():
+            kid = jwt.get_unverified_header(token).get("kid") if keyring.rotating else None
+            public_key, algorithms = keyring.verification_key(kid)
+            return jwt.decode(token, public_key, algorithms=algorithms)
+
+        report["algorithms"][algorithm] = {
+            "sign_per_second": {
+                "pem": throughput(lambda: jwt.encode(PAYLOAD, private_pem, algorithm=algorithm), seconds),
+                "key_object": throughput(
+                    lambda: jwt.encode(PAYLOAD, keyring.signing_key, algorithm=algorithm, headers={"kid": keyring.kid}),
+                    seconds,
+                ),
+            },
+            "verify_per_second": {
+                "pem": throughput(lambda: jwt.decode(token, public_pem, algorithms=[algorithm]), seconds),
+                "key_object": throughput(verify_with_keyring, seconds),
+            },
+            "token_bytes": len(token),
+        }
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="measuring time per case")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
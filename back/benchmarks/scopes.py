@@ -0,0 +1,82 @@
+"""
+Scope check microbenchmark
+
+Compares the per request authorization work before and after scope masks:
+
+    check       set(token scopes) >= set(route scopes)  vs  mask AND
+    user scopes "a,b,c".split(",")                      vs  cached mask_to_scopes
+    permission  if / elif chain building a new list     vs  precomputed mask table
+
+    python -m benchmarks.scopes --number 200000
+"""
+import argparse
+import json
+import timeit
+
+from . import setup_environment
+
+setup_environment()
+
+from src.apps.auth import user_permission_to_scopes  # noqa: E402
+from src.apps.auth.constants import SupportScopes, UserPermission, SPLITER  # noqa: E402
+from src.apps.auth.scopes import has_scopes, mask_to_scopes, permission_scope_mask, required_mask  # noqa: E402
+
+
+def previous_permission_to_scopes(user_permission):
+    """ the if / elif chain scope masks replaced, ADMIN path """
+    if user_permission == UserPermission.GUEST:
+        return [SupportScopes.SHOP_USER_READ, SupportScopes.SHOP_PRODUCT_READ]
+    elif user_permission == UserPermission.NORMAL:
+        return [SupportScopes.SHOP_USER_READ]
+    elif user_permission == UserPermission.ADMIN:
+        return [scope.value for scope in SupportScopes]
+    return []
+
+
+def previous_is_enough_permissions(scopes, required_scopes) -> bool:
+    return set(scopes).issuperset(set(required_scopes))
+
+
+def nanoseconds(statement, number: int) -> float:
+    return round(timeit.timeit(statement, number=number) / number * 1e9, 1)
+
+
+def run(number: int) -> dict:
+    token_scopes = user_permission_to_scopes(UserPermission.NORMAL)
+    token_mask = permission_scope_mask(UserPermission.NORMAL)
+    stored_scopes = SPLITER.join(token_scopes)
+    route_scopes = [SupportScopes.SHOP_PRODUCT_READ]
+
+    cases = {
+        "check": (
+            lambda: previous_is_enough_permissions(token_scopes, route_scopes),
+            lambda: has_scopes(token_mask, required_mask(tuple(route_scopes))),
+        ),
+        "user_scopes": (
+            lambda: stored_scopes.split(SPLITER),
+            lambda: list(mask_to_scopes(token_mask)),
+        ),
+        "admin_permission_scopes": (
+            lambda: previous_permission_to_scopes(UserPermission.ADMIN),
+            lambda: user_permission_to_scopes(UserPermission.ADMIN),
+        ),
+    }
+
+    report = {"config": {"number": number}, "ns_per_call": {}}
+    for name, (previous, current) in cases.items():
+        before, after = nanoseconds(previous, number), nanoseconds(current, number)
+        report["ns_per_call"][name] = {"previous": before, "mask": after, "speedup": round(before / after, 2)}
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000, help="calls per case")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.number), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+shop item search latency, FTS5 index against the LIKE fallback
+
+Seeds one owner with a synthetic catalog, builds the search index, times a
+set of queries through both backends and times the incremental index update
+that create_one, update_one and the bulk paths run for the rows they write.
+
+    python -m benchmarks.search --items 1000000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime
+
+from . import setup_environment, create_schema, percentiles, Timer
+
+setup_environment()
+
+from sqlalchemy import insert  # noqa: E402
+
+from src.core.database import engine, AsyncSessionLocal  # noqa: E402
+from src.apps.shop.model.domain.shop_item import ShopItemDB  # noqa: E402
+from src.apps.shop.service import search  # noqa: E402
+
+create_schema()
+
+OWNER_ID = "00000000-0000-4000-8000-000000000000"
+
+ADJECTIVES = ["red", "blue", "green", "black", "white", "light", "heavy", "vintage", "classic", "organic",
+              "wireless", "leather", "wooden", "compact", "premium", "outdoor", "kids", "mens", "womens", "smart"]
+NOUNS = ["shoes", "shirt", "jacket", "mug", "lamp", "chair", "table", "backpack", "watch", "headphones",
+         "keyboard", "bottle", "blanket", "wallet", "sunglasses", "scarf", "speaker", "camera", "notebook", "pen"]
+WORDS = ["durable", "handmade", "imported", "cotton", "steel", "ceramic", "waterproof", "recycled", "soft",
+         "portable", "gift", "limited", "edition", "warranty", "eco", "friendly", "bestseller", "new", "sale"]
+
+# rows refreshed per index_items call: one PATCH, one bulk chunk
+INDEX_BATCHES = (1, 100)
+
+QUERIES = [
+    {"query": "wireless"},
+    {"query": "red sho"},
+    {"query": "vintage leather wallet"},
+    {"query": "cer", "max_price": 5000},
+    {"query": "waterproof camera", "min_price": 1000, "disabled": False},
+    {"query": "zzzz"},
+]
+
+
+def item_id(position: int) -> str:
+    return f"{position:08x}-0000-4000-8000-000000000000"
+
+
+def seed(items: int, batch: int = 20000) -> None:
+    rng = random.Random(42)
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        for start in range(0, items, batch):
+            connection.execute(insert(ShopItemDB), [
+                dict(
+                    id=item_id(start + i),
+                    name=f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                    price=rng.randint(0, 10000),
+                    owner_id=OWNER_ID,
+                    disabled=rng.random() < 0.05,
+                    created_at=now,
+                    updated_at=now,
+                )
+                for i in range(min(batch, items - start))
+            ])
+
+
+async def run(items: int, repeat: int, limit: int) -> dict:
+    with Timer() as seed_timer:
+        seed(items)
+
+    async with AsyncSessionLocal() as db:
+        with Timer() as index_timer:
+            await search.rebuild_index(db)
+
+        report = {
+            "items": items,
+            "seed_seconds": round(seed_timer.elapsed, 2),
+            "index_seconds": round(index_timer.elapsed, 2),
+            "queries": [],
+        }
+
+        for query in QUERIES:
+            entry = {**query}
+            for backend in ("sqlite", "like"):
+                samples, hits = [], 0
+                for _ in range(repeat):
+                    with Timer() as timer:
+                        hits = len(await search.search(db, OWNER_ID, limit=limit, backend=backend, **query))
+                    samples.append(timer.elapsed)
+                entry["fts5" if backend == "sqlite" else backend] = {"hits": hits, **percentiles(samples)}
+            report["queries"].append(entry)
+
+        rng = random.Random(7)
+        report["index_writes"] = []
+        for batch in INDEX_BATCHES:
+            samples = []
+            for _ in range(repeat):
+                shop_item_ids = [item_id(rng.randrange(items)) for _ in range(min(batch, items))]
+                with Timer() as timer:
+                    await search.index_items(db, shop_item_ids)
+                    await db.commit()
+                samples.append(timer.elapsed)
+            report["index_writes"].append({"rows": batch, **percentiles(samples)})
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.items, args.repeat, args.limit)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
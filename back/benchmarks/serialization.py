@@ -0,0 +1,134 @@
+"""
+GET /shop/ page rendering, entity + double pydantic conversion against the column projection
+
+The model path is the previous implementation: get_all builds ShopItem from
+each entity, the router builds ShopItemResponse from each of those, and
+FastAPI validates and serializes them again through response_model. The fast
+path is get_page_json. Both are timed through the api with the response
+cache off, and as service calls alone. Throughput is per CPU second of this
+single-threaded process, so it reads as items/sec per core.
+
+    python -m benchmarks.serialization --items 10000 --limit 100 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from . import setup_environment, create_schema, signed_in_headers
+
+setup_environment(SHOP_CACHE_BACKEND="none")
+
+import httpx  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, Response  # noqa: E402
+from fastapi.param_functions import Depends  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from src.asgi import app  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.core.database import AsyncSessionLocal, get_async_database_session  # noqa: E402
+from src.apps.auth.service.user import get_current_active_user  # noqa: E402
+from src.apps.auth.model.domain.user import User  # noqa: E402
+from src.apps.shop.model.schema.shop_item import ShopItemResponse  # noqa: E402
+from src.apps.shop.service import shop  # noqa: E402
+
+create_schema()
+
+PREFIX = settings.api_version_prefix
+
+__response_list = TypeAdapter(List[ShopItemResponse])
+
+
+@app.get(f"{PREFIX}/benchmark/shop-models", response_model=List[ShopItemResponse])
+async def get_shop_items_models(
+        limit: int,
+        page: int,
+        db: AsyncSession = Depends(get_async_database_session),
+        current_user: User = Depends(get_current_active_user),
+) -> List[ShopItemResponse]:
+    shop_items = await shop.get_all(db=db, owner_id=current_user.id, limit=limit, page=page)
+    return [ShopItemResponse.from_orm(shop_item) for shop_item in shop_items]
+
+
+def cpu_rate(items: int, started: float) -> float:
+    return round(items / (time.process_time() - started))
+
+
+async def measure_api(client, headers, path: str, limit: int, pages: int, requests: int) -> dict:
+    started = time.process_time()
+    size = 0
+    for i in range(requests):
+        response = await client.get(path, headers=headers, params={"limit": limit, "page": i % pages + 1})
+        response.raise_for_status()
+        size += len(response.content)
+
+    return {"items_per_cpu_second": cpu_rate(requests * limit, started), "bytes_per_page": size // requests}
+
+
+async def measure_service(owner_id: str, limit: int, pages: int, requests: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        started = time.process_time()
+        for i in range(requests):
+            shop_items = await shop.get_all(db, owner_id, limit=limit, page=i % pages + 1)
+            response_items = [ShopItemResponse.from_orm(shop_item) for shop_item in shop_items]
+            # what serialize_response + JSONResponse do with a response_model
+            JSONResponse(jsonable_encoder(__response_list.validate_python(response_items))).body
+        models = cpu_rate(requests * limit, started)
+
+        started = time.process_time()
+        for i in range(requests):
+            body, _ = await shop.get_page_json(db, owner_id, limit=limit, page=i % pages + 1)
+            Response(body, media_type="application/json").body
+        fast = cpu_rate(requests * limit, started)
+
+    return {"models": models, "fast": fast, "speedup": round(fast / models, 2)}
+
+
+async def run(items: int, limit: int, requests: int) -> dict:
+    pages = max(1, items // limit)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await signed_in_headers(client, PREFIX, "serialization@bench.local")
+        for start in range(0, items, 1000):
+            response = await client.post(f"{PREFIX}/shop/bulk", headers=headers, json=[
+                {"name": f"item {i}", "description": f"description of item {i} " * 4, "price": i}
+                for i in range(start, min(items, start + 1000))
+            ])
+            response.raise_for_status()
+        owner_id = (await client.get(f"{PREFIX}/shop/", headers=headers, params={"limit": 1})).json()[0]["owner_id"]
+
+        # warm up both paths
+        await measure_api(client, headers, f"{PREFIX}/benchmark/shop-models", limit, pages, 10)
+        await measure_api(client, headers, f"{PREFIX}/shop/", limit, pages, 10)
+
+        models = await measure_api(client, headers, f"{PREFIX}/benchmark/shop-models", limit, pages, requests)
+        fast = await measure_api(client, headers, f"{PREFIX}/shop/", limit, pages, requests)
+
+    return {
+        "items": items,
+        "limit": limit,
+        "requests": requests,
+        "api": {
+            "models": models,
+            "fast": fast,
+            "speedup": round(fast["items_per_cpu_second"] / models["items_per_cpu_second"], 2),
+        },
+        "service": await measure_service(owner_id, limit, pages, requests),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.items, args.limit, args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
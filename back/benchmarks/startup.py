@@ -0,0 +1,83 @@
+"""
+Cold start time per worker
+
+Starts fresh interpreters one after another, the way a process manager starts
+workers, and times in each: importing ``src.asgi``, running the app lifespan
+startup (logging, key material, schema check) and serving the first request.
+Database connections opened during the import are counted too, importing the
+app must not touch the database.
+
+    python -m benchmarks.startup --workers 5
+    PRELOAD_KEYS=true python -m benchmarks.startup
+
+With PRELOAD_KEYS the key files are read during the import, as a pre-forking
+server would do once in its parent.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from . import setup_environment
+
+WORKER = """
+import asyncio, json, time
+
+import httpx
+
+started = time.perf_counter()
+from src.asgi import app
+from src.core.database import engine, async_engine
+imported = time.perf_counter()
+
+connections = sum(pool.checkedin() + pool.checkedout() for pool in (engine.pool, async_engine.sync_engine.pool))
+
+
+async def serve():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/v1/health")
+            response.raise_for_status()
+        return ready, time.perf_counter()
+
+ready, served = asyncio.run(serve())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+    "total_ms": (served - started) * 1000,
+    "import_connections": connections,
+}))
+"""
+
+
+def start_worker() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        check=True, capture_output=True, text=True, cwd=os.getcwd(), env=os.environ,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=5, help="cold starts to measure")
+    args = parser.parse_args()
+
+    setup_environment(LOG_LEVEL="WARNING")
+    runs = [start_worker() for _ in range(args.workers)]
+
+    report = {
+        "config": {"workers": args.workers, "preload_keys": os.environ.get("PRELOAD_KEYS", "false")},
+        "median": {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]},
+        "max": {key: round(max(run[key] for run in runs), 3) for key in runs[0]},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
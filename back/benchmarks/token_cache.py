@@ -0,0 +1,55 @@
+"""
+decode_token throughput with and without the verified token cache
+
+    python -m benchmarks.token_cache --iterations 2000 --clients 100
+"""
+import argparse
+import asyncio
+import json
+
+from . import setup_environment, Timer
+
+setup_environment()
+
+from src.core.cache import NullCache, LocalCache  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.apps.auth.service import token as token_service  # noqa: E402
+
+
+async def run(iterations: int, clients: int) -> dict:
+    tokens = [
+        (await token_service.create_access_token(user_id=f"user-{i}", scopes=["product:read:own"]))[0]
+        for i in range(clients)
+    ]
+
+    report = {"algorithm": settings.jwt_algorithm, "iterations": iterations, "clients": clients}
+    for name, cache in (
+            ("uncached", NullCache(settings.access_token_expire_seconds)),
+            ("cached", LocalCache(ttl=settings.access_token_expire_seconds, maxsize=settings.token_cache_maxsize)),
+    ):
+        token_service.verified_token_cache = cache
+
+        with Timer() as timer:
+            for i in range(iterations):
+                assert await token_service.decode_token(tokens[i % clients]) is not None
+
+        report[name] = {
+            "decodes_per_second": round(iterations / timer.elapsed, 1),
+            "cache": cache.stats(),
+        }
+
+    report["speedup"] = round(report["cached"]["decodes_per_second"] / report["uncached"]["decodes_per_second"], 1)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=100)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.iterations, args.clients)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
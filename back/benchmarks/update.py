@@ -0,0 +1,143 @@
+"""
+PATCH /shop/{id} throughput, read-modify-write against the single UPDATE ... RETURNING
+
+The read-modify-write path is the previous implementation: get_one for the
+disabled check, a second SELECT, ORM mutation, commit and refresh. Both run
+through the api on the same database, statements are counted per request.
+
+    python -m benchmarks.update --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+
+from . import setup_environment, create_schema, percentiles, Timer, signed_in_headers
+
+setup_environment()
+
+import httpx  # noqa: E402
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from src.asgi import app  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.core.database import async_engine  # noqa: E402
+from src.apps.shop.model.domain.shop_item import ShopItem, ShopItemDB  # noqa: E402
+from src.apps.shop.model.schema.shop_item import ShopItemUpdateRequest  # noqa: E402
+from src.apps.shop.service import shop, counter, search  # noqa: E402
+
+create_schema()
+
+PREFIX = settings.api_version_prefix
+
+
+async def read_modify_write(
+        db: AsyncSession,
+        shop_item_id: str,
+        update_request: ShopItemUpdateRequest,
+        owner_id: str
+) -> ShopItem:
+    shop_item_check = await get_one(db, shop_item_id, owner_id)
+    if shop_item_check.disabled:
+        raise ValueError(f"ShopItem with ID {shop_item_id} is disabled")
+
+    shop_item_db: Optional[ShopItemDB] = await db.scalar(
+        select(ShopItemDB).filter_by(id=shop_item_id, owner_id=owner_id)
+    )
+    was_disabled = bool(shop_item_db.disabled)
+
+    for key, value in update_request.model_dump(exclude_none=True).items():
+        setattr(shop_item_db, key, value)
+    shop_item_db.updated_at = datetime.now()
+
+    await counter.adjust(db, owner_id, disabled=int(bool(shop_item_db.disabled)) - int(was_disabled))
+    if update_request.name is not None or update_request.description is not None:
+        await db.flush()
+        await search.index_items(db, [shop_item_db.id])
+    await db.commit()
+    await db.refresh(shop_item_db)
+
+    return ShopItem.from_orm(shop_item_db)
+
+
+get_one = shop.get_one
+update_one = shop.update_one
+
+
+async def patch_all(client, headers, ids, requests: int, concurrency: int) -> dict:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    samples, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            with Timer() as timer:
+                response = await client.patch(f"{PREFIX}/shop/{ids[i % len(ids)]}", headers=headers, json={"price": i})
+            if response.status_code == 200:
+                samples.append(timer.elapsed)
+            else:
+                errors += 1
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    return {
+        "requests_per_second": round(len(samples) / timer.elapsed, 1),
+        # SQLite fails writers with "database is locked" when a read lock cannot be upgraded
+        "errors": errors,
+        # sign in / principal lookups are cached, so this is the update path alone
+        "statements_per_request": round(statements / requests, 2),
+        "latency": percentiles(samples),
+    }
+
+
+async def run(requests: int, concurrency: int, items: int) -> dict:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await signed_in_headers(client, PREFIX, "update@bench.local")
+        response = await client.post(f"{PREFIX}/shop/bulk", headers=headers, json=[
+            {"name": f"item {i}", "description": "benchmark", "price": i} for i in range(items)
+        ])
+        response.raise_for_status()
+        ids = response.json()["ids"]
+
+        report = {"requests": requests, "concurrency": concurrency}
+
+        shop.update_one = read_modify_write
+        report["read_modify_write"] = await patch_all(client, headers, ids, requests, concurrency)
+
+        shop.update_one = update_one
+        report["update_returning"] = await patch_all(client, headers, ids, requests, concurrency)
+
+    report["speedup"] = round(
+        report["update_returning"]["requests_per_second"] / report["read_modify_write"]["requests_per_second"], 2
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--items", type=int, default=100)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency, args.items)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
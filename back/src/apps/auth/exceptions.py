@@ -36,4 +36,10 @@ InactiveUserException = HTTPException(
 ForbiddenException = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN, detail="forbidden"
 )
+
+PasswordHashBusyException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many sign-in requests, try again later",
+    headers={"Retry-After": "1"},
+)
 TodoNotFoundException = HTTPException(status_code=status.HTTP_404_NOT_FOUND)
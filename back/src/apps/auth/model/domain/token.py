@@ -11,6 +11,7 @@ class TokenData(BaseModel):
     user_id: str
     token_type: TokenType = TokenType.BEARER
     scopes: list[str] = []
+    scope_mask: int = 0
     created_at: int
     expire_at: int
 
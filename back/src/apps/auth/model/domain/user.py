@@ -33,14 +33,12 @@ class UserDB(Base):
     id = Column(
         String,
         primary_key=True,
-        index=True,
         default="",
         server_default="",
         comment="User uuid",
     )
     username = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="User name",
@@ -55,7 +53,6 @@ class UserDB(Base):
     )
     full_name = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="User full name",
@@ -68,35 +65,31 @@ class UserDB(Base):
     )
     disabled = Column(
         Boolean,
-        index=True,
         default=False,
         server_default="",
         comment="User disabled Status(True: disabled, False: enabled)",
     )
     permission = Column(
         Integer,
-        index=True,
         default=UserPermission.NORMAL,
         server_default="",
         comment="User permission(GUEST: 0, NORMAL: 1, ADMIN: 2)",
     )
-    scopes = Column(
-        String,
-        index=True,
-        default="",
-        server_default="",
-        comment="User scopes",
+    scope_mask = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="User scopes bitmask, see apps.auth.scopes",
     )
     created_at = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="User created at"
     )  # format: %Y-%m-%d %H:%M:%S
     updated_at = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="User updated at"
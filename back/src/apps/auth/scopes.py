@@ -0,0 +1,78 @@
+"""
+Scope bitmasks
+
+Every ``SupportScopes`` member owns one bit, in definition order. A user's
+scopes are stored as one integer (``UserDB.scope_mask``) and carried in the
+token as ``scope_mask``, so a route's scope check is a single AND against a
+mask computed once per route. The scope lists of each ``UserPermission`` and
+of each stored mask are computed once as well.
+
+Stored masks depend on the bit order: add new scopes at the end of
+``SupportScopes`` and never reorder or remove members.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+from .constants import SupportScopes, UserPermission
+
+SCOPE_BITS: Dict[str, int] = {scope.value: 1 << bit for bit, scope in enumerate(SupportScopes)}
+
+ALL_SCOPES = sum(SCOPE_BITS.values())
+
+# required by a route but unknown here, no user holds it, so such a route denies everyone
+UNKNOWN_SCOPE = 1 << len(SCOPE_BITS)
+
+
+def scopes_to_mask(scopes: Iterable[str]) -> int:
+    """ mask of granted scopes, unknown scopes grant nothing """
+    mask = 0
+    for scope in scopes:
+        mask |= SCOPE_BITS.get(scope, 0)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def required_mask(scopes: Tuple[str, ...]) -> int:
+    """ mask a route's scopes require, computed once per distinct scope tuple """
+    mask = 0
+    for scope in scopes:
+        mask |= SCOPE_BITS.get(scope, UNKNOWN_SCOPE)
+    return mask
+
+
+@lru_cache(maxsize=1024)
+def mask_to_scopes(mask: int) -> Tuple[str, ...]:
+    """ scope names of a mask, in SupportScopes order """
+    return tuple(scope for scope, bit in SCOPE_BITS.items() if mask & bit)
+
+
+def has_scopes(granted: int, required: int) -> bool:
+    return granted & required == required
+
+
+PERMISSION_SCOPES: Dict[int, int] = {
+    int(UserPermission.GUEST): scopes_to_mask([
+        SupportScopes.SHOP_USER_READ,
+        SupportScopes.SHOP_PRODUCT_READ,
+    ]),
+    int(UserPermission.NORMAL): scopes_to_mask([
+        SupportScopes.SHOP_USER_READ,
+        SupportScopes.SHOP_USER_WRITE,
+        SupportScopes.SHOP_USER_DELETE,
+        SupportScopes.SHOP_USER_UPDATE,
+        SupportScopes.SHOP_PRODUCT_READ,
+        SupportScopes.SHOP_PRODUCT_WRITE,
+        SupportScopes.SHOP_PRODUCT_DELETE,
+        SupportScopes.SHOP_PRODUCT_UPDATE,
+        SupportScopes.SHOP_ORDER_READ,
+        SupportScopes.SHOP_ORDER_WRITE,
+        SupportScopes.SHOP_ORDER_DELETE,
+        SupportScopes.SHOP_ORDER_UPDATE,
+    ]),
+    int(UserPermission.ADMIN): ALL_SCOPES,
+}
+
+
+def permission_scope_mask(user_permission) -> int:
+    """ scope mask of a UserPermission (or its int value), 0 for unknown permissions """
+    return PERMISSION_SCOPES.get(int(user_permission), 0)
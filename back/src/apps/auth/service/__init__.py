@@ -1,10 +1,11 @@
 import jwt
-from typing import Iterable
+import logging
 
 from passlib.context import CryptContext
 
 from ..model.domain.user import User
 from ..constants import UserPermission
+from ..scopes import has_scopes
 from ....core.config import settings
 
 # with open(settings.PUBLIC_KEY_PATH, "r") as f:
@@ -13,6 +14,8 @@ from ....core.config import settings
 # with open(settings.PRIVATE_KEY_PATH, "r") as f:
 #    settings.PRIVATE_KEY = f.read()
 
+logger = logging.getLogger(__name__)
+
 __pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto"
@@ -20,13 +23,11 @@ __pwd_context = CryptContext(
 
 
 def is_enough_permissions(
-        scopes: Iterable[str],
-        required_scopes: Iterable[str]
+        scope_mask: int,
+        required_mask: int
 ) -> bool:
-    """ permission check """
-    scopes_set = set(scopes)
-    required_set = set(required_scopes)
-    return scopes_set.issuperset(required_set)
+    """ permission check, every required scope bit is granted """
+    return has_scopes(scope_mask, required_mask)
 
 
 def check_admin_user(
@@ -42,7 +43,7 @@ def verify_password(input_password: str, hashed_password: str) -> bool:
     try:
         verify: bool = __pwd_context.verify(input_password, hashed_password)
     except (ValueError, RuntimeError) as err:
-        print(err)
+        logger.warning("password verification failed: %s", err)
         verify = False
     finally:
         return verify
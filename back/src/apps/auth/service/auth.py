@@ -2,15 +2,15 @@ import time
 from typing import Iterable, List, Optional
 
 from fastapi.param_functions import Depends, Security
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from passlib.context import CryptContext
 
-from ....core.database import get_database_session
+from ....core.database import get_async_database_session
 from ..model.domain.user import User, UserDB
 from ..constants import UserPermission
 from ..exceptions import *
-from . import verify_password
+from .password import password_pool
 from .user import get_user
 from .token import create_access_token
 
@@ -19,7 +19,7 @@ from .. import user_permission_to_scopes
 
 
 async def authenticate_user(
-        db: Session,
+        db: AsyncSession,
         email: str,
         password: str,
 ) -> User:
@@ -31,7 +31,7 @@ async def authenticate_user(
     if user is None:
         raise ValueError("User not found")
 
-    if not verify_password(password, user.hashed_password):
+    if not await password_pool.verify(password, user.hashed_password):
         raise ValueError("Invalid password")
 
     user.scopes = user_permission_to_scopes(user.permission)
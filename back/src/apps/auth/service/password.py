@@ -0,0 +1,89 @@
+"""
+Password hashing pool
+
+bcrypt costs 100-300 ms of CPU per call, so hashing and verification run in a
+bounded thread or process pool instead of on the event loop. When more than
+``workers + max_pending`` jobs are outstanding new jobs are rejected, so a
+sign-in storm answers 503 instead of stalling every other request.
+
+Queued and running jobs and rejections are exported as the password_hash_*
+Prometheus metrics.
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from ....core.config import settings
+from ....core.metrics import password_hash_queued, password_hash_running, password_hash_rejected
+from ..exceptions import PasswordHashBusyException
+from . import verify_password, create_hashed_password
+
+T = TypeVar("T")
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+class PasswordHashPool:
+    """ bounded executor for bcrypt jobs """
+
+    def __init__(self, executor: str = "thread", workers: int = 4, max_pending: int = 64) -> None:
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown password hash executor {executor}")
+
+        self.executor_type = executor
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._executor: Optional[Executor] = None
+
+        self.pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """ jobs waiting for a free worker """
+        return max(0, self.pending - self.workers)
+
+    def _observe(self) -> None:
+        password_hash_queued.set(self.queue_depth)
+        password_hash_running.set(min(self.pending, self.workers))
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = EXECUTORS[self.executor_type](max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.workers + self.max_pending:
+            password_hash_rejected.inc()
+            raise PasswordHashBusyException
+
+        self.pending += 1
+        self._observe()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+            self._observe()
+
+    async def verify(self, input_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, input_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(create_hashed_password, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordHashPool(
+    executor=settings.password_hash_executor,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
@@ -0,0 +1,115 @@
+"""
+Authenticated principal cache
+
+get_current_user looks the user up on every secured request. The resulting
+``User`` is cached by user id so repeat requests skip the users query. With
+PRINCIPAL_CACHE_BY_TOKEN the entry is also bound to a digest of the access
+token, so a new token always reloads the user.
+
+Entries are dropped after any ORM commit that updates or deletes the
+``UserDB`` row. With the redis backend the delete completes before the commit
+returns, so disabling a user takes effect on the next request in every
+worker. A local cache only drops the entry in the process that committed,
+other workers keep it until PRINCIPAL_CACHE_TTL (60s by default) runs out,
+which is why the default ``auto`` backend caches nothing with several workers
+and no CACHE_REDIS_URL. Changes made outside the ORM, e.g. plain SQL, are not
+seen at all and are likewise only picked up once the TTL expires.
+
+Principals never carry the password hash, it is left out of the cached
+entry (which may live in a shared Redis) and empty on the cached ``User``.
+"""
+import json
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from ....core.cache import create_cache
+from ....core.config import settings
+from ....core.metrics import register_cache
+from ..model.domain.user import User, UserDB
+from .token import token_digest
+
+__INVALIDATE_KEY = "invalidate_principals"
+
+# User fields kept out of the cache
+PRINCIPAL_EXCLUDE = {"hashed_password"}
+
+
+def _encode(entry: Tuple[User, str]) -> bytes:
+    user, digest = entry
+    return json.dumps({"user": user.model_dump(mode="json", exclude=PRINCIPAL_EXCLUDE), "token": digest}).encode()
+
+
+def _decode(raw: bytes) -> Tuple[User, str]:
+    entry = json.loads(raw)
+    return User.model_validate({**entry["user"], "hashed_password": ""}), entry["token"]
+
+
+class PrincipalCache:
+    """ User cache keyed by user id """
+
+    def __init__(self) -> None:
+        self.backend = create_cache(
+            backend=settings.principal_cache_backend,
+            ttl=settings.principal_cache_ttl,
+            maxsize=settings.principal_cache_maxsize,
+            prefix="principal:",
+            redis_url=settings.cache_redis_url,
+            encode=_encode,
+            decode=_decode,
+            workers=settings.web_concurrency,
+        )
+        self.by_token = settings.principal_cache_by_token
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str, token: str) -> Optional[User]:
+        entry = await self.backend.get(user_id)
+
+        if entry is not None:
+            user, digest = entry
+            if not self.by_token or digest == token_digest(token):
+                self.hits += 1
+                return user
+
+        self.misses += 1
+        return None
+
+    async def set(self, user: User, token: str) -> None:
+        if user.hashed_password:
+            user = user.model_copy(update={"hashed_password": ""})
+        await self.backend.set(user.id, (user, token_digest(token) if self.by_token else ""))
+
+    async def invalidate(self, user_id: str) -> None:
+        await self.backend.delete(user_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
+register_cache("principal", principal_cache.stats)
+
+
+@event.listens_for(UserDB, "after_update")
+@event.listens_for(UserDB, "after_delete")
+def _collect_changed_user(mapper, connection, target: UserDB) -> None:
+    object_session(target).info.setdefault(__INVALIDATE_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(__INVALIDATE_KEY, ()):
+        principal_cache.backend.discard(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(__INVALIDATE_KEY, None)
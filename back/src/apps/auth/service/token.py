@@ -1,11 +1,31 @@
+import hashlib
 import jwt
+import logging
 import time
 from typing import Optional
 
+from ....core.cache import create_cache
 from ....core.config import settings
+from ....core.keys import keys
+from ....core.metrics import register_cache
 from ..model.domain.token import TokenData
 from ..exceptions import token_credential_exception
 from ..constants import TokenType
+from ..scopes import scopes_to_mask
+
+logger = logging.getLogger(__name__)
+
+# already verified tokens, keyed by token digest and expiring with the token
+verified_token_cache = create_cache(
+    backend=settings.token_cache_backend,
+    ttl=settings.access_token_expire_seconds,
+    maxsize=settings.token_cache_maxsize,
+)
+register_cache("token", verified_token_cache.stats)
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 async def create_access_token(
@@ -19,41 +39,58 @@ async def create_access_token(
         "user_id": user_id,
         "token_type": TokenType.BEARER,
         "scopes": scopes,
+        "scope_mask": scopes_to_mask(scopes),
         "created_at": init_time,
     }
     expire = init_time + expires_in
     to_encode.update({"expire_at": expire})
     encoded_jwt = jwt.encode(
         payload=to_encode,
-        key=settings.private_key,
+        key=keys.signing_key,
         algorithm=settings.jwt_algorithm,
+        headers={"kid": keys.kid},
     )
     return encoded_jwt, TokenType.BEARER
 
 
 async def decode_token(token: str) -> Optional[TokenData]:
     # Decode Token
-    token_data = None
+    token_key = token_digest(token)
+    token_data = await verified_token_cache.get(token_key)
+
+    if token_data is not None:
+        return token_data
 
     try:
+        # reading the header costs about as much as the signature check saves, skip it for a single key
+        kid = jwt.get_unverified_header(token).get("kid") if keys.rotating else None
+        verification = keys.verification_key(kid)
+        if verification is None:
+            raise jwt.InvalidKeyError(f"Unknown key id {kid}")
+
+        public_key, algorithms = verification
         payload = jwt.decode(
             jwt=token,
-            key=settings.public_key,
-            algorithms=[settings.jwt_algorithm],
+            key=public_key,
+            algorithms=algorithms,
         )
 
         token_data = TokenData(
             user_id=payload.get("user_id"),
             token_type=payload.get("token_type"),
             scopes=payload.get("scopes"),
+            # tokens issued before scope masks carry the names only
+            scope_mask=payload.get("scope_mask", scopes_to_mask(payload.get("scopes") or ())),
             created_at=payload.get("created_at"),
             expire_at=payload.get("expire_at"),
         )
 
+        await verified_token_cache.set(token_key, token_data, ttl=token_data.expire_at - time.time())
+
     except jwt.PyJWTError as err:
         raise err
     except Exception as err:
-        print(err)
+        logger.exception("token decoding failed: %s", err)
         raise Exception("Could not validate credentials")
     finally:
         return token_data
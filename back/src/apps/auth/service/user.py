@@ -6,15 +6,20 @@ from datetime import datetime
 from fastapi.param_functions import Depends, Security, Annotated
 from fastapi.security.oauth2 import SecurityScopes
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....core.database import get_database_session
+from ....core.database import get_async_database_session, get_async_read_session
+from ....core.log import bind_user
 from ..model.domain.user import User, UserDB
-from ..constants import UserPermission, SupportScopes, Oauth2Scheme, SPLITER
+from ..constants import UserPermission, SupportScopes, Oauth2Scheme
 from .. import user_permission_to_scopes
+from ..scopes import mask_to_scopes, permission_scope_mask, required_mask
 from ..exceptions import token_credential_exception, InactiveUserException, ForbiddenException
 from .token import decode_token
-from . import is_enough_permissions, check_admin_user, create_hashed_password
+from . import is_enough_permissions, check_admin_user
+from .password import password_pool
+from .principal import principal_cache
 from .... import get_new_id
 
 
@@ -23,10 +28,10 @@ async def create_user(
         email: str,
         full_name: str,
         plain_password: str,
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_database_session),
 ) -> User:
     # Create User
-    hashed_password = create_hashed_password(plain_password)
+    hashed_password = await password_pool.hash(plain_password)
 
     if not hashed_password:
         raise ValueError("Password is required")
@@ -44,7 +49,7 @@ async def create_user(
     )
 
     # check if user exists
-    user: Optional[UserDB] = db.query(UserDB).filter_by(email=email).first()
+    user: Optional[UserDB] = await db.scalar(select(UserDB).filter_by(email=email))
     if user:
         raise ValueError("User already exists")
 
@@ -56,13 +61,13 @@ async def create_user(
         hashed_password=new_user.hashed_password,
         disabled=new_user.disabled,
         permission=new_user.permission,
-        scopes=SPLITER.join(new_user.scopes),
+        scope_mask=permission_scope_mask(new_user.permission),
         created_at=new_user.created_at,
         updated_at=new_user.updated_at,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return new_user
 
@@ -70,7 +75,7 @@ async def create_user(
 async def get_current_user(
         security_scopes: SecurityScopes,
         token: Annotated[str, Depends(Oauth2Scheme)],
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_read_session),
 ) -> User:
     if security_scopes.scopes is None:
         raise ValueError("Security Scopes is required")
@@ -78,35 +83,40 @@ async def get_current_user(
     # Check Current User
     credentials_exception = token_credential_exception(security_scopes.scope_str)
 
-    token = await decode_token(token)
+    token_data = await decode_token(token)
 
-    if token is None:
+    if token_data is None:
         raise credentials_exception
 
-    if token.expire_at < time.time():
+    if token_data.expire_at < time.time():
         raise credentials_exception
 
-    user = db.query(UserDB).filter_by(id=token.user_id).first()
+    user = await principal_cache.get(token_data.user_id, token)
 
     if user is None:
-        raise credentials_exception
-
-    user = User(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        hashed_password=user.hashed_password,
-        disabled=user.disabled,
-        scopes=user.scopes.split(SPLITER),
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-    )
-
-    if not is_enough_permissions(token.scopes, security_scopes.scopes):
+        user_db = await db.scalar(select(UserDB).filter_by(id=token_data.user_id))
+
+        if user_db is None:
+            raise credentials_exception
+
+        user = User(
+            id=user_db.id,
+            username=user_db.username,
+            email=user_db.email,
+            full_name=user_db.full_name,
+            hashed_password="",  # not needed past the token check, and kept out of the principal cache
+            disabled=user_db.disabled,
+            scopes=list(mask_to_scopes(user_db.scope_mask)),
+            created_at=user_db.created_at,
+            updated_at=user_db.updated_at,
+        )
+        await principal_cache.set(user, token)
+
+    if not is_enough_permissions(token_data.scope_mask, required_mask(tuple(security_scopes.scopes))):
         credentials_exception.detail = "Insufficient permissions"
         raise credentials_exception
 
+    bind_user(user.id)
     return user
 
 
@@ -130,10 +140,13 @@ async def get_current_active_user(
 
 async def get_user(
         email: str,
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_database_session),
 ) -> Optional[User]:
     # Get User
-    user = db.query(UserDB).filter_by(email=email).first()
+    user = await db.scalar(select(UserDB).filter_by(email=email))
+
+    if user is None:
+        return None
 
     user = User(
         id=user.id,
@@ -142,7 +155,7 @@ async def get_user(
         full_name=user.full_name,
         hashed_password=user.hashed_password,
         disabled=user.disabled,
-        scopes=user.scopes.split(SPLITER),
+        scopes=list(mask_to_scopes(user.scope_mask)),
         created_at=user.created_at,
         updated_at=user.updated_at,
     )
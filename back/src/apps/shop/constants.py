@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ShopItemOrder(str, Enum):
+    CREATED_AT = "created_at"
+    PRICE = "price"
+
+
+class CatalogFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
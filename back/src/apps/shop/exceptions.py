@@ -0,0 +1,31 @@
+from fastapi.exceptions import HTTPException
+from starlette import status
+
+
+InvalidCursorException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+)
+
+InvalidEncodingException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Upload is not valid UTF-8"
+)
+
+TooManyRowsException = HTTPException(
+    status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail="Too many rows in one request"
+)
+
+PreconditionFailedException = HTTPException(
+    status_code=status.HTTP_412_PRECONDITION_FAILED, detail="ShopItem has been modified"
+)
+
+InvalidFieldsException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown field in fields"
+)
+
+ShopItemNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="ShopItem not found"
+)
+
+ShopItemDisabledException = HTTPException(
+    status_code=status.HTTP_409_CONFLICT, detail="ShopItem is disabled"
+)
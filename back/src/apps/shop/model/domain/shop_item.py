@@ -2,7 +2,7 @@ from typing import Optional
 
 import datetime
 from pydantic import BaseModel
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DateTime, Index, DDL, event
 
 from .....core.database import Base
 
@@ -16,6 +16,7 @@ class ShopItem(BaseModel):
     price: int
     owner_id: str
     disabled: bool = False
+    version: int = 1
     created_at: datetime.datetime
     updated_at: datetime.datetime
 
@@ -29,26 +30,22 @@ class ShopItemDB(Base):
     id = Column(
         String,
         primary_key=True,
-        index=True,
         comment="Item id",
     )
     name = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="Item name",
     )
     description = Column(
         String,
-        index=True,
         default="",
         server_default="",
         comment="Item description",
     )
     price = Column(
         Integer,
-        index=True,
         default=0,
         server_default="0",
         comment="Item price",
@@ -56,25 +53,60 @@ class ShopItemDB(Base):
     owner_id = Column(
         String,
         ForeignKey("users.id"),
-        index=True,
         default=0,
         server_default="0",
         comment="Owner id",
     )
     disabled = Column(
         Boolean,
-        index=True,
         default=False,
         server_default="false",
         comment="Disabled",
     )
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        comment="Row version, bumped on every update and used as the ETag",
+    )
     created_at = Column(
         DateTime,
-        index=True,
         comment="Created time",
     )
     updated_at = Column(
         DateTime,
-        index=True,
         comment="Updated time",
     )
+
+    __table_args__ = (
+        # owner listings in both page orders (get_all, keyset seeks, export), the owner_id prefix
+        # also serves the foreign key. get_one / update_one go through the primary key
+        Index("ix_shop_item_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_shop_item_owner_id_price_id", "owner_id", "price", "id"),
+    )
+
+
+# full text search, see shop search service
+SEARCH_FTS_TABLE = "shop_item_fts"
+SEARCH_KEY_TABLE = "shop_item_search_key"
+SEARCH_DOCUMENT_SQL = "to_tsvector('simple', coalesce(shop_item.name, '') || ' ' || coalesce(shop_item.description, ''))"
+
+# FTS5 rows are keyed on an INTEGER PRIMARY KEY handed out per shop_item.id, which VACUUM keeps,
+# unlike the implicit rowid of a table with a String primary key. FTS5 only looks rows up by rowid,
+# so index updates delete by that key instead of scanning the index for a column value
+SEARCH_KEY_DDL = DDL(
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_KEY_TABLE} "
+    "(key INTEGER PRIMARY KEY, shop_item_id VARCHAR NOT NULL UNIQUE)"
+).execute_if(dialect="sqlite")
+SEARCH_FTS_DDL = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} "
+    "USING fts5(name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+).execute_if(dialect="sqlite")
+SEARCH_INDEX_DDL = DDL(
+    f"CREATE INDEX IF NOT EXISTS ix_shop_item_search ON shop_item USING GIN ({SEARCH_DOCUMENT_SQL})"
+).execute_if(dialect="postgresql")
+
+event.listen(ShopItemDB.__table__, "after_create", SEARCH_KEY_DDL)
+event.listen(ShopItemDB.__table__, "after_create", SEARCH_FTS_DDL)
+event.listen(ShopItemDB.__table__, "after_create", SEARCH_INDEX_DDL)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+
+from .....core.database import Base
+
+
+class ShopItemCountDB(Base):
+    """ Per owner shop item counters, maintained by the shop service """
+
+    __tablename__ = "shop_item_count"
+
+    owner_id = Column(
+        String,
+        ForeignKey("users.id"),
+        primary_key=True,
+        comment="Owner id",
+    )
+    item_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Number of items",
+    )
+    disabled_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Number of disabled items",
+    )
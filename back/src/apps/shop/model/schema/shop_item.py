@@ -2,11 +2,14 @@
 """
 Shop Item Schema
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from pydantic import field_validator, ValidationInfo, BaseModel
 from fastapi.exceptions import HTTPException
 
+# ShopItemDB.price is an INTEGER column, 32 bit on PostgreSQL and MySQL
+PRICE_MAX = 2 ** 31 - 1
+
 
 class ShopItemCreateRequest(BaseModel):
     """ Create a new shop item """
@@ -28,6 +31,11 @@ class ShopItemCreateRequest(BaseModel):
                 status_code=400,
                 detail="price must be greater than or equal to 0",
             )
+        if v > PRICE_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"price must be less than or equal to {PRICE_MAX}",
+            )
         return v
 
     class Config:
@@ -57,15 +65,37 @@ class ShopItemResponse(BaseModel):
         }
 
 
+class ShopItemSlimResponse(BaseModel):
+    """ Shop Item listing with only the fields= columns, id is always present """
+    id: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[int] = None
+    owner_id: Optional[str] = None
+    disabled: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": "12345678-123",
+                "name": "Item Name",
+                "price": 100,
+            }
+        }
+
+
 class ShopItemCountResponse(BaseModel):
     """ Shop Item Count Response """
     count: int
+    pages: int
 
     class Config:
         from_attributes = True
         json_schema_extra = {
             "example": {
                 "count": 10,
+                "pages": 1,
             }
         }
 
@@ -94,8 +124,56 @@ class ShopItemUpdateRequest(BaseModel):
                 status_code=400,
                 detail="price must be greater than or equal to 0",
             )
+        if v > PRICE_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"price must be less than or equal to {PRICE_MAX}",
+            )
 
         return v
 
     class Config:
         from_attributes = True
+
+
+class ShopItemBulkUpdateRequest(ShopItemUpdateRequest):
+    """ Update a shop item in a bulk request """
+    id: str
+
+
+class ShopItemBulkError(BaseModel):
+    """ Bulk request row error """
+    index: int
+    detail: str
+
+
+class ShopItemBulkResponse(BaseModel):
+    """ Bulk create / update result, ids are aligned with the request rows """
+    ids: List[Optional[str]]
+    errors: List[ShopItemBulkError]
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "ids": ["12345678-123", None],
+                "errors": [{"index": 1, "detail": "price must be greater than or equal to 0"}],
+            }
+        }
+
+
+class ShopItemImportResponse(BaseModel):
+    """ Catalog import result, errors are capped and indexed by data row """
+    created: int
+    failed: int
+    errors: List[ShopItemBulkError]
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "created": 49999,
+                "failed": 1,
+                "errors": [{"index": 17, "detail": "price: Field required"}],
+            }
+        }
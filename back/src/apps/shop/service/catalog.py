@@ -0,0 +1,189 @@
+"""
+Catalog import / export
+
+Export streams rows from a server-side cursor straight into the response and
+import parses the upload as it arrives, writing every ``chunk_size`` rows with
+``create_many``. Neither side holds more than one chunk in memory.
+
+An upload that turns out not to be UTF-8 is rejected with 400, chunks written
+before the bad bytes arrived stay imported.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+from fastapi.exceptions import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ....core.database import AsyncSessionLocal
+from ..constants import CatalogFormat
+from ..exceptions import InvalidEncodingException
+from ..model.domain.shop_item import ShopItemDB
+from ..model.schema.shop_item import ShopItemCreateRequest, ShopItemBulkError, ShopItemImportResponse
+from .shop import create_many, row_error_detail
+
+EXPORT_COLUMNS = (
+    ShopItemDB.id,
+    ShopItemDB.name,
+    ShopItemDB.description,
+    ShopItemDB.price,
+    ShopItemDB.owner_id,
+    ShopItemDB.disabled,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    CatalogFormat.NDJSON: "application/x-ndjson",
+    CatalogFormat.CSV: "text/csv",
+}
+
+
+async def export_rows(
+        owner_id: str,
+        catalog_format: CatalogFormat,
+        chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    encoded catalog chunks for a StreamingResponse. The generator owns its
+    session because it runs after the endpoint has returned. The session is
+    read-only, so a replica serves the export when one is configured.
+    """
+    async with AsyncSessionLocal(info={"read_only": True}) as db:
+        result = await db.stream(
+            select(*EXPORT_COLUMNS).filter_by(owner_id=owner_id).order_by(ShopItemDB.created_at, ShopItemDB.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        if catalog_format == CatalogFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+
+            async for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            async for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in partition
+                ).encode()
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    try:
+        async for chunk in stream:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise InvalidEncodingException
+
+    if pending:
+        yield pending
+
+
+async def _iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    index = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as err:
+            yield index, err
+        index += 1
+
+
+async def _iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    header = None
+    record = ""
+    index = 0
+
+    async for line in lines:
+        record += line
+        # a quoted field may span lines, the record is complete once the quotes balance
+        if record.count('"') % 2:
+            continue
+
+        values = next(csv.reader([record]), [])
+        record = ""
+
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+
+        if len(values) != len(header):
+            yield index, ValueError(f"expected {len(header)} columns, got {len(values)}")
+        else:
+            yield index, dict(zip(header, values))
+        index += 1
+
+    if record.strip():
+        yield index, ValueError("unterminated quoted field")
+
+
+async def import_rows(
+        db: AsyncSession,
+        stream: AsyncIterator[bytes],
+        catalog_format: CatalogFormat,
+        owner_id: str,
+        chunk_size: int,
+        max_errors: int,
+) -> ShopItemImportResponse:
+    """ create items from an upload stream, chunk_size rows per transaction """
+    lines = _iter_lines(stream)
+    rows = _iter_csv_rows(lines) if catalog_format == CatalogFormat.CSV else _iter_ndjson_rows(lines)
+
+    response = ShopItemImportResponse(created=0, failed=0, errors=[])
+
+    def reject(index: int, detail: str) -> None:
+        response.failed += 1
+        if len(response.errors) < max_errors:
+            response.errors.append(ShopItemBulkError(index=index, detail=detail))
+
+    async def flush(indexes: List[int], shop_items: List[ShopItemCreateRequest]) -> None:
+        ids, write_errors = await create_many(db, shop_items, owner_id, chunk_size)
+        response.created += sum(1 for shop_item_id in ids if shop_item_id is not None)
+        for position, detail in write_errors.items():
+            reject(indexes[position], detail)
+
+    indexes: List[int] = []
+    shop_items: List[ShopItemCreateRequest] = []
+
+    async for index, row in rows:
+        if isinstance(row, Exception):
+            reject(index, str(row))
+            continue
+
+        try:
+            shop_items.append(ShopItemCreateRequest.model_validate(row))
+            indexes.append(index)
+        except (ValidationError, HTTPException) as err:
+            reject(index, row_error_detail(err))
+            continue
+
+        if len(shop_items) >= chunk_size:
+            await flush(indexes, shop_items)
+            indexes, shop_items = [], []
+
+    if shop_items:
+        await flush(indexes, shop_items)
+
+    return response
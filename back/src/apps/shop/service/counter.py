@@ -0,0 +1,125 @@
+"""
+Shop item counters
+
+``shop_item_count`` holds one row per owner so /shop/count is a primary key
+lookup instead of COUNT(*). Every write path that adds, removes or toggles
+``disabled`` on a ShopItemDB row calls ``adjust`` inside its own transaction.
+
+``recount_all`` rebuilds the table from shop_item in bulk and can be run as a
+repair job:
+
+    python -m src.apps.shop.service.counter
+"""
+import asyncio
+from typing import Tuple
+
+from sqlalchemy import select, update, delete, insert, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..model.domain.shop_item import ShopItemDB
+from ..model.domain.shop_item_count import ShopItemCountDB
+
+
+def _upsert(dialect_name: str, owner_id: str, total: int, disabled: int):
+    values = dict(owner_id=owner_id, item_count=total, disabled_count=disabled)
+
+    if dialect_name in ("sqlite", "postgresql"):
+        if dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        statement = dialect_insert(ShopItemCountDB).values(**values)
+        return statement.on_conflict_do_update(
+            index_elements=[ShopItemCountDB.owner_id],
+            set_={
+                "item_count": ShopItemCountDB.item_count + statement.excluded.item_count,
+                "disabled_count": ShopItemCountDB.disabled_count + statement.excluded.disabled_count,
+            },
+        )
+
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        statement = dialect_insert(ShopItemCountDB).values(**values)
+        return statement.on_duplicate_key_update(
+            item_count=ShopItemCountDB.item_count + statement.inserted.item_count,
+            disabled_count=ShopItemCountDB.disabled_count + statement.inserted.disabled_count,
+        )
+
+    return None
+
+
+async def adjust(
+        db: AsyncSession,
+        owner_id: str,
+        total: int = 0,
+        disabled: int = 0,
+) -> None:
+    """ add deltas to the owner counters, the caller commits """
+    if not total and not disabled:
+        return
+
+    statement = _upsert(db.get_bind().dialect.name, owner_id, total, disabled)
+    if statement is not None:
+        await db.execute(statement)
+        return
+
+    result = await db.execute(
+        update(ShopItemCountDB).filter_by(owner_id=owner_id).values(
+            item_count=ShopItemCountDB.item_count + total,
+            disabled_count=ShopItemCountDB.disabled_count + disabled,
+        )
+    )
+    if result.rowcount == 0:
+        await db.execute(
+            insert(ShopItemCountDB).values(owner_id=owner_id, item_count=total, disabled_count=disabled)
+        )
+
+
+async def get(
+        db: AsyncSession,
+        owner_id: str,
+) -> Tuple[int, int]:
+    """ (item count, disabled item count) """
+    row = (await db.execute(
+        select(ShopItemCountDB.item_count, ShopItemCountDB.disabled_count).filter_by(owner_id=owner_id)
+    )).first()
+
+    if row is None:
+        return 0, 0
+
+    return row.item_count, row.disabled_count
+
+
+RECOUNT_STATEMENT = insert(ShopItemCountDB).from_select(
+    ["owner_id", "item_count", "disabled_count"],
+    select(
+        ShopItemDB.owner_id,
+        func.count(),
+        func.coalesce(func.sum(case((ShopItemDB.disabled.is_(True), 1), else_=0)), 0),
+    ).group_by(ShopItemDB.owner_id),
+)
+
+
+async def recount_all(db: AsyncSession) -> int:
+    """ rebuild every counter from shop_item, returns the number of owners """
+    await db.execute(delete(ShopItemCountDB))
+    await db.execute(RECOUNT_STATEMENT)
+    await db.commit()
+
+    return await db.scalar(select(func.count()).select_from(ShopItemCountDB))
+
+
+async def _main() -> None:
+    from ....core.database import AsyncSessionLocal, async_engine
+
+    async with AsyncSessionLocal() as db:
+        owners = await recount_all(db)
+    await async_engine.dispose()
+
+    print(f"recounted shop items for {owners} owners")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,122 @@
+"""
+Shop item response cache
+
+GET /shop/ and GET /shop/{id} keep their serialized JSON body and headers,
+keyed by owner, path and query parameters (cursor included). Entries of one
+owner sit under a generation token. Every committed write of that owner
+deletes the token, so the next read starts a new generation and old entries
+are never served again. They age out by TTL / LRU.
+
+Reads that raced a write store under the generation they started with, which
+the write already retired, so a stale body can not be cached. Misses are read
+from the primary (see ``core.database.use_primary``): a lagging replica could
+still return the row as it was before the write and the new generation would
+keep that body and ETag until the TTL.
+
+The ``auto`` backend keeps entries per process only with a single worker. With
+more workers a write retires the generation of its own process only, so auto
+then uses redis (CACHE_REDIS_URL) or no cache at all.
+"""
+import json
+import uuid
+from typing import Dict, Optional, Tuple
+
+from ....core.cache import NullCache, create_cache
+from ....core.config import settings
+from ....core.metrics import register_cache
+
+# (body, headers)
+CachedResponse = Tuple[bytes, Dict[str, str]]
+
+
+def _encode(entry) -> bytes:
+    if isinstance(entry, str):
+        return entry.encode()
+
+    body, headers = entry
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _decode(raw: bytes):
+    if b"\n" not in raw:
+        return raw.decode()
+
+    headers, body = raw.split(b"\n", 1)
+    return body, json.loads(headers)
+
+
+def _sizeof(entry) -> int:
+    if isinstance(entry, str):
+        return len(entry)
+
+    body, headers = entry
+    return len(body) + sum(len(key) + len(value) for key, value in headers.items())
+
+
+class ShopResponseCache:
+    """ serialized shop item responses keyed by owner generation """
+
+    def __init__(self) -> None:
+        self.backend = create_cache(
+            backend=settings.shop_cache_backend,
+            ttl=settings.shop_cache_ttl,
+            maxsize=settings.shop_cache_maxsize,
+            prefix="shop:",
+            redis_url=settings.cache_redis_url,
+            encode=_encode,
+            decode=_decode,
+            max_bytes=settings.shop_cache_max_bytes,
+            sizeof=_sizeof,
+            workers=settings.web_concurrency,
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stores(self) -> bool:
+        """ whether responses are kept at all, misses only need the primary then """
+        return not isinstance(self.backend, NullCache)
+
+    async def _generation(self, owner_id: str) -> str:
+        generation = await self.backend.get(f"generation:{owner_id}")
+
+        if generation is None:
+            generation = uuid.uuid4().hex
+            await self.backend.set(f"generation:{owner_id}", generation)
+
+        return generation
+
+    async def key(self, owner_id: str, path: str, params: Dict[str, Optional[str]]) -> str:
+        """ cache key of one response, call before reading the database """
+        query = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+        return f"{owner_id}:{await self._generation(owner_id)}:{path}?{query}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = await self.backend.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    async def set(self, key: str, body: bytes, headers: Dict[str, str]) -> None:
+        await self.backend.set(key, (body, headers))
+
+    async def invalidate(self, owner_id: str) -> None:
+        """ retire every cached response of the owner, call after commit """
+        await self.backend.delete(f"generation:{owner_id}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ShopResponseCache()
+register_cache("shop_response", response_cache.stats)
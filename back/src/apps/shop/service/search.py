@@ -0,0 +1,178 @@
+"""
+Shop item full text search
+
+SQLite keeps an FTS5 table keyed on an integer from ``shop_item_search_key``. The write paths
+of the shop service call ``index_items`` in their own transaction so the index
+never drifts from the items. PostgreSQL searches a GIN expression index over
+``to_tsvector`` that the database maintains itself. Any other database falls
+back to LIKE matching.
+
+Every term is prefix matched and all terms must match. Results are ranked by
+bm25 / ts_rank with name matches weighted above description matches.
+
+``rebuild_index`` creates and refills the index for existing databases:
+
+    python -m src.apps.shop.service.search
+"""
+import asyncio
+import re
+from typing import List, Optional
+
+from sqlalchemy import select, text, bindparam, literal_column, func, case, and_, or_, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..model.domain.shop_item import ShopItem, ShopItemDB, SEARCH_FTS_TABLE, SEARCH_KEY_TABLE, \
+    SEARCH_DOCUMENT_SQL, SEARCH_KEY_DDL, SEARCH_FTS_DDL, SEARCH_INDEX_DDL
+
+MAX_TERMS = 8
+
+# bm25 column weights (name, description), lower scores rank first
+FTS_WEIGHTS = (10.0, 1.0)
+
+# FTS5 rows are found by rowid, never by scanning the index
+__delete_fts = text(
+    f"DELETE FROM {SEARCH_FTS_TABLE} WHERE rowid IN "
+    f"(SELECT key FROM {SEARCH_KEY_TABLE} WHERE shop_item_id IN :ids)"
+).bindparams(bindparam("ids", expanding=True))
+
+__insert_keys = text(
+    f"INSERT OR IGNORE INTO {SEARCH_KEY_TABLE} (shop_item_id) SELECT id FROM shop_item WHERE id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+__insert_fts = text(
+    f"INSERT INTO {SEARCH_FTS_TABLE} (rowid, name, description) "
+    f"SELECT {SEARCH_KEY_TABLE}.key, shop_item.name, shop_item.description "
+    f"FROM shop_item JOIN {SEARCH_KEY_TABLE} ON {SEARCH_KEY_TABLE}.shop_item_id = shop_item.id "
+    "WHERE shop_item.id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+FTS_REBUILD_STATEMENTS = (
+    text(f"DELETE FROM {SEARCH_FTS_TABLE}"),
+    text(f"INSERT OR IGNORE INTO {SEARCH_KEY_TABLE} (shop_item_id) SELECT id FROM shop_item"),
+    text(
+        f"INSERT INTO {SEARCH_FTS_TABLE} (rowid, name, description) "
+        f"SELECT {SEARCH_KEY_TABLE}.key, shop_item.name, shop_item.description "
+        f"FROM shop_item JOIN {SEARCH_KEY_TABLE} ON {SEARCH_KEY_TABLE}.shop_item_id = shop_item.id"
+    ),
+)
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+async def index_items(db: AsyncSession, shop_item_ids: List[str]) -> None:
+    """ refresh the search index for rows written in the current transaction """
+    if not shop_item_ids or _dialect(db) != "sqlite":
+        return
+
+    await db.execute(__delete_fts, {"ids": shop_item_ids})
+    await db.execute(__insert_keys, {"ids": shop_item_ids})
+    await db.execute(__insert_fts, {"ids": shop_item_ids})
+
+
+def _fts5_query(terms: List[str]):
+    fts_table = table(SEARCH_FTS_TABLE, column("rowid"))
+    key_table = table(SEARCH_KEY_TABLE, column("key"), column("shop_item_id"))
+    fts = literal_column(SEARCH_FTS_TABLE)
+    match = " AND ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    return (
+        select(ShopItemDB)
+        .join(key_table, key_table.c.shop_item_id == ShopItemDB.id)
+        .join(fts_table, fts_table.c.rowid == key_table.c.key)
+        .where(fts.op("MATCH")(match))
+        .order_by(func.bm25(fts, *FTS_WEIGHTS), ShopItemDB.id)
+    )
+
+
+def _tsvector_query(terms: List[str]):
+    document = literal_column(SEARCH_DOCUMENT_SQL)
+    query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+    name_query = func.to_tsvector(literal_column("'simple'"), func.coalesce(ShopItemDB.name, "")).op("@@")(query)
+
+    return (
+        select(ShopItemDB)
+        .where(document.op("@@")(query))
+        .order_by(case((name_query, 0), else_=1), func.ts_rank(document, query).desc(), ShopItemDB.id)
+    )
+
+
+def _like_query(terms: List[str]):
+    def matches(column, term):
+        return func.lower(column).contains(term, autoescape=True)
+
+    return (
+        select(ShopItemDB)
+        .where(and_(*(or_(matches(ShopItemDB.name, term), matches(ShopItemDB.description, term)) for term in terms)))
+        .order_by(case((and_(*(matches(ShopItemDB.name, term) for term in terms)), 0), else_=1), ShopItemDB.id)
+    )
+
+
+SEARCH_BACKENDS = {
+    "sqlite": _fts5_query,
+    "postgresql": _tsvector_query,
+    "like": _like_query,
+}
+
+
+async def search(
+        db: AsyncSession,
+        owner_id: str,
+        query: str,
+        limit: int,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        disabled: Optional[bool] = None,
+        backend: Optional[str] = None,
+) -> List[ShopItem]:
+    """ ranked search over name and description, backend defaults to the database dialect """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    statement = SEARCH_BACKENDS.get(backend or _dialect(db), _like_query)(terms)
+    statement = statement.where(ShopItemDB.owner_id == owner_id)
+
+    if min_price is not None:
+        statement = statement.where(ShopItemDB.price >= min_price)
+    if max_price is not None:
+        statement = statement.where(ShopItemDB.price <= max_price)
+    if disabled is not None:
+        statement = statement.where(ShopItemDB.disabled.is_(disabled))
+
+    result = await db.scalars(statement.limit(limit))
+    return [ShopItem.from_orm(shop_item) for shop_item in result.all()]
+
+
+async def rebuild_index(db: AsyncSession) -> None:
+    """ create the search index if needed and refill it from shop_item """
+    dialect = _dialect(db)
+
+    if dialect == "sqlite":
+        await db.execute(SEARCH_KEY_DDL)
+        await db.execute(SEARCH_FTS_DDL)
+        for statement in FTS_REBUILD_STATEMENTS:
+            await db.execute(statement)
+    elif dialect == "postgresql":
+        await db.execute(SEARCH_INDEX_DDL)
+
+    await db.commit()
+
+
+async def _main() -> None:
+    from ....core.database import AsyncSessionLocal, async_engine
+
+    async with AsyncSessionLocal() as db:
+        await rebuild_index(db)
+    await async_engine.dispose()
+
+    print("rebuilt the shop item search index")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
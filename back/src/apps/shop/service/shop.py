@@ -1,14 +1,125 @@
-from typing import List, Type
-from sqlalchemy.orm import Session
+import base64
+import binascii
+import json
+import math
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple, Any, Dict, Collection, Set
+from sqlalchemy import select, tuple_, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from fastapi.exceptions import HTTPException
 from datetime import datetime
 
 from .... import get_new_id
+from ....core.json import dumps
+from ..constants import ShopItemOrder
+from ..exceptions import InvalidCursorException, PreconditionFailedException, InvalidFieldsException, \
+    ShopItemNotFoundException, ShopItemDisabledException
 from ..model.domain.shop_item import ShopItem, ShopItemDB
-from ..model.schema.shop_item import ShopItemCreateRequest, ShopItemUpdateRequest
+from ..model.schema.shop_item import ShopItemCreateRequest, ShopItemUpdateRequest, ShopItemBulkUpdateRequest, \
+    ShopItemResponse
+from . import counter, search
+from .response_cache import response_cache
 
+# order -> (sort column, tie breaker), both covered by the owner indexes on ShopItemDB
+ORDER_COLUMNS = {
+    ShopItemOrder.CREATED_AT: (ShopItemDB.created_at, ShopItemDB.id),
+    ShopItemOrder.PRICE: (ShopItemDB.price, ShopItemDB.id),
+}
 
-def create_one(
-        db: Session,
+# ShopItemResponse fields, selected as plain columns by get_page_json
+RESPONSE_FIELDS = tuple(ShopItemResponse.model_fields)
+
+# columns covered by the search index
+SEARCH_FIELDS = {"name", "description"}
+
+# errors of one bad row: database errors and values the driver can not convert (e.g. OverflowError
+# for an int too large for the column), which are raised before the statement reaches the database
+WRITE_ERRORS = (SQLAlchemyError, ValueError, TypeError, OverflowError)
+
+
+def encode_cursor(order: ShopItemOrder, shop_item: Any) -> str:
+    """ opaque cursor pointing after shop_item, a ShopItem or a row with the order column and id """
+    value = getattr(shop_item, order.value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    raw = json.dumps([order.value, value, shop_item.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(order: ShopItemOrder, cursor: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, value, shop_item_id = json.loads(raw)
+
+        if cursor_order != order.value:
+            raise InvalidCursorException
+
+        if order == ShopItemOrder.CREATED_AT:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, int):
+            raise InvalidCursorException
+
+        return value, str(shop_item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorException
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """ comma separated fields= value to response fields in response order, id always included """
+    if not fields:
+        return RESPONSE_FIELDS
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if not requested <= set(RESPONSE_FIELDS):
+        raise InvalidFieldsException
+
+    return tuple(field for field in RESPONSE_FIELDS if field == "id" or field in requested)
+
+
+def etag(shop_item: ShopItem) -> str:
+    """ strong entity tag of the current row version """
+    return f'"{shop_item.version}"'
+
+
+def etag_versions(header: str, weak: bool = False) -> Optional[Set[int]]:
+    """
+    row versions listed in an If-Match / If-None-Match header, None for "*".
+    weak tags only count when weak is set (If-None-Match uses weak comparison)
+    """
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+
+    return versions
+
+
+def row_error_detail(err: Exception) -> str:
+    """ one line description of a rejected bulk row """
+    if isinstance(err, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors())
+    if isinstance(err, HTTPException):
+        return str(err.detail)
+    return str(err)
+
+
+def write_error_detail(err: Exception) -> str:
+    """ one line description of a row the database did not take """
+    return str(getattr(err, "orig", None) or err)
+
+
+async def create_one(
+        db: AsyncSession,
         shop_item: ShopItemCreateRequest,
         owner_id: str
 ) -> ShopItem:
@@ -23,65 +134,329 @@ def create_one(
     )
 
     db.add(new_shop_item)
-    db.commit()
-    db.refresh(new_shop_item)
+    await db.flush()
+    await counter.adjust(db, owner_id, total=1)
+    await search.index_items(db, [new_shop_item.id])
+    await db.commit()
+    await response_cache.invalidate(owner_id)
+    await db.refresh(new_shop_item)
     return ShopItem.from_orm(new_shop_item)
 
 
-def get_all(
-        db: Session,
+async def get_all(
+        db: AsyncSession,
         owner_id: str,
         limit: int,
-        page: int
+        page: int,
+        order: ShopItemOrder = ShopItemOrder.CREATED_AT,
 ) -> List[ShopItem]:
-    shop_items_db: List[Type[ShopItemDB]] = db.query(ShopItemDB).filter_by(owner_id=owner_id).limit(limit).offset(
-        (page - 1) * limit).all()
+    result = await db.scalars(
+        select(ShopItemDB).filter_by(owner_id=owner_id).order_by(*ORDER_COLUMNS[order])
+        .limit(limit).offset((page - 1) * limit)
+    )
 
-    shop_items: List[ShopItem] = [ShopItem.from_orm(shop_item) for shop_item in shop_items_db]
+    shop_items: List[ShopItem] = [ShopItem.from_orm(shop_item) for shop_item in result.all()]
     return shop_items
 
 
-def get_one(
-        db: Session,
+async def get_page_json(
+        db: AsyncSession,
+        owner_id: str,
+        limit: int,
+        page: int = 1,
+        cursor: Optional[str] = None,
+        order: ShopItemOrder = ShopItemOrder.CREATED_AT,
+        fields: Tuple[str, ...] = RESPONSE_FIELDS,
+) -> Tuple[bytes, Optional[str]]:
+    """
+    one page as a JSON array of the given response fields and the cursor of the
+    next page. only those columns (and the sort column the cursor needs) are
+    selected and the rows are encoded directly, without building ORM entities
+    or pydantic models. cursor overrides page
+    """
+    sort_column = ORDER_COLUMNS[order][0]
+    columns = [getattr(ShopItemDB, field) for field in fields]
+    if sort_column.key not in fields:
+        columns.append(sort_column)
+
+    query = select(*columns).filter_by(owner_id=owner_id).order_by(*ORDER_COLUMNS[order]).limit(limit)
+    if cursor:
+        value, shop_item_id = decode_cursor(order, cursor)
+        query = query.where(tuple_(*ORDER_COLUMNS[order]) > tuple_(value, shop_item_id))
+    elif cursor is None:
+        query = query.offset((page - 1) * limit)
+
+    rows = (await db.execute(query)).all()
+
+    next_cursor = encode_cursor(order, rows[-1]) if rows and len(rows) == limit else None
+    return dumps([dict(zip(fields, row)) for row in rows]), next_cursor
+
+
+async def get_one(
+        db: AsyncSession,
         shop_item_id: str,
         owner_id: str
 ) -> ShopItem:
-    shop_item_db: Type[ShopItemDB] = db.query(ShopItemDB).filter_by(id=shop_item_id, owner_id=owner_id).first()
+    shop_item_db: Optional[ShopItemDB] = await db.scalar(
+        select(ShopItemDB).filter_by(id=shop_item_id, owner_id=owner_id)
+    )
 
     if shop_item_db is None:
-        raise ValueError(f"ShopItem with ID {shop_item_id} not found")
+        raise ShopItemNotFoundException
 
     return ShopItem.from_orm(shop_item_db)
 
 
-def count(
-        db: Session,
+async def count(
+        db: AsyncSession,
         owner_id: str,
-) -> int:
-    return db.query(ShopItemDB).filter_by(owner_id=owner_id).count()
+        limit: int,
+) -> Tuple[int, int]:
+    """ (item count, pages of limit items) from the maintained counters """
+    item_count, _ = await counter.get(db, owner_id)
+    pages = math.ceil(item_count / limit) if limit > 0 else 0
+
+    return item_count, pages
 
 
-def update_one(
-        db: Session,
+async def _check_unchanged(
+        db: AsyncSession,
         shop_item_id: str,
-        update_request: ShopItemUpdateRequest,
-        owner_id: str
+        owner_id: str,
+        versions: Optional[Collection[int]],
 ) -> ShopItem:
-    shop_item_db = db.query(ShopItemDB).filter_by(id=shop_item_id, owner_id=owner_id).first()
+    """ the current item of an update without fields, checked like update_one checks the row it writes """
+    shop_item_db: Optional[ShopItemDB] = await db.scalar(
+        select(ShopItemDB).filter_by(id=shop_item_id, owner_id=owner_id)
+    )
 
     if shop_item_db is None:
-        raise ValueError(f"ShopItem with ID {shop_item_id} not found")
+        raise ShopItemNotFoundException
+    if shop_item_db.disabled:
+        raise ShopItemDisabledException
+    if versions is not None and shop_item_db.version not in versions:
+        raise PreconditionFailedException
 
-    shop_item_db.name = update_request.name if update_request.name is not None else shop_item_db.name
-    shop_item_db.description = update_request.description if update_request.description is not None else shop_item_db.description
-    shop_item_db.price = update_request.price if update_request.price is not None else shop_item_db.price
-    shop_item_db.disabled = update_request.disabled if update_request.disabled is not None else shop_item_db.disabled
-    shop_item_db.updated_at = datetime.now()
+    return ShopItem.from_orm(shop_item_db)
 
-    db.commit()
-    db.refresh(shop_item_db)
+
+async def update_one(
+        db: AsyncSession,
+        shop_item_id: str,
+        update_request: ShopItemUpdateRequest,
+        owner_id: str,
+        versions: Optional[Collection[int]] = None,
+) -> ShopItem:
+    """
+    conditional UPDATE ... RETURNING, one round trip when the item exists and is enabled.
+    versions (from If-Match) restricts the write to those row versions, so concurrent
+    writers cannot overwrite each other. only a miss costs a second query, to tell a
+    missing or disabled item from a version mismatch. a request without fields writes
+    nothing and keeps the version, so it does not invalidate the ETags clients hold
+    """
+    values = update_request.model_dump(exclude_none=True)
+    if not values:
+        return await _check_unchanged(db, shop_item_id, owner_id, versions)
+
+    values["updated_at"] = datetime.now()
+
+    statement = (
+        update(ShopItemDB)
+        .where(ShopItemDB.id == shop_item_id, ShopItemDB.owner_id == owner_id, ShopItemDB.disabled.is_not(True))
+        .values(version=ShopItemDB.version + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
+    if versions is not None:
+        statement = statement.where(ShopItemDB.version.in_(versions))
+
+    if db.get_bind().dialect.update_returning:
+        shop_item_db: Optional[ShopItemDB] = await db.scalar(statement.returning(ShopItemDB))
+    else:
+        result = await db.execute(statement)
+        shop_item_db = await db.get(ShopItemDB, shop_item_id, populate_existing=True) if result.rowcount else None
+
+    if shop_item_db is None:
+        current = (await db.execute(
+            select(ShopItemDB.disabled).filter_by(id=shop_item_id, owner_id=owner_id)
+        )).first()
+        if current is None:
+            raise ShopItemNotFoundException
+        if current.disabled:
+            raise ShopItemDisabledException
+        raise PreconditionFailedException
+
+    # the row matched only if it was enabled
+    await counter.adjust(db, owner_id, disabled=int(bool(shop_item_db.disabled)))
+    if SEARCH_FIELDS & values.keys():
+        await search.index_items(db, [shop_item_id])
+    await db.commit()
+    await response_cache.invalidate(owner_id)
 
     return ShopItem.from_orm(shop_item_db)
 
 
+async def _execute_rows(db: AsyncSession, statement, rows: List[Dict[str, Any]]) -> None:
+    await db.execute(statement, rows)
+
+    # the ORM only batches an UPDATE by primary key without .values(), so versions are bumped separately,
+    # once per written row: an id repeated in the chunk is bumped once for each of its writes
+    if statement.is_update:
+        ids_by_writes: Dict[int, List[str]] = defaultdict(list)
+        for shop_item_id, writes in Counter(row["id"] for row in rows).items():
+            ids_by_writes[writes].append(shop_item_id)
+
+        for writes, shop_item_ids in ids_by_writes.items():
+            await db.execute(
+                update(ShopItemDB).where(ShopItemDB.id.in_(shop_item_ids))
+                .values(version=ShopItemDB.version + writes)
+                .execution_options(synchronize_session=False)
+            )
+
+
+async def _write_chunk(
+        db: AsyncSession,
+        statement,
+        rows: List[Dict[str, Any]],
+        owner_id: str,
+        total: int,
+        disabled: List[int],
+) -> Dict[int, str]:
+    """
+    write rows in one transaction, falling back to one transaction per row when
+    the batch fails so a bad row does not take the rest of the chunk with it.
+    returns {position in rows: error}
+    """
+    try:
+        await _execute_rows(db, statement, rows)
+        await counter.adjust(db, owner_id, total=total, disabled=sum(disabled))
+        await search.index_items(db, [row["id"] for row in rows if SEARCH_FIELDS & row.keys()])
+        await db.commit()
+        return {}
+    except WRITE_ERRORS as err:
+        await db.rollback()
+        if len(rows) == 1:
+            return {0: write_error_detail(err)}
+
+    errors: Dict[int, str] = {}
+    for position, row in enumerate(rows):
+        try:
+            await _execute_rows(db, statement, [row])
+            await counter.adjust(db, owner_id, total=1 if total else 0, disabled=disabled[position])
+            await search.index_items(db, [row["id"]] if SEARCH_FIELDS & row.keys() else [])
+            await db.commit()
+        except WRITE_ERRORS as err:
+            await db.rollback()
+            errors[position] = write_error_detail(err)
+
+    return errors
+
+
+async def create_many(
+        db: AsyncSession,
+        shop_items: List[ShopItemCreateRequest],
+        owner_id: str,
+        chunk_size: int,
+) -> Tuple[List[Optional[str]], Dict[int, str]]:
+    """
+    multi-row INSERT in chunks of chunk_size, one transaction per chunk.
+    returns the new ids aligned with shop_items (None on failure) and {index: error}
+    """
+    ids: List[Optional[str]] = [None] * len(shop_items)
+    errors: Dict[int, str] = {}
+
+    for start in range(0, len(shop_items), chunk_size):
+        now = datetime.now()
+        rows = [
+            dict(
+                id=get_new_id(),
+                name=shop_item.name,
+                description=shop_item.description,
+                price=shop_item.price,
+                disabled=shop_item.disabled,
+                owner_id=owner_id,
+                created_at=now,
+                updated_at=now,
+            )
+            for shop_item in shop_items[start:start + chunk_size]
+        ]
+
+        chunk_errors = await _write_chunk(
+            db, insert(ShopItemDB), rows, owner_id, total=len(rows), disabled=[int(row["disabled"]) for row in rows]
+        )
+
+        for position, row in enumerate(rows):
+            if position in chunk_errors:
+                errors[start + position] = chunk_errors[position]
+            else:
+                ids[start + position] = row["id"]
+
+    if any(shop_item_id is not None for shop_item_id in ids):
+        await response_cache.invalidate(owner_id)
+
+    return ids, errors
+
+
+async def update_many(
+        db: AsyncSession,
+        update_requests: List[ShopItemBulkUpdateRequest],
+        owner_id: str,
+        chunk_size: int,
+) -> Tuple[List[Optional[str]], Dict[int, str]]:
+    """
+    UPDATE by primary key in chunks of chunk_size, one transaction per chunk.
+    missing and disabled items are reported per row, like update_one
+    """
+    ids: List[Optional[str]] = [None] * len(update_requests)
+    errors: Dict[int, str] = {}
+    written = False
+
+    for start in range(0, len(update_requests), chunk_size):
+        chunk = update_requests[start:start + chunk_size]
+
+        current = dict((await db.execute(
+            select(ShopItemDB.id, ShopItemDB.disabled).where(
+                ShopItemDB.owner_id == owner_id,
+                ShopItemDB.id.in_({update_request.id for update_request in chunk}),
+            )
+        )).all())
+
+        now = datetime.now()
+        rows, positions, disabled = [], [], []
+        for position, update_request in enumerate(chunk, start=start):
+            if update_request.id not in current:
+                errors[position] = f"ShopItem with ID {update_request.id} not found"
+                continue
+            if current[update_request.id]:
+                errors[position] = f"ShopItem with ID {update_request.id} is disabled"
+                continue
+
+            values = update_request.model_dump(exclude_none=True)
+            if values.keys() == {"id"}:
+                # nothing to set, the row is left as it is and keeps its version
+                ids[position] = update_request.id
+                continue
+
+            values["updated_at"] = now
+            rows.append(values)
+            positions.append(position)
+            disabled.append(int(bool(values.get("disabled", False))))
+
+            # a repeated id sees its own earlier update, like consecutive PATCH calls
+            current[update_request.id] = bool(values.get("disabled", False))
+
+        if not rows:
+            continue
+
+        chunk_errors = await _write_chunk(db, update(ShopItemDB), rows, owner_id, total=0, disabled=disabled)
+        written = written or len(chunk_errors) < len(rows)
+
+        for row_position, position in enumerate(positions):
+            if row_position in chunk_errors:
+                errors[position] = chunk_errors[row_position]
+            else:
+                ids[position] = rows[row_position]["id"]
+
+    if written:
+        await response_cache.invalidate(owner_id)
 
+    return ids, errors
@@ -7,25 +7,29 @@ from fastapi.responses import PlainTextResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from .core.config import settings
-from .core.database import Base, engine
+from .core.keys import keys
+from .core.log import bind_error
 
 from .main import create_app
 
 from .route import api_router
 
-Base.metadata.create_all(bind=engine)
+# the schema and the keys are set up by the app lifespan in each worker
+if settings.preload_keys:
+    keys.load()
+
 app = create_app()
 
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exc):
-    print(exc)
-    return PlainTextResponse(str(exc.detail), status_code=exc.status_code)
+    bind_error(str(exc.detail))
+    return PlainTextResponse(str(exc.detail), status_code=exc.status_code, headers=exc.headers)
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
-    print(exc)
+    bind_error(str(exc.errors()))
     return PlainTextResponse(str(exc), status_code=400)
 
 app.include_router(api_router, prefix=f"{settings.api_version_prefix}")
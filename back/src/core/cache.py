@@ -0,0 +1,253 @@
+"""
+cache backends
+
+``LocalCache`` is a process-local LRU with per-entry TTL, a bound on the
+number of entries and optionally on their total size. ``RedisCache`` shares entries between workers and needs the
+optional ``redis`` package. Every backend exposes the same async interface, so
+callers pick one with ``create_cache`` and never branch on the backend.
+
+A local cache only sees the invalidations of its own process. With several
+workers every other worker keeps serving an entry until its TTL runs out, so
+the ``auto`` backend only picks ``local`` for a single worker (WEB_CONCURRENCY,
+which uvicorn and gunicorn read for their worker count, unset or 1). With more
+workers it picks ``redis`` when CACHE_REDIS_URL is set and ``none`` otherwise.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CacheBackend:
+    """ cache backend interface """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def discard(self, key: str) -> None:
+        """ drop a key from synchronous code such as ORM events, the key is gone when it returns """
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class NullCache(CacheBackend):
+    """ cache that never stores anything """
+
+    async def get(self, key: str) -> Optional[Any]:
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        return None
+
+    async def delete(self, key: str) -> None:
+        return None
+
+    def discard(self, key: str) -> None:
+        return None
+
+    async def clear(self) -> None:
+        return None
+
+
+class LocalCache(CacheBackend):
+    """ process-local LRU cache with per-entry expiry """
+
+    def __init__(
+            self,
+            ttl: float,
+            maxsize: int,
+            max_bytes: int = 0,
+            sizeof: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+
+    def get_nowait(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expire_at, value, _ = entry
+        if expire_at <= time.monotonic():
+            self.discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set_nowait(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        size = self.sizeof(value)
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        self.discard(key)
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.bytes += size
+
+        while len(self._entries) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_nowait(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self.discard(key)
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "bytes": self.bytes}
+
+
+class RedisCache(CacheBackend):
+    """ redis backed cache shared between workers """
+
+    def __init__(
+            self,
+            ttl: float,
+            url: str,
+            prefix: str,
+            encode: Callable[[Any], bytes],
+            decode: Callable[[bytes], Any],
+    ) -> None:
+        try:
+            from redis import asyncio as redis
+        except ImportError as err:
+            raise ImportError("RedisCache requires the redis package") from err
+
+        super().__init__(ttl)
+        self.url = url
+        self.prefix = prefix
+        self.encode = encode
+        self.decode = decode
+        self._client = redis.from_url(url)
+        self._sync_client = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self.prefix + key)
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.decode(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        await self._client.set(self.prefix + key, self.encode(value), ex=math.ceil(ttl))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+    def discard(self, key: str) -> None:
+        # a blocking round trip: ORM events can not await, and a delete still in flight when the
+        # commit returns would let the next request read the old entry
+        if self._sync_client is None:
+            import redis
+
+            self._sync_client = redis.Redis.from_url(self.url)
+        self._sync_client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=f"{self.prefix}*"):
+            await self._client.delete(key)
+
+
+def create_cache(
+        backend: str,
+        ttl: float,
+        maxsize: int,
+        prefix: str = "",
+        redis_url: Optional[str] = None,
+        encode: Callable[[Any], bytes] = None,
+        decode: Callable[[bytes], Any] = None,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        workers: int = 1,
+) -> CacheBackend:
+    """
+    cache backend factory, backend is one of auto | none | local | redis.
+    max_bytes bounds the total sizeof(value) of a local cache, 0 for no bound.
+    workers is the number of server processes sharing the data, see auto above
+    """
+    if backend == "auto":
+        if workers <= 1:
+            backend = "local"
+        elif redis_url and encode is not None and decode is not None:
+            backend = "redis"
+        else:
+            backend = "none"
+
+    if backend == "none" or ttl <= 0:
+        return NullCache(ttl)
+
+    if backend == "local":
+        return LocalCache(ttl=ttl, maxsize=maxsize, max_bytes=max_bytes, sizeof=sizeof)
+
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("CACHE_REDIS_URL is required for the redis cache backend")
+        if encode is None or decode is None:
+            raise ValueError(f"{prefix or 'this'} cache can not be shared between workers")
+        return RedisCache(ttl=ttl, url=redis_url, prefix=prefix, encode=encode, decode=decode)
+
+    raise ValueError(f"Unknown cache backend {backend}")
@@ -0,0 +1,173 @@
+"""
+Negotiated response compression
+
+``CompressionMiddleware`` picks the first of the configured encodings the
+client accepts (``Accept-Encoding`` with q-values) and compresses text / JSON
+responses of at least ``minimum_size`` bytes. Small bodies are not worth the
+CPU and go out as they are. brotli is used when the ``brotli`` package is
+installed, gzip comes with the standard library.
+
+Responses that already carry a Content-Encoding, and statuses without a
+body, are left alone. Streaming responses are compressed chunk by chunk.
+"""
+import zlib
+from functools import lru_cache
+from typing import Callable, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml",
+})
+
+# every encoding the middleware can produce
+ENCODINGS = ("br", "gzip")
+
+# (compress chunk, finish) of one response
+Compressor = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def available_encodings(encodings: Sequence[str]) -> Tuple[str, ...]:
+    """ the configured encodings this process can produce, in preference order """
+    supported = {"gzip"} | ({"br"} if brotli is not None else set())
+    return tuple(encoding for encoding in encodings if encoding in supported)
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding: str) -> frozenset:
+    """ encodings with a non zero q-value, ``*`` stands for every encoding not refused with q=0 """
+    accepted, refused = set(), set()
+
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if name:
+            (accepted if _quality(params) > 0 else refused).add(name)
+
+    if "*" in accepted:
+        accepted |= {encoding for encoding in ENCODINGS if encoding not in refused}
+
+    return frozenset(accepted - refused)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+            content_type in COMPRESSIBLE_TYPES
+            or content_type.startswith("text/")
+            or content_type.endswith(("+json", "+xml"))
+    )
+
+
+class CompressionMiddleware:
+    """ ASGI middleware compressing responses with the best accepted encoding """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            encodings: Sequence[str] = ("br", "gzip"),
+            minimum_size: int = 1024,
+            gzip_level: int = 6,
+            brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def negotiate(self, scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accepted = accepted_encodings(value.decode("latin-1"))
+                for encoding in self.encodings:
+                    if encoding in accepted:
+                        return encoding
+                return None
+
+        return None
+
+    def compressor(self, encoding: str) -> Compressor:
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.finish
+
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        return compressor.compress, compressor.flush
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.negotiate(scope)
+        start: Optional[Message] = None
+        compress: Optional[Compressor] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compress
+
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk tells whether to compress
+                start = message
+                return
+
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            if compress is None:
+                headers = MutableHeaders(scope=start)
+                headers.add_vary_header("Accept-Encoding")
+
+                body = message.get("body", b"")
+                streaming = message.get("more_body", False)
+
+                if (
+                        encoding is None
+                        or "content-encoding" in headers
+                        or not is_compressible(headers.get("content-type", ""))
+                        or (not streaming and len(body) < self.minimum_size)
+                ):
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+
+                compress = self.compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if streaming:
+                    del headers["Content-Length"]
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compress[0](body), "more_body": True})
+                else:
+                    body = compress[0](body) + compress[1]()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                return
+
+            body = compress[0](message.get("body", b""))
+            if message.get("more_body", False):
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": body + compress[1]()})
+
+        await self.app(scope, receive, send_wrapper)
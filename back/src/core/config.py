@@ -3,7 +3,6 @@
 configuration
 """
 import os
-from functools import lru_cache
 from typing import List, Union, Optional
 
 from pydantic import HttpUrl, field_validator, Field
@@ -18,6 +17,17 @@ class SQLAlchemySettings(BaseSettings):
     sqlalchemy_pool_recycle: int = Field(alias="POOL_RECYCLE")
     sqlalchemy_echo: bool = Field(alias="ECHO")
     sqlalchemy_database_url: str = Field(alias="DATABASE_URL")
+    sqlalchemy_async_database_url: Optional[str] = Field(default=None, alias="ASYNC_DATABASE_URL")
+    sqlalchemy_max_overflow: int = Field(default=10, alias="MAX_OVERFLOW")
+    sqlalchemy_pool_pre_ping: bool = Field(default=False, alias="POOL_PRE_PING")
+    sqlalchemy_statement_timeout: int = Field(default=0, alias="STATEMENT_TIMEOUT")  # milliseconds, 0 disables
+
+    # comma separated read replica urls, read-only sessions are routed to them
+    sqlalchemy_replica_database_urls: str = Field(default="", alias="REPLICA_DATABASE_URLS")
+    # replica pools fall back to the primary's pool settings
+    sqlalchemy_replica_pool_size: Optional[int] = Field(default=None, alias="REPLICA_POOL_SIZE")
+    sqlalchemy_replica_max_overflow: Optional[int] = Field(default=None, alias="REPLICA_MAX_OVERFLOW")
+    sqlalchemy_replica_pool_timeout: Optional[int] = Field(default=None, alias="REPLICA_POOL_TIMEOUT")
 
     model_config = SettingsConfigDict(
         extra="ignore",
@@ -36,12 +46,60 @@ class Settings(BaseSettings):
     access_token_expire_seconds: int = Field(alias="ACCESS_TOKEN_EXPIRE_SECONDS")
     user_repository_path: str = Field(alias="USER_REPOSITORY_PATH")
 
-    private_key: str = Field(alias="PRIVATE_KEY")
-    public_key: str = Field(alias="PUBLIC_KEY")
+    # PEM file paths, read by core.keys at startup
+    private_key_path: str = Field(alias="PRIVATE_KEY")
+    public_key_path: str = Field(alias="PUBLIC_KEY")
+    preload_keys: bool = Field(default=False, alias="PRELOAD_KEYS")
+    # comma separated public key paths ("kid=path" or "path") of retired keys still accepted
+    jwt_verification_keys: str = Field(default="", alias="JWT_VERIFICATION_KEYS")
+    jwt_key_id: Optional[str] = Field(default=None, alias="JWT_KEY_ID")  # default: public key fingerprint
     cors_allows: List[HttpUrl] = []
 
     shop_item_default_limit: int = Field(alias="SHOP_ITEM_DEFAULT_LIMIT")
     shop_item_default_page: int = Field(alias="SHOP_ITEM_DEFAULT_PAGE")
+    shop_item_bulk_max_rows: int = Field(default=10000, alias="SHOP_ITEM_BULK_MAX_ROWS")
+    shop_item_bulk_chunk_size: int = Field(default=500, alias="SHOP_ITEM_BULK_CHUNK_SIZE")
+    shop_item_import_max_errors: int = Field(default=100, alias="SHOP_ITEM_IMPORT_MAX_ERRORS")
+
+    password_hash_executor: str = Field(default="thread", alias="PASSWORD_HASH_EXECUTOR")  # thread | process
+    password_hash_workers: int = Field(default=4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(default=64, alias="PASSWORD_HASH_MAX_PENDING")
+
+    token_cache_backend: str = Field(default="local", alias="TOKEN_CACHE_BACKEND")  # none | local
+    token_cache_maxsize: int = Field(default=10000, alias="TOKEN_CACHE_MAXSIZE")
+
+    cache_redis_url: Optional[str] = Field(default=None, alias="CACHE_REDIS_URL")
+    # server worker processes, auto cache backends only keep entries per process for a single worker
+    web_concurrency: int = Field(default=1, alias="WEB_CONCURRENCY")
+
+    principal_cache_backend: str = Field(default="auto", alias="PRINCIPAL_CACHE_BACKEND")  # auto | none | local | redis
+    principal_cache_ttl: int = Field(default=60, alias="PRINCIPAL_CACHE_TTL")
+    principal_cache_maxsize: int = Field(default=10000, alias="PRINCIPAL_CACHE_MAXSIZE")
+    principal_cache_by_token: bool = Field(default=False, alias="PRINCIPAL_CACHE_BY_TOKEN")
+
+    shop_cache_backend: str = Field(default="auto", alias="SHOP_CACHE_BACKEND")  # auto | none | local | redis
+    shop_cache_ttl: int = Field(default=30, alias="SHOP_CACHE_TTL")
+    shop_cache_maxsize: int = Field(default=10000, alias="SHOP_CACHE_MAXSIZE")
+    shop_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="SHOP_CACHE_MAX_BYTES")
+
+    query_profiler: str = Field(default="off", alias="QUERY_PROFILER")  # off | header | always
+
+    health_probe_timeout: float = Field(default=1.0, alias="HEALTH_PROBE_TIMEOUT")
+    health_max_pool_saturation: float = Field(default=1.0, alias="HEALTH_MAX_POOL_SATURATION")
+
+    create_schema: bool = Field(default=True, alias="CREATE_SCHEMA")  # create missing tables at startup
+
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_queue_size: int = Field(default=10000, alias="LOG_QUEUE_SIZE")
+    log_access: bool = Field(default=True, alias="LOG_ACCESS")
+    log_4xx_sample_rate: float = Field(default=0.1, alias="LOG_4XX_SAMPLE_RATE")
+
+    json_response: str = Field(default="pydantic", alias="JSON_RESPONSE")  # pydantic | orjson
+
+    compression_encodings: str = Field(default="br,gzip", alias="COMPRESSION_ENCODINGS")  # preference order, empty disables
+    compression_minimum_size: int = Field(default=1024, alias="COMPRESSION_MINIMUM_SIZE")
+    compression_gzip_level: int = Field(default=6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(default=4, alias="COMPRESSION_BROTLI_QUALITY")
 
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.getcwd(), "..", ".env"),
@@ -58,31 +116,7 @@ class Settings(BaseSettings):
             raise ValueError(v)
         return result
 
-    @field_validator("private_key")
-    def __set_private_key(cls, path: str) -> str:  # noqa
-        private_key = open(path).read()
-        return private_key
-
-    @field_validator("public_key")
-    def __set_public_key(cls, path: str) -> str:  # noqa
-        public_key = open(path).read()
-        return public_key
-
-
-class LoadSettings:
-    """
-    load settings
-    """
-
-    def __init__(self):
-        self.settings = Settings()
-        self.sqlalchemy_settings = SQLAlchemySettings()
-
-    @lru_cache()
-    def get_settings(self):
-        return self.settings, self.sqlalchemy_settings
-
 
-load_settings = LoadSettings()
 
-settings, sqlalchemy_settings = load_settings.get_settings()
+settings = Settings()
+sqlalchemy_settings = SQLAlchemySettings()
@@ -1,19 +1,156 @@
-from sqlalchemy import create_engine
+import itertools
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 from .config import sqlalchemy_settings
 
-engine = create_engine(
-    sqlalchemy_settings.sqlalchemy_database_url,
+# sync driver -> asyncio driver used when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def _first(value: Optional[int], default: int) -> int:
+    return default if value is None else value
+
+
+def get_async_database_url(database_url: str) -> str:
+    """ derive the asyncio database url from the sync one """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver known for {backend}")
+
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def engine_options(
+        pool_size: int,
+        max_overflow: int,
+        pool_timeout: int,
+        pool_recycle: int,
+        pool_pre_ping: bool,
+) -> Dict[str, Any]:
+    """ pool keyword arguments shared by create_engine and create_async_engine """
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+        "echo": sqlalchemy_settings.sqlalchemy_echo,
+    }
+
+
+def set_statement_timeout(engine: Engine, milliseconds: int) -> None:
+    """ limit statement run time on every new connection, where the database supports it """
+    statements = {
+        "postgresql": f"SET statement_timeout = {int(milliseconds)}",
+        "mysql": f"SET SESSION max_execution_time = {int(milliseconds)}",
+    }
+    statement = statements.get(engine.dialect.name)
+
+    if not milliseconds or statement is None:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(statement)
+        cursor.close()
+
+
+primary_options = engine_options(
     pool_size=sqlalchemy_settings.sqlalchemy_pool_size,
-    pool_recycle=sqlalchemy_settings.sqlalchemy_pool_recycle,
+    max_overflow=sqlalchemy_settings.sqlalchemy_max_overflow,
     pool_timeout=sqlalchemy_settings.sqlalchemy_pool_timeout,
-    echo=sqlalchemy_settings.sqlalchemy_echo,
+    pool_recycle=sqlalchemy_settings.sqlalchemy_pool_recycle,
+    pool_pre_ping=sqlalchemy_settings.sqlalchemy_pool_pre_ping,
+)
+
+replica_options = engine_options(
+    pool_size=_first(sqlalchemy_settings.sqlalchemy_replica_pool_size, sqlalchemy_settings.sqlalchemy_pool_size),
+    max_overflow=_first(sqlalchemy_settings.sqlalchemy_replica_max_overflow, sqlalchemy_settings.sqlalchemy_max_overflow),
+    pool_timeout=_first(sqlalchemy_settings.sqlalchemy_replica_pool_timeout, sqlalchemy_settings.sqlalchemy_pool_timeout),
+    pool_recycle=sqlalchemy_settings.sqlalchemy_pool_recycle,
+    pool_pre_ping=sqlalchemy_settings.sqlalchemy_pool_pre_ping,
+)
+
+engine = create_engine(sqlalchemy_settings.sqlalchemy_database_url, **primary_options)
+
+async_engine = create_async_engine(
+    sqlalchemy_settings.sqlalchemy_async_database_url
+    or get_async_database_url(sqlalchemy_settings.sqlalchemy_database_url),
+    **primary_options,
 )
 
+replica_engines: List[AsyncEngine] = [
+    create_async_engine(get_async_database_url(url.strip()), **replica_options)
+    for url in sqlalchemy_settings.sqlalchemy_replica_database_urls.split(",")
+    if url.strip()
+]
+
+for _engine in [engine, async_engine.sync_engine] + [replica.sync_engine for replica in replica_engines]:
+    set_statement_timeout(_engine, sqlalchemy_settings.sqlalchemy_statement_timeout)
+
+_replica_cycle = itertools.cycle(replica_engines)
+
+
+class RoutingSession(Session):
+    """
+    session sending the reads of read-only sessions to a replica
+
+    A session opened with ``info={"read_only": True}`` (see ``get_async_read_session``)
+    runs its SELECTs on one replica, picked round robin when the session first
+    needs a connection. Flushes and DML always go to the primary, as does every
+    statement of a regular session or when no replica is configured.
+
+    Replicas lag the primary: a read right after a write may not see it. Reads
+    whose result outlives the request, like the pages the shop response cache
+    keeps, call ``use_primary`` first so a lagging replica can not hand them an
+    old row.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+                replica_engines
+                and self.info.get("read_only")
+                and not self._flushing
+                and not isinstance(clause, UpdateBase)
+        ):
+            if "replica" not in self.info:
+                self.info["replica"] = next(_replica_cycle)
+            return self.info["replica"].sync_engine
+
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+async def use_primary(session: AsyncSession) -> None:
+    """ send the following statements of a read-only session to the primary, ending its replica transaction """
+    session.info["read_only"] = False
+
+    if session.in_transaction():
+        await session.rollback()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
@@ -25,3 +162,15 @@ def get_database_session():
         yield session
     finally:
         session.close()
+
+
+async def get_async_database_session() -> AsyncGenerator[AsyncSession, None]:
+    """ sqlalchemy AsyncSession generator """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """ sqlalchemy AsyncSession generator for read-only work, served by a replica when configured """
+    async with AsyncSessionLocal(info={"read_only": True}) as session:
+        yield session
@@ -0,0 +1,70 @@
+"""
+readiness checks
+
+``pool_status`` reads the connection pool counters without touching the
+database. ``probe`` runs ``SELECT 1`` under a timeout. The readiness route
+checks saturation first, so a worker with an exhausted pool answers at once
+instead of queueing its own probe behind the requests it can not serve.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """ checked out / overflow / size of a queue pool, empty for pools without them """
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+
+    size = pool.size()
+    # QueuePool keeps max_overflow private, overflow() counts up from -size
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+    }
+
+
+async def probe(engine: AsyncEngine, timeout: float) -> Optional[str]:
+    """ None when SELECT 1 succeeds within timeout seconds, otherwise the reason """
+    async def select_one() -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(select_one(), timeout)
+    except asyncio.TimeoutError:
+        return f"probe timed out after {timeout}s"
+    except Exception as err:  # noqa
+        return f"{type(err).__name__}: {err}"
+
+    return None
+
+
+async def readiness(engine: AsyncEngine, timeout: float, max_saturation: float) -> Dict[str, Any]:
+    """ readiness report of the database behind engine, status is ready or unavailable """
+    pool = pool_status(engine.sync_engine)
+    report: Dict[str, Any] = {"status": "ready", "pool": pool}
+
+    if pool and pool["saturation"] >= max_saturation:
+        report.update(status="unavailable", error="connection pool saturated")
+        return report
+
+    started = time.perf_counter()
+    error = await probe(engine, timeout)
+    report["probe_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    if error is not None:
+        report.update(status="unavailable", error=error)
+
+    return report
@@ -0,0 +1,34 @@
+"""
+JSON encoding for hand built responses
+
+``dumps`` returns compact UTF-8 bytes. It uses orjson when installed and a
+precompiled stdlib encoder otherwise, with the same output for the plain
+str / int / bool / None / list / dict values the fast paths produce.
+
+``FastJSONResponse`` renders with ``dumps``. JSON_RESPONSE=orjson makes it the
+app's default response class, which also routes response models through it
+instead of FastAPI's own Pydantic serialization to bytes.
+"""
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+
+    return __encoder.encode(value).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
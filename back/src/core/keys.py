@@ -0,0 +1,140 @@
+"""
+JWT key material
+
+The PEM files named by PRIVATE_KEY / PUBLIC_KEY are parsed once per process
+into ``cryptography`` key objects, which PyJWT uses as they are instead of
+parsing the PEM again on every sign and verify. Loading happens in the app
+lifespan at worker startup. With PRELOAD_KEYS it happens when ``src.asgi``
+is imported instead, so a pre-forking server (e.g. ``gunicorn --preload
+--workers N``) reads the keys once in the parent. Access before either point
+loads them on demand.
+
+Keys are identified by a ``kid``, by default a fingerprint of the public
+key, written to the header of every issued token. Rotation: move the old
+public key to JWT_VERIFICATION_KEYS and point PRIVATE_KEY / PUBLIC_KEY at
+the new pair. Tokens signed with the old key verify until they expire.
+
+RSA, EC (ES256 / ES384 / ES512) and Ed25519 (EdDSA) keys are supported. The
+key type has to match JWT_ALGORITHM.
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from .config import settings
+
+# algorithms accepted for verification, by key type
+ALGORITHM_FAMILIES = (
+    (rsa.RSAPublicKey, ("RS256", "RS384", "RS512", "PS256", "PS384", "PS512")),
+    (ec.EllipticCurvePublicKey, ("ES256", "ES384", "ES512")),
+    (ed25519.Ed25519PublicKey, ("EdDSA",)),
+)
+
+KID_LENGTH = 16
+
+
+def algorithms_for(public_key) -> Tuple[str, ...]:
+    for key_type, algorithms in ALGORITHM_FAMILIES:
+        if isinstance(public_key, key_type):
+            return algorithms
+
+    raise ValueError(f"Unsupported key type {type(public_key).__name__}")
+
+
+def key_id(public_key) -> str:
+    """ fingerprint of the public key """
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return hashlib.sha256(der).hexdigest()[:KID_LENGTH]
+
+
+def parse_key_path(entry: str) -> Tuple[Optional[str], str]:
+    """ "kid=path" or "path" """
+    kid, separator, path = entry.partition("=")
+    return (kid.strip(), path.strip()) if separator else (None, entry.strip())
+
+
+class KeyRing:
+    """ the signing key and every public key tokens may be verified with, by kid """
+
+    def __init__(
+            self,
+            private_key_path: str,
+            public_key_path: str,
+            algorithm: str,
+            verification_key_paths: Sequence[str] = (),
+            kid: Optional[str] = None,
+    ) -> None:
+        self.private_key_path = private_key_path
+        self.public_key_path = public_key_path
+        self.algorithm = algorithm
+        self.verification_key_paths = list(verification_key_paths)
+
+        self._kid = kid
+        self._signing_key = None
+        self._verification: Dict[str, Tuple[object, List[str]]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._signing_key is not None
+
+    def load(self) -> None:
+        """ parse the PEM files, a no-op once loaded """
+        if self.loaded:
+            return
+
+        with open(self.private_key_path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        with open(self.public_key_path, "rb") as f:
+            public_key = serialization.load_pem_public_key(f.read())
+
+        if key_id(private_key.public_key()) != key_id(public_key):
+            raise ValueError("PRIVATE_KEY and PUBLIC_KEY are not a key pair")
+        if self.algorithm not in algorithms_for(public_key):
+            raise ValueError(f"JWT_ALGORITHM {self.algorithm} does not match the {type(public_key).__name__} key")
+
+        self._kid = self._kid or key_id(public_key)
+        verification = {self._kid: (public_key, [self.algorithm])}
+
+        for entry in self.verification_key_paths:
+            kid, path = parse_key_path(entry)
+            with open(path, "rb") as f:
+                retired_key = serialization.load_pem_public_key(f.read())
+            verification[kid or key_id(retired_key)] = (retired_key, list(algorithms_for(retired_key)))
+
+        self._verification = verification
+        self._signing_key = private_key
+
+    @property
+    def kid(self) -> str:
+        self.load()
+        return self._kid
+
+    @property
+    def signing_key(self):
+        self.load()
+        return self._signing_key
+
+    @property
+    def rotating(self) -> bool:
+        """ more than one key is accepted, tokens have to be matched by their kid """
+        self.load()
+        return len(self._verification) > 1
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Tuple[object, List[str]]]:
+        """ (public key, accepted algorithms) of kid, tokens without kid use the current key """
+        self.load()
+        return self._verification.get(kid or self._kid)
+
+
+keys = KeyRing(
+    private_key_path=settings.private_key_path,
+    public_key_path=settings.public_key_path,
+    algorithm=settings.jwt_algorithm,
+    verification_key_paths=[path for path in settings.jwt_verification_keys.split(",") if path.strip()],
+    kid=settings.jwt_key_id,
+)
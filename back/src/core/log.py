@@ -0,0 +1,229 @@
+"""
+Structured logging
+
+Records are written as one JSON object per line. Request handlers only put
+records on a bounded in-memory queue; a ``QueueListener`` thread formats and
+writes them, so a slow stderr / log shipper never adds request latency. When
+the queue is full records are dropped instead of blocking, the queue depth
+and the drops are exported as the log_records_* Prometheus metrics.
+
+``AccessLogMiddleware`` assigns every request an id (``X-Request-ID``, taken
+from the request when present) and logs one access record per request with
+method, route template, status, user id, latency and database time. Every
+other record logged while serving the request carries the same request and
+user id.
+
+4xx access records are sampled with LOG_4XX_SAMPLE_RATE, the rate is part of
+the record so volumes can be scaled back up. 5xx records are always logged.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import current_request, route_template, log_records_queued, log_records_dropped
+
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_MAX_LENGTH = 128
+
+# LogRecord attributes that are not "extra" fields
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+access_logger = logging.getLogger("access")
+
+
+class RequestContext:
+    """ identifiers of the request being served """
+    __slots__ = ("request_id", "user_id", "error")
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.user_id: Optional[str] = None
+        self.error: Optional[str] = None
+
+
+current_context: ContextVar[Optional[RequestContext]] = ContextVar("current_context", default=None)
+
+
+def bind_user(user_id: str) -> None:
+    """ attribute the current request to an authenticated user """
+    context = current_context.get()
+    if context is not None:
+        context.user_id = user_id
+
+
+def bind_error(error: str) -> None:
+    """ attach an error description to the access record of the current request """
+    context = current_context.get()
+    if context is not None:
+        context.error = error
+
+
+class ContextFilter(logging.Filter):
+    """ copies the request context onto records, runs in the caller before queueing """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = current_context.get()
+        if context is not None:
+            record.request_id = context.request_id
+            if context.user_id is not None:
+                record.user_id = context.user_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """ one JSON object per record with the extra fields at the top level """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """ queue handler that never blocks the caller """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merge the arguments and render the traceback here, formatting happens in the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(level: str = "INFO", queue_size: int = 10000) -> None:
+    """ route the root logger through the queue to a JSON stderr handler """
+    global _listener, _handler
+
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    log_records_queued.set_function(_handler.queue.qsize)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """ flush queued records and stop the listener thread """
+    global _listener, _handler
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    logging.getLogger().removeHandler(_handler)
+    log_records_queued.set_function(lambda: 0)
+    _listener, _handler = None, None
+
+
+def request_id_of(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER and value:
+            return value[:REQUEST_ID_MAX_LENGTH].decode("latin-1")
+
+    return uuid.uuid4().hex
+
+
+class AccessLogMiddleware:
+    """ ASGI middleware binding a request id and writing one access record per request """
+
+    def __init__(self, app: ASGIApp, sample_4xx: float = 1.0) -> None:
+        self.app = app
+        self.sample_4xx = sample_4xx
+
+    def sampled(self, status_code: int) -> bool:
+        if 400 <= status_code < 500:
+            return self.sample_4xx >= 1.0 or random.random() < self.sample_4xx
+        return True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(request_id_of(scope))
+        token = current_context.set(context)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", context.request_id)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            context.error = context.error or "unhandled exception"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+
+            if access_logger.isEnabledFor(logging.INFO) and self.sampled(status_code):
+                # database work is counted by the metrics middleware, which wraps this one
+                request_stats = current_request.get()
+                extra = {
+                    "method": scope["method"],
+                    "route": route_template(scope),
+                    "path": scope["path"],
+                    "status": status_code,
+                    "latency_ms": round(elapsed * 1000, 3),
+                    "db_ms": round(request_stats.query_seconds * 1000, 3) if request_stats is not None else None,
+                    "db_queries": request_stats.queries if request_stats is not None else None,
+                }
+                if 400 <= status_code < 500:
+                    extra["sample_rate"] = self.sample_4xx
+                if context.error is not None:
+                    extra["error"] = context.error
+
+                level = logging.ERROR if status_code >= 500 else logging.INFO
+                access_logger.log(level, "%s %s %s", scope["method"], scope["path"], status_code, extra=extra)
+
+            current_context.reset(token)
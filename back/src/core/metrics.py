@@ -0,0 +1,260 @@
+"""
+Prometheus metrics
+
+``MetricsMiddleware`` records per-route latency histograms, status codes and
+in-flight requests. ``instrument_engine`` hooks SQLAlchemy engine events to
+record query counts / durations, session events time how long a session waits
+for its connection, and both are attributed to the current request through ``current_request``. The
+password hash pool and the log queue report their depth and rejections here
+as well, and every cache passed to ``register_cache`` its hits, misses, hit
+ratio, entries and evictions.
+
+Everything is registered in ``registry`` and served by the /metrics route.
+"""
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Set, Tuple
+from weakref import WeakKeyDictionary, WeakSet
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+http_requests = Counter(
+    "http_requests", "HTTP requests by route and status code",
+    ["method", "route", "status"], registry=registry,
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+db_queries = Counter(
+    "db_queries", "SQL statements executed",
+    ["engine"], registry=registry,
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement latency",
+    ["engine"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100), registry=registry,
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time a session waited for its connection, pool wait and connect included",
+    ["engine"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+password_hash_queued = Gauge(
+    "password_hash_queued", "Password hash jobs waiting for a free worker",
+    registry=registry,
+)
+password_hash_running = Gauge(
+    "password_hash_running", "Password hash jobs being run by a worker",
+    registry=registry,
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected", "Password hash jobs rejected because the pool was full",
+    registry=registry,
+)
+log_records_queued = Gauge(
+    "log_records_queued", "Log records waiting to be written",
+    registry=registry,
+)
+log_records_dropped = Counter(
+    "log_records_dropped", "Log records dropped because the log queue was full",
+    registry=registry,
+)
+
+
+class CacheCollector:
+    """ reads the stats() of every registered cache at scrape time """
+
+    def __init__(self) -> None:
+        self.caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def collect(self):
+        families = {
+            "hits": CounterMetricFamily("cache_hits", "Cache lookups that found an entry", labels=["cache"]),
+            "misses": CounterMetricFamily("cache_misses", "Cache lookups that found no entry", labels=["cache"]),
+            "evictions": CounterMetricFamily(
+                "cache_evictions", "Entries evicted to stay within the cache bounds", labels=["cache"],
+            ),
+            "hit_ratio": GaugeMetricFamily(
+                "cache_hit_ratio", "Share of cache lookups that found an entry", labels=["cache"],
+            ),
+            "size": GaugeMetricFamily("cache_entries", "Entries held by the cache in this process", labels=["cache"]),
+        }
+
+        for name, stats in self.caches.items():
+            values = stats()
+            for key, family in families.items():
+                family.add_metric([name], values[key])
+
+        return list(families.values())
+
+
+cache_collector = CacheCollector()
+registry.register(cache_collector)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, float]]) -> None:
+    """ export the stats() of a cache labelled cache=name """
+    cache_collector.caches[name] = stats
+
+
+class RequestStats:
+    """ database work done on behalf of one request """
+    __slots__ = ("queries", "query_seconds", "pool_wait_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+__instrumented_engines: "WeakSet[Engine]" = WeakSet()
+__checkout_waits: "WeakKeyDictionary[Engine, Histogram]" = WeakKeyDictionary()
+
+
+# sessions begin their transaction right before they take a connection, so the
+# time to the session's first "after_begin" is the wait for that connection
+@event.listens_for(Session, "after_transaction_create")
+def _transaction_created(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info["connection_wanted"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _connection_acquired(session: Session, transaction, connection) -> None:
+    started = session.info.pop("connection_wanted", None)
+    checkout_wait = __checkout_waits.get(connection.engine)
+
+    if started is None or checkout_wait is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    checkout_wait.observe(elapsed)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait_seconds += elapsed
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """ record query and pool metrics of a sync engine (async_engine.sync_engine for async) """
+    if engine in __instrumented_engines:
+        return
+    __instrumented_engines.add(engine)
+
+    queries = db_queries.labels(engine=name)
+    query_duration = db_query_duration.labels(engine=name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        queries.inc()
+        query_duration.observe(elapsed)
+
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+    __checkout_waits[engine] = db_pool_checkout_wait.labels(engine=name)
+
+
+def route_template(scope: Scope) -> str:
+    """ path template of the matched route, e.g. /api/v1/shop/{shop_item_id} """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+
+    # included routers may hand over the route with its path relative to their prefix.
+    # the prefix is the part of the request path in front of what the route itself matches
+    path = scope["path"]
+    for start in range(len(path) + 1):
+        # a route mounted at its router's prefix itself has an empty path
+        if (start == len(path) or path[start] == "/") and route.path_regex.match(path[start:]):
+            return path[:start] + route.path
+
+    return route.path
+
+
+class InFlightCollector:
+    """
+    HTTP requests being served by method and route template. The route is only
+    known once the router matched it, so the live scopes are labelled at scrape
+    time; requests not routed yet count as unmatched.
+    """
+
+    def __init__(self) -> None:
+        self.scopes: Dict[int, Scope] = {}
+        self.seen: Set[Tuple[str, str]] = set()
+
+    def collect(self):
+        counts = dict.fromkeys(self.seen, 0)
+        for scope in list(self.scopes.values()):
+            labels = (scope["method"], route_template(scope))
+            counts[labels] = counts.get(labels, 0) + 1
+        # a route that went idle reports 0 instead of dropping out
+        self.seen.update(counts)
+
+        family = GaugeMetricFamily("http_requests_in_flight", "HTTP requests being served", labels=["method", "route"])
+        for (method, route), count in sorted(counts.items()):
+            family.add_metric([method, route], count)
+        return [family]
+
+
+http_requests_in_flight = InFlightCollector()
+registry.register(http_requests_in_flight)
+
+
+class MetricsMiddleware:
+    """ ASGI middleware recording request metrics per route template """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.scopes[id(scope)] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            del http_requests_in_flight.scopes[id(scope)]
+            current_request.reset(token)
+
+            route_path = route_template(scope)
+
+            http_requests.labels(method=method, route=route_path, status=str(status_code)).inc()
+            http_request_duration.labels(method=method, route=route_path).observe(elapsed)
+            db_queries_per_request.labels(route=route_path).observe(stats.queries)
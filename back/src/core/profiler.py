@@ -0,0 +1,139 @@
+"""
+Per-request SQL profiler
+
+Opt-in with QUERY_PROFILER:
+
+    off     default, nothing is registered
+    header  requests sent with ``X-Query-Profile: 1`` are profiled
+    always  every request is profiled
+
+A profiled response carries a ``Server-Timing`` header (database, pool wait
+and total time) and an ``X-Query-Profile`` JSON summary: statement count and
+time, plus the statements that ran more than once. The same SQL repeated
+with different parameters is the usual N+1 shape, the same SQL and
+parameters repeated is a plain duplicate.
+"""
+import json
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from weakref import WeakSet
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import current_request
+
+PROFILE_HEADER = b"x-query-profile"
+SUMMARY_STATEMENT_LENGTH = 200
+SUMMARY_REPEATED_LIMIT = 5
+WHITESPACE = re.compile(r"\s+")
+
+
+class QueryProfile:
+    """ statements executed on behalf of one request """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.statements: List[Tuple[str, str, float]] = []
+
+    def record(self, statement: str, parameters, elapsed: float) -> None:
+        self.statements.append((statement, repr(parameters), elapsed))
+
+    def repeated(self) -> List[Dict[str, object]]:
+        """ statements run more than once, most frequent first """
+        groups: Dict[str, List[Tuple[str, float]]] = {}
+        for statement, parameters, elapsed in self.statements:
+            groups.setdefault(statement, []).append((parameters, elapsed))
+
+        repeated = [
+            {
+                "statement": WHITESPACE.sub(" ", statement).strip()[:SUMMARY_STATEMENT_LENGTH],
+                "count": len(runs),
+                "duplicates": len(runs) - len({parameters for parameters, _ in runs}),
+                "ms": round(sum(elapsed for _, elapsed in runs) * 1000, 3),
+            }
+            for statement, runs in groups.items()
+            if len(runs) > 1
+        ]
+        repeated.sort(key=lambda entry: entry["count"], reverse=True)
+        return repeated
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "queries": len(self.statements),
+            "ms": round(sum(elapsed for _, _, elapsed in self.statements) * 1000, 3),
+            "repeated": self.repeated()[:SUMMARY_REPEATED_LIMIT],
+        }
+
+    def server_timing(self) -> str:
+        database = sum(elapsed for _, _, elapsed in self.statements) * 1000
+        total = (time.perf_counter() - self.started) * 1000
+        timings = [f'db;dur={database:.3f};desc="{len(self.statements)} queries"']
+
+        # pool waits are measured by the metrics instrumentation
+        stats = current_request.get()
+        if stats is not None:
+            timings.append(f"pool;dur={stats.pool_wait_seconds * 1000:.3f}")
+
+        return ", ".join(timings + [f"app;dur={total:.3f}"])
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+__profiled_engines: "WeakSet[Engine]" = WeakSet()
+
+
+def profile_engine(engine: Engine) -> None:
+    """ record statements of a sync engine (async_engine.sync_engine for async) into the current profile """
+    if engine in __profiled_engines:
+        return
+    __profiled_engines.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if current_profile.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, parameters, time.perf_counter() - conn.info["profile_started"].pop())
+
+
+class QueryProfilerMiddleware:
+    """ ASGI middleware attaching the query profile to profiled responses """
+
+    def __init__(self, app: ASGIApp, mode: str = "header") -> None:
+        self.app = app
+        self.mode = mode
+
+    def enabled(self, scope: Scope) -> bool:
+        if self.mode == "always":
+            return True
+
+        return any(name == PROFILE_HEADER and value == b"1" for name, value in scope["headers"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-Query-Profile", json.dumps(profile.summary(), separators=(",", ":")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
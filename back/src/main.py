@@ -1,16 +1,50 @@
 """
 main.py
 """
+from contextlib import asynccontextmanager
+
 from fastapi.applications import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException
 from .core.exception_handlers import http_exception_handler, validation_exception_handler
+from .core.database import Base, engine, async_engine, replica_engines
+from .core.keys import keys
+from .core.compression import CompressionMiddleware
+from .core.json import FastJSONResponse
+from .core.log import AccessLogMiddleware, configure_logging, shutdown_logging
+from .core.metrics import MetricsMiddleware, instrument_engine
+from .core.profiler import QueryProfilerMiddleware, profile_engine
+from .core.config import settings
+from .apps.auth.service.password import password_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ per worker startup and shutdown """
+    configure_logging(settings.log_level, settings.log_queue_size)
+    keys.load()
+
+    if settings.create_schema:
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    yield
+
+    password_pool.shutdown()
+    for replica in replica_engines:
+        await replica.dispose()
+    await async_engine.dispose()
+    engine.dispose()
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
     """ app factory method """
-    app = FastAPI()
+    # routes with a response model are serialized by Pydantic straight to bytes unless a default
+    # response class is set, which is faster than orjson over dumped models. see benchmarks.compression
+    options = {"default_response_class": FastJSONResponse} if settings.json_response == "orjson" else {}
+    app = FastAPI(lifespan=lifespan, **options)
 
     origins = [
         "http://localhost",
@@ -25,8 +59,36 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Query-Profile", "X-Request-ID"],
     )
 
+    encodings = [encoding.strip() for encoding in settings.compression_encodings.split(",") if encoding.strip()]
+    if encodings:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=encodings,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
+
+    if settings.log_access:
+        app.add_middleware(AccessLogMiddleware, sample_4xx=settings.log_4xx_sample_rate)
+
+    if settings.query_profiler != "off":
+        app.add_middleware(QueryProfilerMiddleware, mode=settings.query_profiler)
+        profile_engine(engine)
+        profile_engine(async_engine.sync_engine)
+        for replica in replica_engines:
+            profile_engine(replica.sync_engine)
+
+    app.add_middleware(MetricsMiddleware)
+
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    for index, replica in enumerate(replica_engines):
+        instrument_engine(replica.sync_engine, f"replica{index}")
+
     # app.add_exception_handler(HTTPException, http_exception_handler)
     # app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
@@ -0,0 +1,80 @@
+"""
+schema migrations
+
+``Base.metadata.create_all`` only creates missing tables, so changes to existing
+tables ship as numbered migration modules. Each module exposes ``version``,
+``description``, ``upgrade(connection)`` and ``downgrade(connection)``; applied
+versions are recorded in ``schema_migrations``. Migrations describe the tables
+and values they touch with their own snapshots, never with the live models,
+which keep changing after a migration has shipped.
+
+    python -m src.migrations upgrade
+    python -m src.migrations downgrade 0001
+"""
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, insert, delete
+from sqlalchemy.engine import Engine
+
+from . import m0001_index_rationalization, m0002_search_index_and_counters, m0003_shop_item_version, \
+    m0004_user_scope_mask, m0005_search_index_id, m0006_search_index_key
+
+MIGRATIONS = [
+    m0001_index_rationalization,
+    m0002_search_index_and_counters,
+    m0003_shop_item_version,
+    m0004_user_scope_mask,
+    m0005_search_index_id,
+    m0006_search_index_key,
+]
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(engine: Engine) -> List[str]:
+    schema_migrations.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        return list(connection.scalars(select(schema_migrations.c.version)))
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """ apply pending migrations in order, one transaction each """
+    applied = set(applied_versions(engine))
+    upgraded = []
+
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(version=migration.version, applied_at=datetime.now()))
+        upgraded.append(migration.version)
+
+    return upgraded
+
+
+def downgrade(engine: Engine, version: str) -> List[str]:
+    """ revert applied migrations newer than or equal to version, newest first """
+    applied = set(applied_versions(engine))
+    downgraded = []
+
+    for migration in reversed(MIGRATIONS):
+        if migration.version < version:
+            break
+        if migration.version not in applied:
+            continue
+
+        with engine.begin() as connection:
+            migration.downgrade(connection)
+            connection.execute(delete(schema_migrations).filter_by(version=migration.version))
+        downgraded.append(migration.version)
+
+    return downgraded
@@ -0,0 +1,28 @@
+import argparse
+
+from ..core.database import Base, engine
+from ..apps.auth.model.domain.user import UserDB  # noqa: F401  registers the tables for create_all
+from ..apps.shop.model.domain.shop_item import ShopItemDB  # noqa: F401
+from ..apps.shop.model.domain.shop_item_count import ShopItemCountDB  # noqa: F401
+from . import upgrade, downgrade
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("upgrade", help="apply pending migrations")
+    downgrade_parser = commands.add_parser("downgrade", help="revert migrations down to and including version")
+    downgrade_parser.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        Base.metadata.create_all(bind=engine)
+        versions = upgrade(engine)
+        print(f"upgraded: {', '.join(versions) or 'nothing to do'}")
+    else:
+        versions = downgrade(engine, args.version)
+        print(f"downgraded: {', '.join(versions) or 'nothing to do'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+0001 index rationalization
+
+Every ShopItemDB and UserDB column used to carry its own index, including the
+primary keys (a second index next to the primary key one), free text
+description and scopes, and the low cardinality disabled / permission flags.
+None of them served a query. The composite owner indexes on shop_item now
+cover get_all, the keyset seeks and export, get_one / update_one use the
+primary key, and users keeps only the unique email index used by sign-in.
+
+The tables are snapshots of the columns at this version, the live models
+move on with later migrations.
+"""
+from typing import List
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+version = "0001"
+description = "replace single column indexes with composite owner indexes"
+
+metadata = MetaData()
+
+shop_item = Table(
+    "shop_item", metadata,
+    Column("id", String, primary_key=True),
+    Column("name", String),
+    Column("description", String),
+    Column("price", Integer),
+    Column("owner_id", String),
+    Column("disabled", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_shop_item_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    Index("ix_shop_item_owner_id_price_id", "owner_id", "price", "id"),
+)
+
+users = Table(
+    "users", metadata,
+    Column("id", String, primary_key=True),
+    Column("username", String),
+    Column("full_name", String),
+    Column("disabled", Boolean),
+    Column("permission", Integer),
+    Column("scopes", String),
+    Column("created_at", String),
+    Column("updated_at", String),
+)
+
+REDUNDANT_INDEXES = {
+    shop_item: ["id", "name", "description", "price", "owner_id", "disabled", "created_at", "updated_at"],
+    users: ["id", "username", "full_name", "disabled", "permission", "scopes", "created_at", "updated_at"],
+}
+
+
+def _redundant_indexes() -> List[Index]:
+    # indexes are built on detached table copies so the snapshot metadata is left untouched
+    detached_metadata = MetaData()
+    indexes = []
+
+    for table, columns in REDUNDANT_INDEXES.items():
+        detached: Table = table.to_metadata(detached_metadata)
+        detached.indexes.clear()
+        indexes += [Index(f"ix_{table.name}_{column}", detached.c[column]) for column in columns]
+
+    return indexes
+
+
+def upgrade(connection: Connection) -> None:
+    for index in shop_item.indexes:
+        index.create(connection, checkfirst=True)
+
+    for index in _redundant_indexes():
+        index.drop(connection, checkfirst=True)
+
+
+def downgrade(connection: Connection) -> None:
+    for index in _redundant_indexes():
+        index.create(connection, checkfirst=True)
+
+    for index in shop_item.indexes:
+        index.drop(connection, checkfirst=True)
@@ -0,0 +1,80 @@
+"""
+0002 search index and shop item counters
+
+Databases created before the search index and the per owner counters have
+neither the FTS5 table / GIN index nor populated shop_item_count rows, since
+create_all does not touch existing tables. This creates the search index,
+fills it, and recounts every owner.
+
+Tables and statements are snapshots as of this version, the live models and
+services move on with later migrations.
+"""
+from sqlalchemy import DDL, Column, ForeignKey, Integer, MetaData, String, Table, case, column, delete, func, \
+    insert, select, table, text
+from sqlalchemy.engine import Connection
+
+version = "0002"
+description = "create and fill the search index, backfill shop item counters"
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", String, primary_key=True))
+
+shop_item_count = Table(
+    "shop_item_count", metadata,
+    Column("owner_id", String, ForeignKey("users.id"), primary_key=True, comment="Owner id"),
+    Column("item_count", Integer, nullable=False, default=0, server_default="0", comment="Number of items"),
+    Column(
+        "disabled_count", Integer, nullable=False, default=0, server_default="0", comment="Number of disabled items"
+    ),
+)
+
+shop_item = table("shop_item", column("owner_id"), column("disabled"))
+
+RECOUNT_STATEMENT = insert(shop_item_count).from_select(
+    ["owner_id", "item_count", "disabled_count"],
+    select(
+        shop_item.c.owner_id,
+        func.count(),
+        func.coalesce(func.sum(case((shop_item.c.disabled.is_(True), 1), else_=0)), 0),
+    ).group_by(shop_item.c.owner_id),
+)
+
+SEARCH_INDEX_DDL = DDL(
+    "CREATE INDEX IF NOT EXISTS ix_shop_item_search ON shop_item USING GIN "
+    "(to_tsvector('simple', coalesce(shop_item.name, '') || ' ' || coalesce(shop_item.description, '')))"
+)
+
+# the rowid keyed FTS5 table as this version shipped it, 0005 rebuilds it keyed on id
+SEARCH_FTS_DDL = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS shop_item_fts "
+    "USING fts5(name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+)
+FTS_REBUILD_STATEMENTS = (
+    text("DELETE FROM shop_item_fts"),
+    text("INSERT INTO shop_item_fts (rowid, name, description) SELECT rowid, name, description FROM shop_item"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        connection.execute(SEARCH_FTS_DDL)
+        for statement in FTS_REBUILD_STATEMENTS:
+            connection.execute(statement)
+    elif dialect == "postgresql":
+        connection.execute(SEARCH_INDEX_DDL)
+
+    shop_item_count.create(connection, checkfirst=True)
+    connection.execute(delete(shop_item_count))
+    connection.execute(RECOUNT_STATEMENT)
+
+
+def downgrade(connection: Connection) -> None:
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        connection.execute(DDL("DROP TABLE IF EXISTS shop_item_fts"))
+    elif dialect == "postgresql":
+        connection.execute(DDL("DROP INDEX IF EXISTS ix_shop_item_search"))
@@ -0,0 +1,24 @@
+"""
+0003 shop item version
+
+Adds the row version behind the shop item ETag. Existing rows start at 1.
+"""
+from sqlalchemy import DDL, inspect
+from sqlalchemy.engine import Connection
+
+version = "0003"
+description = "add shop_item.version"
+
+
+def _has_version(connection: Connection) -> bool:
+    return "version" in {column["name"] for column in inspect(connection).get_columns("shop_item")}
+
+
+def upgrade(connection: Connection) -> None:
+    if not _has_version(connection):
+        connection.execute(DDL("ALTER TABLE shop_item ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def downgrade(connection: Connection) -> None:
+    if _has_version(connection):
+        connection.execute(DDL("ALTER TABLE shop_item DROP COLUMN version"))
@@ -0,0 +1,87 @@
+"""
+0004 user scope mask
+
+Replaces the comma joined users.scopes string with the integer
+users.scope_mask (see apps.auth.scopes). Masks are backfilled with one
+UPDATE per distinct scopes string, there are only a handful of them.
+
+The scope bits are a snapshot of SupportScopes at this version, so the
+conversion does not change when scopes are added later.
+"""
+from typing import Iterable
+
+from sqlalchemy import DDL, MetaData, Table, column, inspect, select, table, update
+from sqlalchemy.engine import Connection
+
+version = "0004"
+description = "replace users.scopes with users.scope_mask"
+
+SPLITER = ","
+
+SCOPE_BITS = {
+    scope: 1 << bit for bit, scope in enumerate([
+        "user:read:own", "user:write:own", "user:delete:own", "user:update:own",
+        "user:read:all", "user:write:all", "user:delete:all", "user:update:all",
+        "product:read:own", "product:write:own", "product:delete:own", "product:update:own",
+        "product:read:all", "product:write:all", "product:delete:all", "product:update:all",
+        "order:read:own", "order:write:own", "order:delete:own", "order:update:own",
+        "order:read:all", "order:write:all", "order:delete:all", "order:update:all",
+    ])
+}
+
+users = table("users", column("scopes"), column("scope_mask"))
+
+
+def scopes_to_mask(scopes: Iterable[str]) -> int:
+    mask = 0
+    for scope in scopes:
+        mask |= SCOPE_BITS.get(scope, 0)
+    return mask
+
+
+def mask_to_scopes(mask: int) -> str:
+    return SPLITER.join(scope for scope, bit in SCOPE_BITS.items() if mask & bit)
+
+
+def _columns(connection: Connection) -> set:
+    return {info["name"] for info in inspect(connection).get_columns("users")}
+
+
+def _drop_scopes_index(connection: Connection) -> None:
+    # an index on scopes left by create_all and not removed by 0001, SQLite can not drop an indexed column
+    reflected = Table("users", MetaData(), autoload_with=connection)
+    for index in reflected.indexes:
+        if [indexed.name for indexed in index.columns] == ["scopes"]:
+            index.drop(connection)
+
+
+def upgrade(connection: Connection) -> None:
+    columns = _columns(connection)
+
+    if "scope_mask" not in columns:
+        connection.execute(DDL("ALTER TABLE users ADD COLUMN scope_mask INTEGER NOT NULL DEFAULT 0"))
+
+    if "scopes" in columns:
+        for scopes in connection.scalars(select(users.c.scopes).distinct()).all():
+            connection.execute(
+                update(users).where(users.c.scopes == scopes)
+                .values(scope_mask=scopes_to_mask((scopes or "").split(SPLITER)))
+            )
+
+        _drop_scopes_index(connection)
+        connection.execute(DDL("ALTER TABLE users DROP COLUMN scopes"))
+
+
+def downgrade(connection: Connection) -> None:
+    columns = _columns(connection)
+
+    if "scopes" not in columns:
+        connection.execute(DDL("ALTER TABLE users ADD COLUMN scopes VARCHAR NOT NULL DEFAULT ''"))
+
+    if "scope_mask" in columns:
+        for scope_mask in connection.scalars(select(users.c.scope_mask).distinct()).all():
+            connection.execute(
+                update(users).where(users.c.scope_mask == scope_mask).values(scopes=mask_to_scopes(scope_mask))
+            )
+
+        connection.execute(DDL("ALTER TABLE users DROP COLUMN scope_mask"))
@@ -0,0 +1,46 @@
+"""
+0005 search index keyed on id
+
+The SQLite FTS5 table from 0002 was keyed on the implicit rowid of
+shop_item, which has a String primary key, so VACUUM may renumber the rows
+and leave the index pointing at other items. This recreates the table with
+the shop_item id in an UNINDEXED column and refills it. PostgreSQL indexes
+shop_item itself and is left alone.
+"""
+from sqlalchemy import DDL, text
+from sqlalchemy.engine import Connection
+
+version = "0005"
+description = "key the sqlite search index on shop_item.id"
+
+DROP_FTS = DDL("DROP TABLE IF EXISTS shop_item_fts")
+
+UPGRADE_STATEMENTS = (
+    DROP_FTS,
+    DDL(
+        "CREATE VIRTUAL TABLE shop_item_fts "
+        "USING fts5(id UNINDEXED, name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ),
+    text("INSERT INTO shop_item_fts (id, name, description) SELECT id, name, description FROM shop_item"),
+)
+
+DOWNGRADE_STATEMENTS = (
+    DROP_FTS,
+    DDL(
+        "CREATE VIRTUAL TABLE shop_item_fts "
+        "USING fts5(name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ),
+    text("INSERT INTO shop_item_fts (rowid, name, description) SELECT rowid, name, description FROM shop_item"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in UPGRADE_STATEMENTS:
+            connection.execute(statement)
+
+
+def downgrade(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in DOWNGRADE_STATEMENTS:
+            connection.execute(statement)
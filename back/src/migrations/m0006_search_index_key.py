@@ -0,0 +1,56 @@
+"""
+0006 search index keyed on an integer
+
+The FTS5 table from 0005 kept the shop_item id in an UNINDEXED column, so
+every index update scanned the whole index to delete the old rows. FTS5 only
+looks rows up by rowid, so this hands out an INTEGER PRIMARY KEY per shop_item
+id in shop_item_search_key, stable across VACUUM, and keys the FTS5 rows on it.
+PostgreSQL indexes shop_item itself and is left alone.
+"""
+from sqlalchemy import DDL, text
+from sqlalchemy.engine import Connection
+
+version = "0006"
+description = "key the sqlite search index on an integer per shop_item"
+
+DROP_FTS = DDL("DROP TABLE IF EXISTS shop_item_fts")
+
+UPGRADE_STATEMENTS = (
+    DROP_FTS,
+    DDL(
+        "CREATE TABLE IF NOT EXISTS shop_item_search_key "
+        "(key INTEGER PRIMARY KEY, shop_item_id VARCHAR NOT NULL UNIQUE)"
+    ),
+    DDL(
+        "CREATE VIRTUAL TABLE shop_item_fts "
+        "USING fts5(name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ),
+    text("INSERT OR IGNORE INTO shop_item_search_key (shop_item_id) SELECT id FROM shop_item"),
+    text(
+        "INSERT INTO shop_item_fts (rowid, name, description) "
+        "SELECT shop_item_search_key.key, shop_item.name, shop_item.description "
+        "FROM shop_item JOIN shop_item_search_key ON shop_item_search_key.shop_item_id = shop_item.id"
+    ),
+)
+
+DOWNGRADE_STATEMENTS = (
+    DROP_FTS,
+    DDL("DROP TABLE IF EXISTS shop_item_search_key"),
+    DDL(
+        "CREATE VIRTUAL TABLE shop_item_fts "
+        "USING fts5(id UNINDEXED, name, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ),
+    text("INSERT INTO shop_item_fts (id, name, description) SELECT id, name, description FROM shop_item"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in UPGRADE_STATEMENTS:
+            connection.execute(statement)
+
+
+def downgrade(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in DOWNGRADE_STATEMENTS:
+            connection.execute(statement)
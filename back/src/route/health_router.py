@@ -2,7 +2,13 @@
 Health Check router
 """
 from typing import Dict
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRouter
+from starlette import status
+
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.health import readiness
 
 health_router = APIRouter()
 
@@ -11,3 +17,25 @@ health_router = APIRouter()
 async def health_check() -> Dict[str, str]:
     """ health check """
     return {"status": "up"}
+
+
+@health_router.get("/live")
+async def liveness() -> Dict[str, str]:
+    """ the process serves requests, no dependency is checked """
+    return {"status": "up"}
+
+
+@health_router.get("/ready")
+async def ready() -> JSONResponse:
+    """
+    the worker can take traffic: the database pool is not saturated and answers
+    SELECT 1 within HEALTH_PROBE_TIMEOUT. 503 otherwise
+    """
+    report = await readiness(
+        async_engine,
+        timeout=settings.health_probe_timeout,
+        max_saturation=settings.health_max_pool_saturation,
+    )
+    status_code = status.HTTP_200_OK if report["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(report, status_code=status_code)
+
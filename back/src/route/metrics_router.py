@@ -0,0 +1,16 @@
+"""
+Metrics router
+"""
+from fastapi.responses import Response
+from fastapi.routing import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..core.metrics import registry
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("", response_class=Response)
+async def metrics() -> Response:
+    """ Prometheus text exposition of the request and database metrics """
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
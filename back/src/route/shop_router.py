@@ -1,20 +1,30 @@
 """
 Shop Router
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any, Tuple, Type
+from pydantic import BaseModel, ValidationError
 from starlette import status
+from fastapi.exceptions import HTTPException
 from fastapi.routing import APIRouter
-from fastapi.param_functions import Depends, Path, Security
+from fastapi.param_functions import Body, Depends, Path, Security, Query, Header
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import Request
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..apps.shop.model.schema.shop_item import ShopItemResponse, ShopItemCreateRequest, ShopItemCountResponse, \
-    ShopItemUpdateRequest
+    ShopItemUpdateRequest, ShopItemBulkUpdateRequest, ShopItemBulkResponse, ShopItemBulkError, ShopItemImportResponse, \
+    ShopItemSlimResponse
 from ..apps.auth.service.user import get_current_active_user, get_current_user
-from ..core.database import get_database_session
+from ..core.database import get_async_database_session, get_async_read_session, use_primary
 from ..apps.auth.constants import SupportScopes
 from ..apps.auth.model.domain.user import User
+from ..apps.shop.constants import ShopItemOrder, CatalogFormat
+from ..apps.shop.exceptions import TooManyRowsException, ShopItemNotFoundException
 from ..apps.shop.service import shop as services
+from ..apps.shop.service import catalog
+from ..apps.shop.service import search
+from ..apps.shop.service.response_cache import response_cache
 from ..core.config import settings
 from .. import check_uuid
 
@@ -34,6 +44,49 @@ __updatable_user = Security(get_current_active_user, scopes=[SupportScopes.SHOP_
 __deletable_user = Security(get_current_active_user, scopes=[SupportScopes.SHOP_USER_DELETE])
 
 
+def __validate_bulk_rows(
+        rows: List[Dict[str, Any]],
+        model: Type[BaseModel],
+) -> Tuple[List[int], List[BaseModel], List[ShopItemBulkError]]:
+    """ validate rows one by one so one bad row does not reject the batch """
+    if len(rows) > settings.shop_item_bulk_max_rows:
+        raise TooManyRowsException
+
+    indexes, requests, errors = [], [], []
+    for index, row in enumerate(rows):
+        try:
+            requests.append(model.model_validate(row))
+            indexes.append(index)
+        except (ValidationError, HTTPException) as err:
+            errors.append(ShopItemBulkError(index=index, detail=services.row_error_detail(err)))
+
+    return indexes, requests, errors
+
+
+async def __cache_fill_session(db: AsyncSession) -> AsyncSession:
+    """ read session for a response cache miss, on the primary when the response is kept """
+    if response_cache.stores:
+        await use_primary(db)
+    return db
+
+
+def __bulk_response(
+        size: int,
+        indexes: List[int],
+        ids: List[Optional[str]],
+        write_errors: Dict[int, str],
+        errors: List[ShopItemBulkError],
+) -> ShopItemBulkResponse:
+    response_ids: List[Optional[str]] = [None] * size
+    for position, index in enumerate(indexes):
+        response_ids[index] = ids[position]
+
+    errors += [ShopItemBulkError(index=indexes[position], detail=detail) for position, detail in write_errors.items()]
+    errors.sort(key=lambda error: error.index)
+
+    return ShopItemBulkResponse(ids=response_ids, errors=errors)
+
+
 @shop_router.post(
     "/",
     response_model=ShopItemCreateRequest,
@@ -41,13 +94,13 @@ __deletable_user = Security(get_current_active_user, scopes=[SupportScopes.SHOP_
 )
 async def create_shop_item(
         shop_item: ShopItemCreateRequest,
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_database_session),
         current_user: User = __creatable_user,
 ) -> ShopItemResponse:
     """
     Create a new ShopItem
     """
-    shop_item = services.create_one(
+    shop_item = await services.create_one(
         db=db,
         shop_item=shop_item,
         owner_id=current_user.id,
@@ -56,54 +109,182 @@ async def create_shop_item(
     return ShopItemResponse.from_orm(shop_item)
 
 
+@shop_router.post(
+    "/bulk",
+    response_model=ShopItemBulkResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_shop_items(
+        rows: List[Dict[str, Any]] = Body(..., description="ShopItemCreateRequest rows"),
+        db: AsyncSession = Depends(get_async_database_session),
+        current_user: User = __creatable_user,
+) -> ShopItemBulkResponse:
+    """
+    Create many ShopItems, errors are reported per row
+    """
+    indexes, shop_items, errors = __validate_bulk_rows(rows, ShopItemCreateRequest)
+
+    ids, write_errors = await services.create_many(
+        db=db,
+        shop_items=shop_items,
+        owner_id=current_user.id,
+        chunk_size=settings.shop_item_bulk_chunk_size,
+    )
+    return __bulk_response(len(rows), indexes, ids, write_errors, errors)
+
+
+@shop_router.patch(
+    "/bulk",
+    response_model=ShopItemBulkResponse,
+    status_code=status.HTTP_200_OK
+)
+async def update_shop_items(
+        rows: List[Dict[str, Any]] = Body(..., description="ShopItemBulkUpdateRequest rows"),
+        db: AsyncSession = Depends(get_async_database_session),
+        current_user: User = __updatable_user,
+) -> ShopItemBulkResponse:
+    """
+    Update many ShopItems by ID, errors are reported per row
+    """
+    indexes, update_requests, errors = __validate_bulk_rows(rows, ShopItemBulkUpdateRequest)
+
+    ids, write_errors = await services.update_many(
+        db=db,
+        update_requests=update_requests,
+        owner_id=current_user.id,
+        chunk_size=settings.shop_item_bulk_chunk_size,
+    )
+    return __bulk_response(len(rows), indexes, ids, write_errors, errors)
+
+
+@shop_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK
+)
+async def export_shop_items(
+        current_user: User = __readable_user,
+        format: CatalogFormat = CatalogFormat.NDJSON,
+) -> StreamingResponse:
+    """
+    Stream all ShopItems as NDJSON or CSV
+    """
+    return StreamingResponse(
+        catalog.export_rows(
+            owner_id=current_user.id,
+            catalog_format=format,
+            chunk_size=settings.shop_item_bulk_chunk_size,
+        ),
+        media_type=catalog.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="shop_items.{format.value}"'},
+    )
+
+
+@shop_router.post(
+    "/import",
+    response_model=ShopItemImportResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def import_shop_items(
+        request: Request,
+        db: AsyncSession = Depends(get_async_database_session),
+        current_user: User = __creatable_user,
+        format: CatalogFormat = CatalogFormat.NDJSON,
+) -> ShopItemImportResponse:
+    """
+    Create ShopItems from an NDJSON or CSV request body, read as it arrives
+    """
+    return await catalog.import_rows(
+        db=db,
+        stream=request.stream(),
+        catalog_format=format,
+        owner_id=current_user.id,
+        chunk_size=settings.shop_item_bulk_chunk_size,
+        max_errors=settings.shop_item_import_max_errors,
+    )
+
+
 @shop_router.get(
     "/",
-    response_model=List[ShopItemResponse],
+    response_model=List[ShopItemSlimResponse],
     status_code=status.HTTP_200_OK
 )
 async def get_shop_items(
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_read_session),
         current_user: User = __readable_user,
         limit: int = settings.shop_item_default_limit,
         page: int = settings.shop_item_default_page,
-) -> List[ShopItemResponse]:
+        cursor: Optional[str] = Query(
+            None,
+            description="Keyset pagination cursor from X-Next-Cursor, empty for the first page. Overrides page",
+        ),
+        order: ShopItemOrder = ShopItemOrder.CREATED_AT,
+        fields: Optional[str] = Query(
+            None,
+            description="Comma separated fields to return, e.g. name,price. id is always returned. Default all fields",
+        ),
+) -> Response:
     """
     Get all ShopItems
+
+    The cursor of the following page is returned in the X-Next-Cursor header.
+    With fields only those columns are read and returned, listing grids can leave out description
     """
+    response_fields = services.parse_fields(fields)
 
-    shop_items = services.get_all(
-        db=db,
-        owner_id=current_user.id,
-        limit=limit,
-        page=page,
-    )
-    response = [ShopItemResponse.from_orm(shop_item) for shop_item in shop_items]
-    return response
+    key = await response_cache.key(current_user.id, "list", {
+        "limit": str(limit),
+        "page": str(page) if cursor is None else None,
+        "cursor": cursor,
+        "order": order.value,
+        "fields": ",".join(response_fields),
+    })
+    cached = await response_cache.get(key)
+
+    if cached is None:
+        body, next_cursor = await services.get_page_json(
+            db=await __cache_fill_session(db),
+            owner_id=current_user.id,
+            limit=limit,
+            page=page,
+            cursor=cursor,
+            order=order,
+            fields=response_fields,
+        )
+        cached = (body, {"X-Next-Cursor": next_cursor} if next_cursor else {})
+        await response_cache.set(key, *cached)
+
+    body, headers = cached
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @shop_router.get(
-    '/{shop_item_id}',
-    response_model=ShopItemResponse,
+    '/search',
+    response_model=List[ShopItemResponse],
     status_code=status.HTTP_200_OK
 )
-async def get_shop_item(
-        shop_item_id: str = __valid_id,
-        db: Session = Depends(get_database_session),
+async def search_shop_items(
+        q: str = Query(..., min_length=1, max_length=200, description="Search terms, each prefix matched"),
+        db: AsyncSession = Depends(get_async_read_session),
         current_user: User = __readable_user,
-) -> ShopItemResponse:
+        limit: int = settings.shop_item_default_limit,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        disabled: Optional[bool] = None,
+) -> List[ShopItemResponse]:
     """
-    Get a ShopItem by ID
+    Search ShopItems by name and description, best matches first
     """
-    check = check_uuid(shop_item_id)
-    if not check:
-        raise ValueError(f"ShopItem with ID {shop_item_id} not found")
-
-    shop_item = services.get_one(
+    shop_items = await search.search(
         db=db,
-        shop_item_id=shop_item_id,
         owner_id=current_user.id,
+        query=q,
+        limit=limit,
+        min_price=min_price,
+        max_price=max_price,
+        disabled=disabled,
     )
-    return ShopItemResponse.from_orm(shop_item)
+    return [ShopItemResponse.from_orm(shop_item) for shop_item in shop_items]
 
 
 @shop_router.get(
@@ -112,21 +293,65 @@ async def get_shop_item(
     status_code=status.HTTP_200_OK
 )
 async def count_shop_items(
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_read_session),
         current_user: User = __readable_user,
+        limit: int = settings.shop_item_default_limit,
 ) -> ShopItemCountResponse:
     """
     Count all ShopItems and pages
     """
-    count, pages = services.count(
+    count, pages = await services.count(
         db=db,
         owner_id=current_user.id,
+        limit=limit,
     )
     return ShopItemCountResponse(
         count=count,
+        pages=pages,
     )
 
 
+@shop_router.get(
+    '/{shop_item_id}',
+    response_model=ShopItemResponse,
+    status_code=status.HTTP_200_OK
+)
+async def get_shop_item(
+        shop_item_id: str = __valid_id,
+        db: AsyncSession = Depends(get_async_read_session),
+        current_user: User = __readable_user,
+        if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    Get a ShopItem by ID
+
+    The row version is returned as a strong ETag, a matching If-None-Match gets 304 Not Modified
+    """
+    check = check_uuid(shop_item_id)
+    if not check:
+        raise ShopItemNotFoundException
+
+    key = await response_cache.key(current_user.id, f"item/{shop_item_id}", {})
+    cached = await response_cache.get(key)
+
+    if cached is None:
+        shop_item = await services.get_one(
+            db=await __cache_fill_session(db),
+            shop_item_id=shop_item_id,
+            owner_id=current_user.id,
+        )
+        cached = (ShopItemResponse.from_orm(shop_item).model_dump_json().encode(), {"ETag": services.etag(shop_item)})
+        await response_cache.set(key, *cached)
+
+    body, headers = cached
+    if if_none_match is not None:
+        versions = services.etag_versions(if_none_match, weak=True)
+        if versions is None or services.etag_versions(headers["ETag"]) <= versions:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @shop_router.patch(
     '/{shop_item_id}',
     response_model=ShopItemResponse,
@@ -134,30 +359,28 @@ async def count_shop_items(
 )
 async def update_shop_item(
         update_request: ShopItemUpdateRequest,
-        db: Session = Depends(get_database_session),
+        response: Response,
+        db: AsyncSession = Depends(get_async_database_session),
         shop_item_id: str = __valid_id,
         current_user: User = __updatable_user,
+        if_match: Optional[str] = Header(default=None),
 ) -> ShopItemResponse:
     """
     Update a ShopItem by ID
+
+    With If-Match the update only applies to the listed ETags, otherwise 412 Precondition Failed
     """
     check = check_uuid(shop_item_id)
     if not check:
-        raise ValueError(f"ShopItem with ID {shop_item_id} not found")
+        raise ShopItemNotFoundException
 
-    shop_item_check = services.get_one(
-        db=db,
-        shop_item_id=shop_item_id,
-        owner_id=current_user.id,
-    )
-
-    if shop_item_check.disabled:
-        raise ValueError(f"ShopItem with ID {shop_item_id} is disabled")
-
-    shop_item = services.update_one(
+    shop_item = await services.update_one(
         db=db,
         shop_item_id=shop_item_id,
         owner_id=current_user.id,
         update_request=update_request,
+        versions=services.etag_versions(if_match) if if_match is not None else None,
     )
+
+    response.headers["ETag"] = services.etag(shop_item)
     return ShopItemResponse.from_orm(shop_item)
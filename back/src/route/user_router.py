@@ -5,7 +5,7 @@ from fastapi import status
 from fastapi.param_functions import Depends
 from fastapi.routing import APIRouter
 from fastapi.exceptions import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
 from ..apps.auth.model.domain.user import User
@@ -14,7 +14,7 @@ from ..apps.auth.service.user import create_user
 from ..apps.auth.service.auth import authenticate_user
 from ..apps.auth.service.token import create_access_token
 
-from ..core.database import get_database_session
+from ..core.database import get_async_database_session
 
 from ..apps.auth.service.user import get_current_active_user
 
@@ -29,7 +29,7 @@ user_router = APIRouter()
 )
 async def add_user(
         user_create_request: UserCreateRequest,
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_database_session),
 ) -> UserCreatedResponse:
     """ Add User """
     try:
@@ -42,6 +42,8 @@ async def add_user(
         )
         user_created_response: UserCreatedResponse = UserCreatedResponse.from_orm(new_user)
         return user_created_response
+    except HTTPException:
+        raise
     except ValueError as err:
         raise HTTPException(
             status_code=400,
@@ -62,7 +64,7 @@ async def add_user(
 )
 async def sign_in(
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_database_session),
+        db: AsyncSession = Depends(get_async_database_session),
 ) -> UserSignInResponse:
     try:
         user = await authenticate_user(
@@ -88,6 +90,8 @@ async def sign_in(
         )
 
         return signin_response
+    except HTTPException:
+        raise
     except ValueError as err:
         raise HTTPException(
             status_code=400,
@@ -0,0 +1,51 @@
+"""
+tests
+
+Settings are read from the environment when ``src`` is imported. The defaults
+below let the unit tests run without a ``.env``, against a throwaway SQLite
+database, a freshly generated RSA key pair and the in-process cache backends.
+Variables already set in the environment win.
+"""
+import os
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+_workdir = tempfile.mkdtemp(prefix="shop-tests-")
+
+if "PRIVATE_KEY" not in os.environ:
+    _private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    with open(os.path.join(_workdir, "private.pem"), "wb") as f:
+        f.write(_private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+
+    with open(os.path.join(_workdir, "public.pem"), "wb") as f:
+        f.write(_private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+
+for _name, _value in {
+    "DATABASE": "test",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    "POOL_SIZE": "5",
+    "POOL_TIMEOUT": "30",
+    "POOL_RECYCLE": "3600",
+    "ECHO": "false",
+    "API_VERSION_PREFIX": "/api/v1",
+    "JWT_ALGORITHM": "RS256",
+    "ACCESS_TOKEN_EXPIRE_SECONDS": "3600",
+    "USER_REPOSITORY_PATH": _workdir,
+    "PRIVATE_KEY": os.path.join(_workdir, "private.pem"),
+    "PUBLIC_KEY": os.path.join(_workdir, "public.pem"),
+    "SHOP_ITEM_DEFAULT_LIMIT": "10",
+    "SHOP_ITEM_DEFAULT_PAGE": "1",
+    "PRINCIPAL_CACHE_BACKEND": "local",
+    "PRINCIPAL_CACHE_BY_TOKEN": "false",
+}.items():
+    os.environ.setdefault(_name, _value)
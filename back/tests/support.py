@@ -0,0 +1,83 @@
+"""
+test cases running against the throwaway SQLite database of the test settings
+
+``DatabaseTestCase`` empties every table before each test. ``ApiTestCase``
+adds an ASGI client for the app and ``sign_in``, which stores a user and
+issues its access token directly, skipping bcrypt.
+"""
+import unittest
+from datetime import datetime
+from typing import Dict
+
+import httpx
+from sqlalchemy import delete, insert, text
+
+from src.asgi import app
+from src.core.config import settings
+from src.core.database import Base, engine, async_engine, replica_engines
+from src.apps.auth.constants import UserPermission
+from src.apps.auth.model.domain.user import UserDB
+from src.apps.auth.scopes import mask_to_scopes, permission_scope_mask
+from src.apps.auth.service.principal import principal_cache
+from src.apps.auth.service.token import create_access_token, verified_token_cache
+from src.apps.shop.model.domain.shop_item import SEARCH_FTS_TABLE, SEARCH_KEY_TABLE
+from src.apps.shop.service.response_cache import response_cache
+from src import get_new_id
+
+PREFIX = settings.api_version_prefix
+
+Base.metadata.create_all(bind=engine)
+
+
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """ empty tables and caches for every test """
+
+    async def asyncSetUp(self) -> None:
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(delete(table))
+            connection.execute(text(f"DELETE FROM {SEARCH_FTS_TABLE}"))
+            connection.execute(text(f"DELETE FROM {SEARCH_KEY_TABLE}"))
+
+        for cache in (principal_cache.backend, response_cache.backend, verified_token_cache):
+            await cache.clear()
+
+    async def asyncTearDown(self) -> None:
+        # pooled asyncio connections belong to this test's event loop
+        for replica in replica_engines:
+            await replica.dispose()
+        await async_engine.dispose()
+
+
+class ApiTestCase(DatabaseTestCase):
+    """ DatabaseTestCase with an ASGI client, urls are relative to the api prefix """
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=f"http://test{PREFIX}")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.aclose()
+        await super().asyncTearDown()
+
+    async def sign_in(self, email: str = "user@example.com", permission: int = UserPermission.NORMAL) -> Dict[str, str]:
+        """ store a user and return the auth headers of a fresh access token """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        scope_mask = permission_scope_mask(permission)
+        user_id = get_new_id()
+
+        with engine.begin() as connection:
+            connection.execute(insert(UserDB).values(
+                id=user_id,
+                username=email.split("@")[0],
+                email=email,
+                full_name=email,
+                permission=permission,
+                scope_mask=scope_mask,
+                created_at=now,
+                updated_at=now,
+            ))
+
+        self.user_id = user_id
+        token, _ = await create_access_token(user_id, list(mask_to_scopes(scope_mask)))
+        return {"Authorization": f"Bearer {token}"}
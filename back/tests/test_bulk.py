@@ -0,0 +1,165 @@
+"""
+bulk create and bulk update of shop items, errors reported per row
+"""
+from unittest import mock
+
+from sqlalchemy import select
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal, engine
+from src.apps.shop.model.domain.shop_item import ShopItemDB
+from src.apps.shop.model.schema.shop_item import ShopItemCreateRequest, PRICE_MAX
+from src.apps.shop.service import shop
+
+from .support import ApiTestCase, DatabaseTestCase
+
+
+def row(name: str, price: int = 10, **fields) -> dict:
+    return {"name": name, "description": f"{name} description", "price": price, **fields}
+
+
+def stored(*shop_item_ids: str) -> dict:
+    with engine.connect() as connection:
+        return {
+            shop_item.id: shop_item
+            for shop_item in connection.execute(select(ShopItemDB).where(ShopItemDB.id.in_(shop_item_ids)))
+        }
+
+
+class BulkCreateTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+
+    async def test_ids_are_aligned_with_the_rows(self):
+        response = await self.client.post("/shop/bulk", json=[row("a"), row("b"), row("c")], headers=self.headers)
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["errors"], [])
+        self.assertEqual([stored(shop_item_id)[shop_item_id].name for shop_item_id in body["ids"]], ["a", "b", "c"])
+
+    async def test_invalid_rows_are_reported_and_the_rest_created(self):
+        rows = [
+            row("ok"),
+            row("negative", price=-1),
+            {"name": "no price", "description": ""},
+            row("too expensive", price=10 ** 30),
+            row("max", price=PRICE_MAX),
+        ]
+
+        response = await self.client.post("/shop/bulk", json=rows, headers=self.headers)
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([error["index"] for error in body["errors"]], [1, 2, 3])
+        self.assertIn("greater than or equal to 0", body["errors"][0]["detail"])
+        self.assertIn("price", body["errors"][1]["detail"])
+        self.assertIn(f"less than or equal to {PRICE_MAX}", body["errors"][2]["detail"])
+        self.assertEqual([shop_item_id is not None for shop_item_id in body["ids"]], [True, False, False, False, True])
+
+        count = await self.client.get("/shop/count", headers=self.headers)
+        self.assertEqual(count.json()["count"], 2)
+
+    async def test_too_many_rows(self):
+        with mock.patch.object(settings, "shop_item_bulk_max_rows", 2):
+            response = await self.client.post("/shop/bulk", json=[row("a"), row("b"), row("c")], headers=self.headers)
+
+        self.assertEqual(response.status_code, 413)
+
+    async def test_created_rows_are_listed(self):
+        # a cached empty page must not outlive the bulk write
+        await self.client.get("/shop/", headers=self.headers)
+
+        await self.client.post("/shop/bulk", json=[row("a"), row("b")], headers=self.headers)
+
+        response = await self.client.get("/shop/", headers=self.headers)
+        self.assertEqual(sorted(shop_item["name"] for shop_item in response.json()), ["a", "b"])
+
+
+class BulkUpdateTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+        response = await self.client.post("/shop/bulk", json=[row("a"), row("b"), row("c")], headers=self.headers)
+        self.ids = response.json()["ids"]
+
+    async def test_updates_rows_by_id(self):
+        response = await self.client.patch("/shop/bulk", json=[
+            {"id": self.ids[0], "price": 20},
+            {"id": self.ids[1], "name": "renamed"},
+        ], headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ids": self.ids[:2], "errors": []})
+        items = stored(*self.ids)
+        self.assertEqual((items[self.ids[0]].price, items[self.ids[0]].name), (20, "a"))
+        self.assertEqual((items[self.ids[1]].price, items[self.ids[1]].name), (10, "renamed"))
+        self.assertEqual(items[self.ids[2]].version, 1)
+
+    async def test_missing_disabled_and_invalid_rows_are_reported(self):
+        await self.client.patch(f"/shop/{self.ids[2]}", json={"disabled": True}, headers=self.headers)
+
+        response = await self.client.patch("/shop/bulk", json=[
+            {"id": self.ids[0], "price": 30},
+            {"id": "4f0e5a5e-0000-4000-8000-000000000000", "price": 1},
+            {"id": self.ids[2], "price": 1},
+            {"id": self.ids[1], "price": -5},
+            {"price": 1},
+        ], headers=self.headers)
+
+        body = response.json()
+        self.assertEqual(body["ids"], [self.ids[0], None, None, None, None])
+        self.assertEqual([error["index"] for error in body["errors"]], [1, 2, 3, 4])
+        self.assertIn("not found", body["errors"][0]["detail"])
+        self.assertIn("disabled", body["errors"][1]["detail"])
+
+    async def test_repeated_id_is_bumped_once_per_row(self):
+        response = await self.client.patch("/shop/bulk", json=[
+            {"id": self.ids[0], "price": 1},
+            {"id": self.ids[0], "price": 2},
+        ], headers=self.headers)
+
+        self.assertEqual(response.json()["errors"], [])
+        shop_item = stored(self.ids[0])[self.ids[0]]
+        self.assertEqual((shop_item.price, shop_item.version), (2, 3))
+
+    async def test_disabling_adjusts_the_counters(self):
+        await self.client.patch("/shop/bulk", json=[
+            {"id": self.ids[0], "disabled": True},
+            {"id": self.ids[1], "disabled": True},
+        ], headers=self.headers)
+
+        async with AsyncSessionLocal() as db:
+            self.assertEqual(await shop.counter.get(db, self.user_id), (3, 2))
+
+
+class WriteChunkTest(DatabaseTestCase):
+
+    async def test_rows_the_driver_rejects_fall_back_to_row_errors(self):
+        # skips validation, like a value the schema bounds would miss
+        rows = [
+            ShopItemCreateRequest(name="ok", description="", price=1),
+            ShopItemCreateRequest.model_construct(name="overflow", description="", price=10 ** 30, disabled=False),
+            ShopItemCreateRequest(name="also ok", description="", price=2),
+        ]
+
+        async with AsyncSessionLocal() as db:
+            ids, errors = await shop.create_many(db, rows, "owner", chunk_size=10)
+            item_count, _ = await shop.counter.get(db, "owner")
+
+        self.assertEqual(list(errors), [1])
+        self.assertIn("too large", errors[1])
+        self.assertEqual([shop_item_id is not None for shop_item_id in ids], [True, False, True])
+        self.assertEqual(item_count, 2)
+
+    async def test_a_single_bad_row_is_reported(self):
+        rows = [ShopItemCreateRequest.model_construct(name="overflow", description="", price=10 ** 30, disabled=False)]
+
+        async with AsyncSessionLocal() as db:
+            ids, errors = await shop.create_many(db, rows, "owner", chunk_size=10)
+
+        self.assertEqual(ids, [None])
+        self.assertIn("too large", errors[0])
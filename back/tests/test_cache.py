@@ -0,0 +1,173 @@
+"""
+LocalCache LRU, TTL and size bounds
+"""
+import asyncio
+import sys
+import unittest
+from unittest import mock
+
+from src.core import cache as cache_module
+from src.core.cache import LocalCache, NullCache, RedisCache, create_cache
+
+
+class Clock:
+    """ stand-in for time.monotonic """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LocalCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        patcher = mock.patch("src.core.cache.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_returns_what_was_set(self):
+        cache = LocalCache(ttl=10, maxsize=10)
+        cache.set_nowait("a", 1)
+
+        self.assertEqual(cache.get_nowait("a"), 1)
+        self.assertIsNone(cache.get_nowait("b"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_entries_expire_after_their_ttl(self):
+        cache = LocalCache(ttl=10, maxsize=10)
+        cache.set_nowait("default", 1)
+        cache.set_nowait("short", 2, ttl=2)
+
+        self.clock.now += 2
+        self.assertIsNone(cache.get_nowait("short"))
+        self.assertEqual(cache.get_nowait("default"), 1)
+
+        self.clock.now += 8
+        self.assertIsNone(cache.get_nowait("default"))
+        self.assertEqual(len(cache), 0)
+
+    def test_non_positive_ttl_is_not_stored(self):
+        cache = LocalCache(ttl=10, maxsize=10)
+        cache.set_nowait("a", 1, ttl=0)
+
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_is_evicted_first(self):
+        cache = LocalCache(ttl=10, maxsize=2)
+        cache.set_nowait("a", 1)
+        cache.set_nowait("b", 2)
+        cache.get_nowait("a")
+        cache.set_nowait("c", 3)
+
+        self.assertIsNone(cache.get_nowait("b"))
+        self.assertEqual(cache.get_nowait("a"), 1)
+        self.assertEqual(cache.get_nowait("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_overwriting_a_key_does_not_evict(self):
+        cache = LocalCache(ttl=10, maxsize=2)
+        cache.set_nowait("a", 1)
+        cache.set_nowait("b", 2)
+        cache.set_nowait("a", 3)
+
+        self.assertEqual((cache.get_nowait("a"), cache.get_nowait("b")), (3, 2))
+        self.assertEqual(cache.evictions, 0)
+
+    def test_max_bytes_evicts_until_the_total_fits(self):
+        cache = LocalCache(ttl=10, maxsize=100, max_bytes=10, sizeof=len)
+        cache.set_nowait("a", b"1234")
+        cache.set_nowait("b", b"1234")
+        cache.set_nowait("c", b"1234567")
+
+        self.assertIsNone(cache.get_nowait("a"))
+        self.assertIsNone(cache.get_nowait("b"))
+        self.assertEqual(cache.get_nowait("c"), b"1234567")
+        self.assertEqual(cache.bytes, 7)
+        self.assertEqual(cache.evictions, 2)
+
+    def test_max_bytes_is_inclusive(self):
+        cache = LocalCache(ttl=10, maxsize=100, max_bytes=10, sizeof=len)
+        cache.set_nowait("a", b"1234")
+        cache.set_nowait("b", b"123456")
+
+        self.assertEqual((cache.get_nowait("a"), cache.bytes), (b"1234", 10))
+
+    def test_value_larger_than_max_bytes_is_not_stored(self):
+        cache = LocalCache(ttl=10, maxsize=100, max_bytes=10, sizeof=len)
+        cache.set_nowait("a", b"1234")
+        cache.set_nowait("big", b"x" * 11)
+
+        self.assertIsNone(cache.get_nowait("big"))
+        self.assertEqual(cache.get_nowait("a"), b"1234")
+
+    def test_bytes_follow_overwrites_expiry_and_discard(self):
+        cache = LocalCache(ttl=10, maxsize=100, max_bytes=100, sizeof=len)
+        cache.set_nowait("a", b"1234")
+        cache.set_nowait("a", b"12")
+        cache.set_nowait("b", b"123", ttl=1)
+        self.assertEqual(cache.bytes, 5)
+
+        self.clock.now += 1
+        cache.get_nowait("b")
+        self.assertEqual(cache.bytes, 2)
+
+        cache.discard("a")
+        cache.discard("missing")
+        self.assertEqual(cache.bytes, 0)
+
+    def test_async_interface(self):
+        cache = LocalCache(ttl=10, maxsize=10, sizeof=len)
+
+        async def scenario():
+            await cache.set("a", b"12")
+            first = await cache.get("a")
+            await cache.delete("a")
+            await cache.set("b", b"1")
+            await cache.clear()
+            return first, await cache.get("a"), len(cache), cache.bytes
+
+        self.assertEqual(asyncio.run(scenario()), (b"12", None, 0, 0))
+
+
+class CreateCacheTest(unittest.TestCase):
+
+    def test_backends(self):
+        self.assertIsInstance(create_cache("local", ttl=10, maxsize=10), LocalCache)
+        self.assertIsInstance(create_cache("none", ttl=10, maxsize=10), NullCache)
+        self.assertIsInstance(create_cache("local", ttl=0, maxsize=10), NullCache)
+
+    def test_redis_needs_a_url_and_codecs(self):
+        with self.assertRaises(ValueError):
+            create_cache("redis", ttl=10, maxsize=10)
+        with self.assertRaises(ValueError):
+            create_cache("redis", ttl=10, maxsize=10, redis_url="redis://localhost")
+
+    def test_auto_keeps_entries_per_process_for_a_single_worker_only(self):
+        codecs = {"encode": str.encode, "decode": bytes.decode}
+
+        self.assertIsInstance(create_cache("auto", ttl=10, maxsize=10), LocalCache)
+        self.assertIsInstance(create_cache("auto", ttl=10, maxsize=10, workers=4, **codecs), NullCache)
+        self.assertIsInstance(create_cache("auto", ttl=10, maxsize=10, workers=4, redis_url="redis://cache"), NullCache)
+
+        with mock.patch.object(cache_module, "RedisCache") as redis_cache:
+            backend = create_cache("auto", ttl=10, maxsize=10, workers=4, redis_url="redis://cache", **codecs)
+        self.assertIs(backend, redis_cache.return_value)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_cache("memcached", ttl=10, maxsize=10)
+
+
+class RedisCacheTest(unittest.TestCase):
+
+    def test_discard_deletes_before_returning(self):
+        redis = mock.MagicMock()
+        with mock.patch.dict(sys.modules, {"redis": redis, "redis.asyncio": redis.asyncio}):
+            cache = RedisCache(ttl=10, url="redis://cache", prefix="principal:", encode=str.encode, decode=bytes.decode)
+            cache.discard("u1")
+
+        redis.Redis.from_url.assert_called_once_with("redis://cache")
+        redis.Redis.from_url.return_value.delete.assert_called_once_with("principal:u1")
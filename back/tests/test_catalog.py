@@ -0,0 +1,113 @@
+"""
+catalog import and export as NDJSON and CSV
+"""
+import csv
+import io
+import json
+from unittest import mock
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.apps.shop.service import catalog
+
+from .support import ApiTestCase
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join((row if isinstance(row, bytes) else json.dumps(row).encode()) + b"\n" for row in rows)
+
+
+class ImportTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+
+    async def upload(self, content: bytes, catalog_format: str = "ndjson") -> dict:
+        response = await self.client.post("/shop/import", params={"format": catalog_format}, content=content,
+                                          headers=self.headers)
+        self.assertEqual(response.status_code, 201, response.text)
+        return response.json()
+
+    async def exported(self, catalog_format: str = "ndjson") -> str:
+        response = await self.client.get("/shop/export", params={"format": catalog_format}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.text
+
+    async def test_ndjson_rows_are_created_and_bad_rows_reported(self):
+        result = await self.upload(ndjson(
+            {"name": "a", "description": "first", "price": 1},
+            b"{not json",
+            {"name": "b", "description": "second", "price": -1},
+            {"name": "c", "description": "third", "price": 10 ** 30},
+            {"name": "d", "description": "fourth", "price": 4, "disabled": True},
+        ) + b"\n\n")
+
+        self.assertEqual((result["created"], result["failed"]), (2, 3))
+        self.assertEqual([error["index"] for error in result["errors"]], [1, 2, 3])
+
+    async def test_round_trip_keeps_every_field(self):
+        rows = [
+            {"name": "lamp", "description": "café \"quoted\"", "price": 10, "disabled": False},
+            {"name": "chair", "description": "", "price": 0, "disabled": True},
+        ]
+        await self.upload(ndjson(*rows))
+
+        exported = [json.loads(line) for line in (await self.exported()).splitlines()]
+
+        # rows of one chunk share created_at and come out in id order
+        self.assertCountEqual([{key: row[key] for key in rows[0]} for row in exported], rows)
+        self.assertTrue(all(row["owner_id"] == self.user_id for row in exported))
+
+        count = await self.client.get("/shop/count", headers=self.headers)
+        self.assertEqual(count.json()["count"], 2)
+
+    async def test_csv_with_quoted_multiline_field(self):
+        result = await self.upload(
+            b'name,description,price\n'
+            b'desk,"two\nlines, and a comma",5\n'
+            b'short,row\n'
+            b'shelf,plain,7\n',
+            catalog_format="csv",
+        )
+
+        self.assertEqual((result["created"], result["failed"]), (2, 1))
+        self.assertEqual(result["errors"][0]["index"], 1)
+
+        exported = list(csv.DictReader(io.StringIO(await self.exported("csv"))))
+        self.assertEqual(list(exported[0]), catalog.EXPORT_FIELDS)
+        self.assertEqual({row["name"]: row["description"] for row in exported},
+                         {"desk": "two\nlines, and a comma", "shelf": "plain"})
+
+    async def test_rows_are_written_chunk_by_chunk(self):
+        rows = [{"name": f"item {i}", "description": "", "price": i} for i in range(7)]
+
+        with mock.patch.object(settings, "shop_item_bulk_chunk_size", 3):
+            result = await self.upload(ndjson(*rows))
+
+        self.assertEqual(result["created"], 7)
+        self.assertEqual(len((await self.exported()).splitlines()), 7)
+
+    async def test_errors_are_capped(self):
+        with mock.patch.object(settings, "shop_item_import_max_errors", 2):
+            result = await self.upload(ndjson(*[b"{"] * 5))
+
+        self.assertEqual((result["created"], result["failed"], len(result["errors"])), (0, 5, 2))
+
+    async def test_not_utf8(self):
+        response = await self.client.post("/shop/import", content=ndjson({"name": "a", "description": "", "price": 1})
+                                          + b'{"name": "\xff\xfe"}\n', headers=self.headers)
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_export_reads_through_a_read_only_session(self):
+        sessions = []
+
+        def session(**kwargs):
+            sessions.append(kwargs)
+            return AsyncSessionLocal(**kwargs)
+
+        with mock.patch.object(catalog, "AsyncSessionLocal", session):
+            await self.exported()
+
+        self.assertEqual(sessions, [{"info": {"read_only": True}}])
@@ -0,0 +1,144 @@
+"""
+Accept-Encoding negotiation and CompressionMiddleware
+"""
+import asyncio
+import gzip
+import unittest
+from typing import List, Optional
+
+from src.core.compression import CompressionMiddleware, accepted_encodings, available_encodings, is_compressible
+
+BODY = b'{"name": "item"}' * 200
+
+
+def run(middleware_options: dict, accept_encoding: Optional[str], content_type: str = "application/json",
+        chunks: List[bytes] = (BODY,)) -> List[dict]:
+    """ messages sent by CompressionMiddleware around an app answering chunks """
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(sum(map(len, chunks))).encode()),
+        ]})
+        for position, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": position < len(chunks) - 1})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    asyncio.run(CompressionMiddleware(app, **middleware_options)(scope, None, send))
+    return messages
+
+
+def response_headers(messages: List[dict]) -> dict:
+    return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+
+def response_body(messages: List[dict]) -> bytes:
+    return b"".join(message.get("body", b"") for message in messages[1:])
+
+
+class AcceptedEncodingsTest(unittest.TestCase):
+
+    def test_names_are_case_insensitive(self):
+        self.assertEqual(accepted_encodings("GZIP, Br"), {"gzip", "br"})
+
+    def test_zero_quality_refuses(self):
+        self.assertEqual(accepted_encodings("gzip;q=0, br;q=0.5"), {"br"})
+        self.assertEqual(accepted_encodings("gzip; q=0.0"), set())
+
+    def test_quality_after_other_parameters(self):
+        self.assertEqual(accepted_encodings("gzip;level=1;q=0"), set())
+
+    def test_unparsable_quality_refuses(self):
+        self.assertEqual(accepted_encodings("gzip;q=high"), set())
+
+    def test_star_expands_to_encodings_not_refused(self):
+        self.assertLessEqual({"br", "gzip"}, accepted_encodings("*"))
+        self.assertNotIn("br", accepted_encodings("br;q=0, *"))
+        self.assertIn("gzip", accepted_encodings("br;q=0, *"))
+
+    def test_empty_header_accepts_nothing(self):
+        self.assertEqual(accepted_encodings(""), set())
+
+
+class CompressibleTest(unittest.TestCase):
+
+    def test_text_and_json_types(self):
+        for content_type in ("application/json", "application/json; charset=utf-8", "application/x-ndjson",
+                             "text/csv", "application/problem+json", "image/svg+xml"):
+            with self.subTest(content_type=content_type):
+                self.assertTrue(is_compressible(content_type))
+
+    def test_binary_types(self):
+        for content_type in ("image/png", "application/octet-stream", "application/gzip", ""):
+            with self.subTest(content_type=content_type):
+                self.assertFalse(is_compressible(content_type))
+
+
+class NegotiationTest(unittest.TestCase):
+
+    def negotiate(self, accept_encoding: Optional[str], encodings=("br", "gzip")) -> Optional[str]:
+        middleware = CompressionMiddleware(None, encodings=encodings)
+        headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+        return middleware.negotiate({"headers": headers})
+
+    def test_server_preference_wins_among_accepted(self):
+        expected = "br" if "br" in available_encodings(("br",)) else "gzip"
+
+        self.assertEqual(self.negotiate("gzip, br"), expected)
+        self.assertEqual(self.negotiate("gzip;q=1, br;q=0.1"), expected)
+        self.assertEqual(self.negotiate("gzip, br", encodings=("gzip", "br")), "gzip")
+
+    def test_only_accepted_encodings(self):
+        self.assertEqual(self.negotiate("gzip"), "gzip")
+        self.assertIsNone(self.negotiate("identity"))
+        self.assertIsNone(self.negotiate("deflate, gzip;q=0"))
+        self.assertIsNone(self.negotiate(None))
+
+    def test_star_respects_refused_encodings(self):
+        self.assertEqual(self.negotiate("br;q=0, *"), "gzip")
+        self.assertIsNone(self.negotiate("br;q=0, gzip;q=0, *"))
+
+    def test_unknown_configured_encodings_are_dropped(self):
+        self.assertEqual(available_encodings(("zstd", "gzip")), ("gzip",))
+
+
+class MiddlewareTest(unittest.TestCase):
+
+    def test_compresses_accepted_json(self):
+        messages = run({"encodings": ("gzip",)}, "gzip")
+        headers = response_headers(messages)
+
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(headers["vary"], "Accept-Encoding")
+        self.assertEqual(int(headers["content-length"]), len(response_body(messages)))
+        self.assertEqual(gzip.decompress(response_body(messages)), BODY)
+
+    def test_small_body_is_sent_as_is(self):
+        messages = run({"encodings": ("gzip",), "minimum_size": 1024}, "gzip", chunks=[b"{}"])
+
+        self.assertNotIn("content-encoding", response_headers(messages))
+        self.assertEqual(response_body(messages), b"{}")
+
+    def test_not_accepted_or_not_compressible_is_sent_as_is(self):
+        for accept_encoding, content_type in ((None, "application/json"), ("gzip", "image/png")):
+            with self.subTest(accept_encoding=accept_encoding, content_type=content_type):
+                messages = run({"encodings": ("gzip",)}, accept_encoding, content_type=content_type)
+
+                self.assertNotIn("content-encoding", response_headers(messages))
+                self.assertEqual(response_body(messages), BODY)
+
+    def test_streams_chunk_by_chunk(self):
+        chunks = [b'{"row": 1}\n' * 10, b'{"row": 2}\n' * 10, b""]
+        messages = run({"encodings": ("gzip",)}, "gzip", content_type="application/x-ndjson", chunks=chunks)
+        headers = response_headers(messages)
+
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", headers)
+        self.assertEqual(len(messages), 1 + len(chunks))
+        self.assertEqual(gzip.decompress(response_body(messages)), b"".join(chunks))
@@ -0,0 +1,93 @@
+"""
+per-owner shop item counters: kept by every write path, read by /shop/count, rebuilt by recount_all
+"""
+from unittest import mock
+
+from sqlalchemy import delete, update
+
+from src.core.database import AsyncSessionLocal, engine
+from src.apps.shop.model.domain.shop_item import ShopItemDB
+from src.apps.shop.model.domain.shop_item_count import ShopItemCountDB
+from src.apps.shop.service import counter
+
+from .support import ApiTestCase
+
+
+class CounterTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+
+    async def create(self, count: int) -> None:
+        rows = [{"name": f"item {i}", "description": "", "price": i} for i in range(count)]
+        response = await self.client.post("/shop/bulk", json=rows, headers=self.headers)
+        self.assertEqual(response.status_code, 201, response.text)
+
+    async def counts(self):
+        async with AsyncSessionLocal() as db:
+            return await counter.get(db, self.user_id)
+
+    async def test_count_and_pages(self):
+        await self.client.post("/shop/", json={"name": "lamp", "description": "", "price": 1}, headers=self.headers)
+        await self.create(4)
+
+        response = await self.client.get("/shop/count", params={"limit": 2}, headers=self.headers)
+
+        self.assertEqual(response.json(), {"count": 5, "pages": 3})
+
+    async def test_owner_without_items(self):
+        response = await self.client.get("/shop/count", headers=self.headers)
+
+        self.assertEqual(response.json(), {"count": 0, "pages": 0})
+
+    async def test_disabling_moves_items_to_the_disabled_count(self):
+        await self.create(3)
+        ids = [row["id"] for row in (await self.client.get("/shop/", headers=self.headers)).json()]
+
+        await self.client.patch("/shop/bulk", json=[{"id": ids[0], "disabled": True}, {"id": ids[1], "disabled": True}],
+                                headers=self.headers)
+        await self.client.patch(f"/shop/{ids[2]}", json={"disabled": True}, headers=self.headers)
+
+        self.assertEqual(await self.counts(), (3, 3))
+
+    async def test_owners_are_counted_apart(self):
+        await self.create(2)
+        first = self.user_id
+        self.headers = await self.sign_in("other@example.com")
+        await self.create(1)
+
+        async with AsyncSessionLocal() as db:
+            self.assertEqual((await counter.get(db, first), await counter.get(db, self.user_id)), ((2, 0), (1, 0)))
+
+    async def test_recount_all_repairs_drifted_counters(self):
+        await self.create(3)
+        with engine.begin() as connection:
+            connection.execute(update(ShopItemDB).where(ShopItemDB.name == "item 0").values(disabled=True))
+            connection.execute(update(ShopItemCountDB).values(item_count=99, disabled_count=7))
+
+        async with AsyncSessionLocal() as db:
+            self.assertEqual(await counter.recount_all(db), 1)
+
+        self.assertEqual(await self.counts(), (3, 1))
+
+    async def test_adjust_without_an_upsert_updates_or_inserts(self):
+        with mock.patch.object(counter, "_upsert", return_value=None):
+            async with AsyncSessionLocal() as db:
+                await counter.adjust(db, self.user_id, total=2)
+                await counter.adjust(db, self.user_id, total=1, disabled=1)
+                await counter.adjust(db, self.user_id)
+                await db.commit()
+
+        self.assertEqual(await self.counts(), (3, 1))
+
+    async def test_adjust_without_deltas_writes_nothing(self):
+        with engine.begin() as connection:
+            connection.execute(delete(ShopItemCountDB))
+
+        async with AsyncSessionLocal() as db:
+            await counter.adjust(db, self.user_id, total=0, disabled=0)
+            await db.commit()
+
+        with engine.connect() as connection:
+            self.assertIsNone(connection.scalar(ShopItemCountDB.__table__.select()))
@@ -0,0 +1,83 @@
+"""
+engine setup and read routing: read-only sessions read from a replica, writes and use_primary go to the primary
+"""
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import column, insert, table, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core import database
+from src.core.database import AsyncSessionLocal, get_async_database_url, use_primary
+
+
+class AsyncDatabaseUrlTest(unittest.TestCase):
+
+    def test_sync_drivers_map_to_their_asyncio_driver(self):
+        self.assertEqual(get_async_database_url("sqlite:///shop.db"), "sqlite+aiosqlite:///shop.db")
+        self.assertEqual(get_async_database_url("postgresql://user:secret@db/shop"),
+                         "postgresql+asyncpg://user:secret@db/shop")
+        self.assertEqual(get_async_database_url("mysql+pymysql://user@db/shop"), "mysql+aiomysql://user@db/shop")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_async_database_url("oracle://user@db/shop")
+
+
+class ReadRoutingTest(unittest.IsolatedAsyncioTestCase):
+    """ a primary and a replica holding different rows, so every read tells where it ran """
+
+    async def asyncSetUp(self) -> None:
+        workdir = tempfile.mkdtemp(prefix="shop-routing-")
+        self.primary = self.database(os.path.join(workdir, "primary.db"))
+        self.replica = self.database(os.path.join(workdir, "replica.db"))
+
+        for engine, name in ((self.primary, "primary"), (self.replica, "replica")):
+            async with engine.begin() as connection:
+                await connection.execute(text("CREATE TABLE marker (name VARCHAR)"))
+                await connection.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+
+        patcher = mock.patch.multiple(database, replica_engines=[self.replica],
+                                      _replica_cycle=itertools.cycle([self.replica]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def database(self, path: str):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        self.addAsyncCleanup(engine.dispose)
+        return engine
+
+    async def markers(self, session) -> list:
+        return list((await session.execute(text("SELECT name FROM marker ORDER BY name"))).scalars())
+
+    async def test_read_only_session_reads_from_the_replica(self):
+        async with AsyncSessionLocal(bind=self.primary, info={"read_only": True}) as session:
+            self.assertEqual(await self.markers(session), ["replica"])
+
+    async def test_regular_session_reads_from_the_primary(self):
+        async with AsyncSessionLocal(bind=self.primary) as session:
+            self.assertEqual(await self.markers(session), ["primary"])
+
+    async def test_dml_of_a_read_only_session_goes_to_the_primary(self):
+        async with AsyncSessionLocal(bind=self.primary, info={"read_only": True}) as session:
+            await session.execute(insert(table("marker", column("name"))).values(name="written"))
+            await session.commit()
+
+        async with AsyncSessionLocal(bind=self.primary) as session:
+            self.assertEqual(await self.markers(session), ["primary", "written"])
+
+    async def test_use_primary_moves_the_remaining_reads(self):
+        async with AsyncSessionLocal(bind=self.primary, info={"read_only": True}) as session:
+            self.assertEqual(await self.markers(session), ["replica"])
+
+            await use_primary(session)
+
+            self.assertEqual(await self.markers(session), ["primary"])
+
+    async def test_without_replicas_everything_reads_from_the_primary(self):
+        with mock.patch.object(database, "replica_engines", []):
+            async with AsyncSessionLocal(bind=self.primary, info={"read_only": True}) as session:
+                self.assertEqual(await self.markers(session), ["primary"])
@@ -0,0 +1,89 @@
+"""
+health routes: liveness never touches the database, readiness checks pool saturation and a SELECT 1 probe
+"""
+import asyncio
+import contextlib
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from src.core.config import settings
+from src.core.health import pool_status, probe, readiness
+
+from .support import ApiTestCase
+
+
+class HangingEngine:
+    """ async engine stand-in whose connections never open """
+
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        await asyncio.sleep(60)
+        yield
+
+
+class PoolStatusTest(unittest.TestCase):
+
+    def test_saturation_counts_the_overflow_in_the_capacity(self):
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2, max_overflow=1)
+        self.addCleanup(engine.dispose)
+
+        with engine.connect(), engine.connect():
+            status = pool_status(engine)
+
+        self.assertEqual(status, {"size": 2, "checked_out": 2, "overflow": 0, "capacity": 3, "saturation": 0.6667})
+
+    def test_pools_without_counters_report_nothing(self):
+        engine = create_engine("sqlite://", poolclass=NullPool)
+        self.addCleanup(engine.dispose)
+
+        self.assertEqual(pool_status(engine), {})
+
+
+class ProbeTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_timeout(self):
+        self.assertEqual(await probe(HangingEngine(), timeout=0.05), "probe timed out after 0.05s")
+
+    async def test_database_error_is_the_reason(self):
+        engine = create_async_engine("sqlite+aiosqlite:////nonexistent/directory/shop.db")
+        self.addAsyncCleanup(engine.dispose)
+
+        self.assertTrue((await probe(engine, timeout=1)).startswith("OperationalError"))
+
+    async def test_saturated_pool_answers_without_probing(self):
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=AsyncAdaptedQueuePool, pool_size=1,
+                                     max_overflow=0)
+        self.addAsyncCleanup(engine.dispose)
+
+        with mock.patch("src.core.health.probe") as probed:
+            report = await readiness(engine, timeout=1, max_saturation=0.0)
+
+        self.assertEqual((report["status"], report["error"]), ("unavailable", "connection pool saturated"))
+        probed.assert_not_called()
+
+
+class HealthRouteTest(ApiTestCase):
+
+    async def test_liveness(self):
+        for path in ("/health", "/health/live"):
+            response = await self.client.get(path)
+
+            self.assertEqual((response.status_code, response.json()), (200, {"status": "up"}))
+
+    async def test_ready(self):
+        response = await self.client.get("/health/ready")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+        self.assertIn("probe_ms", response.json())
+
+    async def test_unavailable_is_503(self):
+        with mock.patch.object(settings, "health_max_pool_saturation", 0.0):
+            response = await self.client.get("/health/ready")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error"], "connection pool saturated")
@@ -0,0 +1,141 @@
+"""
+JWT key ring: key pair checks, kid fingerprints and rotation through retired verification keys
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from src.core.keys import KeyRing, key_id, parse_key_path
+from src.apps.auth.service import token
+
+
+class KeyFiles:
+    """ PEM files of freshly generated key pairs in a throwaway directory """
+
+    def __init__(self) -> None:
+        self.directory = tempfile.mkdtemp(prefix="shop-keys-")
+
+    def pair(self, name: str, private_key=None):
+        private_key = private_key or rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_path = os.path.join(self.directory, f"{name}.key")
+        public_path = os.path.join(self.directory, f"{name}.pub")
+
+        with open(private_path, "wb") as f:
+            f.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            ))
+        with open(public_path, "wb") as f:
+            f.write(private_key.public_key().public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            ))
+
+        return private_path, public_path, private_key.public_key()
+
+
+class KeyRingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.files = KeyFiles()
+        cls.current = cls.files.pair("current")
+        cls.retired = cls.files.pair("retired")
+
+    def test_kid_defaults_to_the_public_key_fingerprint(self):
+        private_path, public_path, public_key = self.current
+        ring = KeyRing(private_path, public_path, "RS256")
+
+        self.assertEqual(ring.kid, key_id(public_key))
+        self.assertEqual(len(ring.kid), 16)
+        self.assertEqual(KeyRing(private_path, public_path, "RS256", kid="2024-01").kid, "2024-01")
+
+    def test_keys_are_loaded_once_on_first_use(self):
+        private_path, public_path, _ = self.current
+        ring = KeyRing(private_path, public_path, "RS256")
+        self.assertFalse(ring.loaded)
+
+        signing_key = ring.signing_key
+
+        self.assertTrue(ring.loaded)
+        self.assertIs(ring.signing_key, signing_key)
+
+    def test_private_and_public_key_have_to_be_a_pair(self):
+        with self.assertRaises(ValueError):
+            KeyRing(self.current[0], self.retired[1], "RS256").load()
+
+    def test_algorithm_has_to_match_the_key_type(self):
+        with self.assertRaises(ValueError):
+            KeyRing(self.current[0], self.current[1], "ES256").load()
+
+    def test_ec_keys(self):
+        private_path, public_path, _ = self.files.pair("ec", ec.generate_private_key(ec.SECP256R1()))
+        ring = KeyRing(private_path, public_path, "ES256")
+
+        self.assertEqual(ring.verification_key(None)[1], ["ES256"])
+
+    def test_retired_keys_verify_by_kid(self):
+        _, retired_public_path, retired_key = self.retired
+        ring = KeyRing(self.current[0], self.current[1], "RS256",
+                       verification_key_paths=[retired_public_path, f"old={retired_public_path}"])
+
+        self.assertTrue(ring.rotating)
+        self.assertEqual(ring.verification_key(ring.kid)[0].public_numbers(), self.current[2].public_numbers())
+        self.assertEqual(ring.verification_key(None), ring.verification_key(ring.kid))
+        for kid in (key_id(retired_key), "old"):
+            self.assertEqual(ring.verification_key(kid)[0].public_numbers(), retired_key.public_numbers())
+            self.assertIn("RS256", ring.verification_key(kid)[1])
+        self.assertIsNone(ring.verification_key("unknown"))
+
+    def test_single_key_is_not_rotating(self):
+        self.assertFalse(KeyRing(self.current[0], self.current[1], "RS256").rotating)
+
+    def test_parse_key_path(self):
+        self.assertEqual(parse_key_path(" old = /keys/old.pub "), ("old", "/keys/old.pub"))
+        self.assertEqual(parse_key_path("/keys/old.pub"), (None, "/keys/old.pub"))
+
+
+class TokenRotationTest(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.files = KeyFiles()
+        cls.old = cls.files.pair("old")
+        cls.new = cls.files.pair("new")
+
+    async def asyncSetUp(self) -> None:
+        await token.verified_token_cache.clear()
+        self.addAsyncCleanup(token.verified_token_cache.clear)
+
+    async def issue(self, ring: KeyRing) -> str:
+        with mock.patch.object(token, "keys", ring):
+            issued, _ = await token.create_access_token("u1", ["user:read:own"])
+        return issued
+
+    async def decode(self, ring: KeyRing, issued: str):
+        with mock.patch.object(token, "keys", ring):
+            return await token.decode_token(issued)
+
+    async def test_tokens_of_the_retired_key_verify_after_rotation(self):
+        before = KeyRing(self.old[0], self.old[1], "RS256")
+        after = KeyRing(self.new[0], self.new[1], "RS256", verification_key_paths=[self.old[1]])
+
+        old_token = await self.issue(before)
+        new_token = await self.issue(after)
+
+        self.assertEqual(jwt.get_unverified_header(old_token)["kid"], before.kid)
+        self.assertEqual((await self.decode(after, old_token)).user_id, "u1")
+        self.assertEqual((await self.decode(after, new_token)).user_id, "u1")
+
+    async def test_tokens_of_a_dropped_key_are_rejected(self):
+        old_token = await self.issue(KeyRing(self.old[0], self.old[1], "RS256"))
+        rotated = KeyRing(self.new[0], self.new[1], "RS256", verification_key_paths=[self.files.pair("other")[1]])
+
+        self.assertIsNone(await self.decode(rotated, old_token))
+        self.assertIsNone(await self.decode(KeyRing(self.new[0], self.new[1], "RS256"), old_token))
@@ -0,0 +1,145 @@
+"""
+structured logging: JSON lines through a bounded queue, request ids and one access record per request
+"""
+import io
+import json
+import logging
+import queue
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from src.core import log
+from src.core.log import AccessLogMiddleware, ContextFilter, DroppingQueueHandler, JsonFormatter, bind_user
+from src.core.metrics import registry
+
+
+def record(message: str = "message %s", args=("x",), **extra) -> logging.LogRecord:
+    entry = logging.LogRecord("shop", logging.INFO, __file__, 1, message, args, None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+class JsonFormatterTest(unittest.TestCase):
+
+    def test_one_object_with_the_extra_fields_on_top(self):
+        line = JsonFormatter().format(record(request_id="r1", latency_ms=1.5))
+
+        entry = json.loads(line)
+        self.assertEqual((entry["level"], entry["logger"], entry["message"]), ("INFO", "shop", "message x"))
+        self.assertEqual((entry["request_id"], entry["latency_ms"]), ("r1", 1.5))
+        self.assertNotIn("args", entry)
+        self.assertNotIn("\n", line)
+
+
+class DroppingQueueHandlerTest(unittest.TestCase):
+
+    def test_arguments_are_merged_before_queueing(self):
+        handler = DroppingQueueHandler(queue.Queue())
+
+        handler.handle(record())
+
+        queued = handler.queue.get_nowait()
+        self.assertEqual((queued.msg, queued.args), ("message x", None))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        before = registry.get_sample_value("log_records_dropped_total")
+
+        for _ in range(3):
+            handler.handle(record())
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(registry.get_sample_value("log_records_dropped_total") - before, 2)
+
+
+class ConfigureLoggingTest(unittest.TestCase):
+
+    def test_records_reach_stderr_as_json_after_shutdown_flushes(self):
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        stderr = io.StringIO()
+
+        with mock.patch("sys.stderr", stderr):
+            log.configure_logging("INFO", queue_size=10)
+            logging.getLogger("shop").info("hello %s", "world", extra={"order": 7})
+            log.shutdown_logging()
+
+        entry = json.loads(stderr.getvalue().splitlines()[-1])
+        self.assertEqual((entry["message"], entry["order"]), ("hello world", 7))
+        self.assertNotIn(log._handler, root.handlers)
+
+
+class AccessLogMiddlewareTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str) -> dict:
+            bind_user("u1")
+            logging.getLogger("shop").warning("serving %s", item_id)
+            if item_id == "missing":
+                raise HTTPException(status_code=404)
+            if item_id == "broken":
+                raise RuntimeError("broken")
+            return {"id": item_id}
+
+        self.app = app
+
+        handler = logging.Handler()
+        handler.addFilter(ContextFilter())
+        self.records = []
+        handler.emit = self.records.append
+        for name in ("shop", "access"):
+            logger = logging.getLogger(name)
+            logger.addHandler(handler)
+            self.addCleanup(logger.removeHandler, handler)
+            self.addCleanup(logger.setLevel, logger.level)
+            logger.setLevel(logging.INFO)
+
+    async def get(self, path: str, sample_4xx: float = 1.0, **headers) -> httpx.Response:
+        transport = httpx.ASGITransport(app=AccessLogMiddleware(self.app, sample_4xx=sample_4xx),
+                                        raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+
+    def logged(self, name: str):
+        return [entry for entry in self.records if entry.name == name]
+
+    async def test_one_access_record_with_the_route_template(self):
+        response = await self.get("/items/a1")
+
+        [access] = self.logged("access")
+        self.assertEqual((access.method, access.route, access.path, access.status),
+                         ("GET", "/items/{item_id}", "/items/a1", 200))
+        self.assertEqual(access.request_id, response.headers["x-request-id"])
+        self.assertEqual(access.user_id, "u1")
+
+    async def test_records_of_the_request_carry_its_ids(self):
+        await self.get("/items/a1", **{"X-Request-ID": "req-1"})
+
+        [served] = self.logged("shop")
+        self.assertEqual((served.request_id, served.user_id), ("req-1", "u1"))
+
+    async def test_request_id_is_taken_from_the_request_and_bounded(self):
+        response = await self.get("/items/a1", **{"X-Request-ID": "r" * 500})
+
+        self.assertEqual(response.headers["x-request-id"], "r" * log.REQUEST_ID_MAX_LENGTH)
+
+    async def test_4xx_records_are_sampled(self):
+        await self.get("/items/missing", sample_4xx=0.0)
+        self.assertEqual(self.logged("access"), [])
+
+        await self.get("/items/missing", sample_4xx=1.0)
+        [access] = self.logged("access")
+        self.assertEqual((access.status, access.sample_rate), (404, 1.0))
+
+    async def test_5xx_records_are_always_logged_as_errors(self):
+        response = await self.get("/items/broken", sample_4xx=0.0)
+
+        self.assertEqual(response.status_code, 500)
+        [access] = self.logged("access")
+        self.assertEqual((access.levelno, access.status, access.error), (logging.ERROR, 500, "unhandled exception"))
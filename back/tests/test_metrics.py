@@ -0,0 +1,103 @@
+"""
+Prometheus metrics: per-route request metrics, in-flight requests and database work per engine
+"""
+import threading
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from src.core.metrics import MetricsMiddleware, RequestStats, current_request, instrument_engine, registry
+
+from .support import ApiTestCase
+
+
+def sample(name: str, **labels) -> float:
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+class RequestMetricsTest(ApiTestCase):
+
+    async def test_requests_are_counted_by_route_template(self):
+        headers = await self.sign_in()
+        labels = {"method": "GET", "route": "/api/v1/shop/{shop_item_id}", "status": "404"}
+        before = sample("http_requests_total", **labels)
+
+        await self.client.get("/shop/4f0e5a5e-0000-4000-8000-000000000000", headers=headers)
+        await self.client.get("/shop/4f0e5a5e-0000-4000-8000-000000000001", headers=headers)
+
+        self.assertEqual(sample("http_requests_total", **labels) - before, 2)
+
+    async def test_unknown_paths_share_one_label(self):
+        before = sample("http_requests_total", method="GET", route="unmatched", status="404")
+
+        await self.client.get("/no/such/path")
+
+        self.assertEqual(sample("http_requests_total", method="GET", route="unmatched", status="404") - before, 1)
+
+
+class InFlightTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_in_flight_requests_are_labelled_by_route(self):
+        app = FastAPI()
+
+        @app.get("/in-flight/{name}")
+        async def in_flight(name: str) -> float:
+            return sample("http_requests_in_flight", method="GET", route="/in-flight/{name}")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=MetricsMiddleware(app)),
+                                     base_url="http://test") as client:
+            response = await client.get("/in-flight/a")
+
+        self.assertEqual(response.json(), 1)
+        self.assertEqual(sample("http_requests_in_flight", method="GET", route="/in-flight/{name}"), 0)
+
+
+class EngineMetricsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0,
+                                    connect_args={"check_same_thread": False})
+        self.addCleanup(self.engine.dispose)
+        instrument_engine(self.engine, "metrics-test")
+
+        self.stats = RequestStats()
+        token = current_request.set(self.stats)
+        self.addCleanup(current_request.reset, token)
+
+    def test_queries_are_counted_for_the_engine_and_the_request(self):
+        before = sample("db_queries_total", engine="metrics-test")
+
+        with Session(self.engine) as session:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+
+        self.assertEqual(sample("db_queries_total", engine="metrics-test") - before, 2)
+        self.assertEqual(self.stats.queries, 2)
+
+    def test_session_waits_for_a_connection_of_a_full_pool(self):
+        before = sample("db_pool_checkout_wait_seconds_count", engine="metrics-test")
+        holder = Session(self.engine)
+        holder.execute(text("SELECT 1"))
+        threading.Timer(0.2, holder.close).start()
+
+        with Session(self.engine) as session:
+            session.execute(text("SELECT 1"))
+            # a second statement in the same transaction does not wait again
+            session.execute(text("SELECT 1"))
+
+        # one wait each for the holder and the session
+        self.assertEqual(sample("db_pool_checkout_wait_seconds_count", engine="metrics-test") - before, 2)
+        self.assertGreaterEqual(self.stats.pool_wait_seconds, 0.15)
+
+    def test_engines_that_are_not_instrumented_are_ignored(self):
+        other = create_engine("sqlite://")
+        self.addCleanup(other.dispose)
+
+        with Session(other) as session:
+            session.execute(text("SELECT 1"))
+
+        self.assertEqual((self.stats.queries, self.stats.pool_wait_seconds), (0, 0))
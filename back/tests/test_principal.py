@@ -0,0 +1,102 @@
+"""
+principal cache: entries dropped when the user row changes, no password hash cached
+"""
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.apps.auth.model.domain.user import User, UserDB
+from src.apps.auth.service.principal import _decode, _encode, principal_cache
+
+TOKEN = "token"
+
+
+def principal(user_id: str = "u1", **fields) -> User:
+    return User(**{
+        "id": user_id,
+        "username": "user",
+        "email": f"{user_id}@example.com",
+        "full_name": "User",
+        "hashed_password": "$2b$12$hash",
+        "created_at": "2024-01-01 00:00:00",
+        "updated_at": "2024-01-01 00:00:00",
+        "scopes": ["user:read:own"],
+        **fields,
+    })
+
+
+class PrincipalCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        UserDB.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+
+        with Session(self.engine) as session:
+            session.add_all([UserDB(id="u1", email="u1@example.com"), UserDB(id="u2", email="u2@example.com")])
+            session.commit()
+
+        self.run_async(principal_cache.backend.clear())
+        self.run_async(principal_cache.set(principal("u1"), TOKEN))
+        self.run_async(principal_cache.set(principal("u2"), TOKEN))
+
+    @staticmethod
+    def run_async(awaitable):
+        return asyncio.run(awaitable) if asyncio.iscoroutine(awaitable) else awaitable
+
+    def cached(self, user_id: str = "u1"):
+        return self.run_async(principal_cache.get(user_id, TOKEN))
+
+    def test_cached_until_the_user_changes(self):
+        self.assertIsNotNone(self.cached())
+
+        with Session(self.engine) as session:
+            session.get(UserDB, "u1").disabled = True
+            session.commit()
+
+        self.assertIsNone(self.cached())
+        self.assertIsNotNone(self.cached("u2"))
+
+    def test_deleted_user_is_dropped(self):
+        with Session(self.engine) as session:
+            session.delete(session.get(UserDB, "u1"))
+            session.commit()
+
+        self.assertIsNone(self.cached())
+
+    def test_only_after_the_commit(self):
+        with Session(self.engine) as session:
+            session.get(UserDB, "u1").disabled = True
+            session.flush()
+
+            self.assertIsNotNone(self.cached())
+
+            session.commit()
+
+        self.assertIsNone(self.cached())
+
+    def test_rolled_back_change_keeps_the_entry(self):
+        with Session(self.engine) as session:
+            session.get(UserDB, "u1").disabled = True
+            session.flush()
+            session.rollback()
+
+            # a later commit in the same session does not replay the rolled back change
+            session.commit()
+
+        self.assertIsNotNone(self.cached())
+
+    def test_password_hash_is_not_cached(self):
+        self.assertEqual(self.cached().hashed_password, "")
+
+    def test_encoded_entry_has_no_password_hash(self):
+        raw = _encode((principal("u1"), "digest"))
+
+        self.assertNotIn(b"hashed_password", raw)
+        self.assertNotIn(b"$2b$", raw)
+
+        user, digest = _decode(raw)
+        self.assertEqual((user.id, user.hashed_password, user.scopes, digest), ("u1", "", ["user:read:own"], "digest"))
@@ -0,0 +1,74 @@
+"""
+per-request SQL profiler: Server-Timing and X-Query-Profile of profiled requests, repeated statements
+"""
+import json
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.core.profiler import QueryProfile, QueryProfilerMiddleware, profile_engine
+
+
+class QueryProfileTest(unittest.TestCase):
+
+    def test_repeated_statements_tell_n_plus_one_from_duplicates(self):
+        profile = QueryProfile()
+        for item_id in (1, 2, 3):
+            profile.record("SELECT * FROM item\n  WHERE id = ?", (item_id,), 0.001)
+        profile.record("SELECT count(*) FROM item", (), 0.001)
+        profile.record("SELECT count(*) FROM item", (), 0.001)
+        profile.record("SELECT 1", (), 0.001)
+
+        summary = profile.summary()
+
+        self.assertEqual(summary["queries"], 6)
+        self.assertEqual(summary["repeated"], [
+            {"statement": "SELECT * FROM item WHERE id = ?", "count": 3, "duplicates": 0, "ms": 3.0},
+            {"statement": "SELECT count(*) FROM item", "count": 2, "duplicates": 1, "ms": 2.0},
+        ])
+
+
+class QueryProfilerMiddlewareTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(self.engine.dispose)
+        profile_engine(self.engine)
+        profile_engine(self.engine)
+
+        self.app = FastAPI()
+
+        @self.app.get("/items")
+        def items() -> int:
+            with Session(self.engine) as session:
+                for _ in range(3):
+                    session.execute(text("SELECT 1"))
+            return 3
+
+    async def get(self, mode: str, **headers) -> httpx.Response:
+        transport = httpx.ASGITransport(app=QueryProfilerMiddleware(self.app, mode=mode))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/items", headers=headers)
+
+    async def test_profiled_on_request_header(self):
+        response = await self.get("header", **{"X-Query-Profile": "1"})
+
+        # registering the engine twice must not record every statement twice
+        self.assertEqual(json.loads(response.headers["x-query-profile"])["queries"], 3)
+        self.assertIn('db;dur=', response.headers["server-timing"])
+        self.assertIn('desc="3 queries"', response.headers["server-timing"])
+
+    async def test_not_profiled_without_the_header(self):
+        response = await self.get("header")
+
+        self.assertNotIn("x-query-profile", response.headers)
+        self.assertNotIn("server-timing", response.headers)
+
+    async def test_always_profiles_every_request(self):
+        response = await self.get("always")
+
+        self.assertEqual(json.loads(response.headers["x-query-profile"])["repeated"][0]["count"], 3)
@@ -0,0 +1,95 @@
+"""
+shop response cache: hits until the owner writes, misses filled from the primary, stats on /metrics
+"""
+import importlib
+from unittest import mock
+
+from sqlalchemy import update
+
+from src.core.cache import NullCache
+from src.core.database import engine, use_primary
+from src.core.metrics import registry
+from src.apps.shop.model.domain.shop_item import ShopItemDB
+from src.apps.shop.service.response_cache import response_cache
+
+from .support import ApiTestCase
+
+# src.route re-exports the router object under the module's name
+shop_router_module = importlib.import_module("src.route.shop_router")
+
+
+class ResponseCacheTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+        await self.client.post("/shop/", json={"name": "lamp", "description": "", "price": 10}, headers=self.headers)
+        self.shop_item_id = (await self.client.get("/shop/", headers=self.headers)).json()[0]["id"]
+
+    def change_price_behind_the_cache(self, price: int) -> None:
+        with engine.begin() as connection:
+            connection.execute(update(ShopItemDB).where(ShopItemDB.id == self.shop_item_id).values(price=price))
+
+    async def price(self) -> int:
+        return (await self.client.get(f"/shop/{self.shop_item_id}", headers=self.headers)).json()["price"]
+
+    async def test_hits_until_the_owner_writes(self):
+        self.assertEqual(await self.price(), 10)
+        self.change_price_behind_the_cache(99)
+        self.assertEqual(await self.price(), 10)
+
+        await self.client.patch(f"/shop/{self.shop_item_id}", json={"price": 20}, headers=self.headers)
+
+        self.assertEqual(await self.price(), 20)
+
+    async def test_another_owner_does_not_retire_the_entries(self):
+        self.assertEqual(await self.price(), 10)
+        self.change_price_behind_the_cache(99)
+
+        other = await self.sign_in("other@example.com")
+        await self.client.post("/shop/", json={"name": "desk", "description": "", "price": 1}, headers=other)
+
+        self.assertEqual(await self.price(), 10)
+
+    async def test_misses_read_from_the_primary(self):
+        with mock.patch.object(shop_router_module, "use_primary", mock.AsyncMock(wraps=use_primary)) as primary:
+            await self.price()
+            await self.price()
+            await self.client.get("/shop/", params={"order": "price"}, headers=self.headers)
+
+        # the item miss and the list miss, the repeated item read is a hit
+        self.assertEqual(primary.await_count, 2)
+
+    async def test_without_a_cache_reads_stay_on_the_replica(self):
+        with mock.patch.object(response_cache, "backend", NullCache(ttl=0)), \
+                mock.patch.object(shop_router_module, "use_primary", mock.AsyncMock(wraps=use_primary)) as primary:
+            await self.price()
+            await self.client.get("/shop/", headers=self.headers)
+
+        primary.assert_not_awaited()
+
+
+class CacheMetricsTest(ApiTestCase):
+
+    async def test_hits_misses_and_ratio_are_exported(self):
+        headers = await self.sign_in()
+        before = self.sample("cache_hits_total"), self.sample("cache_misses_total")
+
+        await self.client.get("/shop/", headers=headers)
+        await self.client.get("/shop/", headers=headers)
+
+        self.assertEqual((self.sample("cache_hits_total") - before[0], self.sample("cache_misses_total") - before[1]),
+                         (1, 1))
+        lookups = self.sample("cache_hits_total") + self.sample("cache_misses_total")
+        self.assertAlmostEqual(self.sample("cache_hit_ratio"), self.sample("cache_hits_total") / lookups, places=4)
+
+        exposition = (await self.client.get("/metrics")).text
+        for cache in ("token", "principal", "shop_response"):
+            self.assertIn(f'cache_entries{{cache="{cache}"}}', exposition)
+
+    async def test_cache_internals_are_not_served_by_health(self):
+        self.assertEqual((await self.client.get("/health/cache")).status_code, 404)
+
+    @staticmethod
+    def sample(name: str) -> float:
+        return registry.get_sample_value(name, {"cache": "shop_response"})
@@ -0,0 +1,68 @@
+"""
+scope bitmasks
+"""
+import unittest
+
+from src.apps.auth.constants import SupportScopes, UserPermission
+from src.apps.auth.scopes import ALL_SCOPES, SCOPE_BITS, UNKNOWN_SCOPE, has_scopes, mask_to_scopes, \
+    permission_scope_mask, required_mask, scopes_to_mask
+
+
+class ScopeMaskTest(unittest.TestCase):
+
+    def test_one_distinct_bit_per_scope_in_definition_order(self):
+        self.assertEqual(list(SCOPE_BITS), [scope.value for scope in SupportScopes])
+        self.assertEqual(list(SCOPE_BITS.values()), [1 << bit for bit in range(len(SupportScopes))])
+        self.assertEqual(ALL_SCOPES, (1 << len(SupportScopes)) - 1)
+
+    def test_stored_bits_do_not_move(self):
+        # masks are persisted in users.scope_mask, reordering SupportScopes would corrupt them
+        self.assertEqual(SCOPE_BITS[SupportScopes.SHOP_USER_READ], 1)
+        self.assertEqual(SCOPE_BITS[SupportScopes.SHOP_PRODUCT_READ], 1 << 8)
+        self.assertEqual(SCOPE_BITS[SupportScopes.SHOP_ORDER_UPDATE_ALL], 1 << 23)
+
+    def test_round_trip(self):
+        scopes = (SupportScopes.SHOP_USER_READ.value, SupportScopes.SHOP_ORDER_WRITE.value)
+
+        self.assertEqual(mask_to_scopes(scopes_to_mask(scopes)), scopes)
+        self.assertEqual(mask_to_scopes(scopes_to_mask(reversed(scopes))), scopes)
+        self.assertEqual(mask_to_scopes(0), ())
+
+    def test_unknown_granted_scopes_grant_nothing(self):
+        self.assertEqual(scopes_to_mask(["admin", "", SupportScopes.SHOP_USER_READ]), 1)
+
+    def test_required_scopes_must_all_be_granted(self):
+        granted = scopes_to_mask([SupportScopes.SHOP_USER_READ, SupportScopes.SHOP_PRODUCT_READ])
+
+        self.assertTrue(has_scopes(granted, required_mask((SupportScopes.SHOP_PRODUCT_READ,))))
+        self.assertTrue(has_scopes(granted, required_mask(())))
+        self.assertFalse(has_scopes(granted, required_mask(
+            (SupportScopes.SHOP_PRODUCT_READ, SupportScopes.SHOP_PRODUCT_WRITE)
+        )))
+
+    def test_unknown_required_scope_denies_everyone(self):
+        required = required_mask(("product:read:own", "no:such:scope"))
+
+        self.assertTrue(required & UNKNOWN_SCOPE)
+        self.assertFalse(has_scopes(ALL_SCOPES, required))
+
+
+class PermissionScopesTest(unittest.TestCase):
+
+    def test_admin_holds_every_scope(self):
+        self.assertEqual(permission_scope_mask(UserPermission.ADMIN), ALL_SCOPES)
+
+    def test_guest_can_only_read(self):
+        scopes = mask_to_scopes(permission_scope_mask(UserPermission.GUEST))
+
+        self.assertEqual(set(scopes), {SupportScopes.SHOP_USER_READ.value, SupportScopes.SHOP_PRODUCT_READ.value})
+
+    def test_normal_user_has_own_scopes_only(self):
+        scopes = mask_to_scopes(permission_scope_mask(UserPermission.NORMAL))
+
+        self.assertIn(SupportScopes.SHOP_PRODUCT_WRITE.value, scopes)
+        self.assertTrue(all(scope.endswith(":own") for scope in scopes))
+
+    def test_int_value_and_unknown_permission(self):
+        self.assertEqual(permission_scope_mask(1), permission_scope_mask(UserPermission.NORMAL))
+        self.assertEqual(permission_scope_mask(99), 0)
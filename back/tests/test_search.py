@@ -0,0 +1,147 @@
+"""
+shop item full text search and its incremental index
+"""
+from sqlalchemy import text
+
+from src.core.database import AsyncSessionLocal, engine
+from src.apps.shop.model.domain.shop_item import SEARCH_FTS_TABLE, SEARCH_KEY_TABLE
+from src.apps.shop.model.schema.shop_item import ShopItemCreateRequest, ShopItemUpdateRequest, \
+    ShopItemBulkUpdateRequest
+from src.apps.shop.service import search, shop
+
+from .support import ApiTestCase, DatabaseTestCase
+
+OWNER_ID = "owner"
+
+
+def item(name: str, description: str = "", price: int = 100) -> ShopItemCreateRequest:
+    return ShopItemCreateRequest(name=name, description=description, price=price)
+
+
+class SearchTest(DatabaseTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.db = AsyncSessionLocal()
+
+    async def asyncTearDown(self) -> None:
+        await self.db.close()
+        await super().asyncTearDown()
+
+    async def names(self, query: str, backend: str = None, **filters) -> list:
+        return [shop_item.name for shop_item in await search.search(
+            self.db, OWNER_ID, query, limit=20, backend=backend, **filters
+        )]
+
+    async def test_created_items_are_searchable_by_prefix(self):
+        await shop.create_one(self.db, item("wireless headphones", "over ear"), OWNER_ID)
+        await shop.create_one(self.db, item("wired keyboard"), OWNER_ID)
+
+        self.assertEqual(await self.names("wirel"), ["wireless headphones"])
+        self.assertEqual(sorted(await self.names("wire")), ["wired keyboard", "wireless headphones"])
+        self.assertEqual(await self.names("ear"), ["wireless headphones"])
+
+    async def test_every_term_has_to_match(self):
+        await shop.create_one(self.db, item("red shoes"), OWNER_ID)
+        await shop.create_one(self.db, item("red shirt"), OWNER_ID)
+
+        self.assertEqual(await self.names("red sho"), ["red shoes"])
+        self.assertEqual(await self.names("red zzz"), [])
+        self.assertEqual(await self.names("  ,. "), [])
+
+    async def test_name_matches_rank_above_description_matches(self):
+        await shop.create_one(self.db, item("lamp", "a vintage piece"), OWNER_ID)
+        await shop.create_one(self.db, item("vintage lamp"), OWNER_ID)
+
+        for backend in ("sqlite", "like"):
+            with self.subTest(backend=backend):
+                self.assertEqual(await self.names("vintage", backend=backend), ["vintage lamp", "lamp"])
+
+    async def test_update_replaces_the_indexed_text(self):
+        created = await shop.create_one(self.db, item("green mug"), OWNER_ID)
+
+        await shop.update_one(self.db, created.id, ShopItemUpdateRequest(name="blue mug"), OWNER_ID)
+
+        self.assertEqual(await self.names("green"), [])
+        self.assertEqual(await self.names("blue"), ["blue mug"])
+        self.assertEqual(await self.names("mug"), ["blue mug"])
+
+    async def test_bulk_writes_are_indexed(self):
+        ids, errors = await shop.create_many(
+            self.db, [item(f"bulk chair {i}") for i in range(5)], OWNER_ID, chunk_size=2
+        )
+        self.assertEqual(errors, {})
+
+        await shop.update_many(self.db, [
+            ShopItemBulkUpdateRequest(id=ids[0], name="bulk table"),
+        ], OWNER_ID, chunk_size=2)
+
+        self.assertEqual(len(await self.names("chair")), 4)
+        self.assertEqual(await self.names("table"), ["bulk table"])
+
+    async def test_filters_and_owner(self):
+        await shop.create_one(self.db, item("cheap pen", price=1), OWNER_ID)
+        await shop.create_one(self.db, item("gold pen", price=900), OWNER_ID)
+        old = await shop.create_one(self.db, item("old pen"), OWNER_ID)
+        await shop.update_one(self.db, old.id, ShopItemUpdateRequest(disabled=True), OWNER_ID)
+        await shop.create_one(self.db, item("other pen"), "someone else")
+
+        self.assertEqual(await self.names("pen", max_price=10), ["cheap pen"])
+        self.assertEqual(await self.names("pen", min_price=500), ["gold pen"])
+        self.assertEqual(await self.names("pen", disabled=True), ["old pen"])
+        self.assertEqual(len(await self.names("pen")), 3)
+
+    async def test_index_survives_vacuum(self):
+        await shop.create_many(self.db, [item(f"word{i:02d} item") for i in range(20)], OWNER_ID, chunk_size=20)
+        with engine.connect() as connection:
+            connection.execute(text("DELETE FROM shop_item WHERE id IN (SELECT id FROM shop_item ORDER BY id LIMIT 5)"))
+            connection.commit()
+            connection.execute(text("VACUUM"))
+
+        remaining = {shop_item.name for shop_item in await search.search(self.db, OWNER_ID, "item", limit=50)}
+
+        self.assertEqual(len(remaining), 15)
+        for name in remaining:
+            self.assertEqual(await self.names(name.split()[0]), [name])
+
+    async def test_index_updates_look_rows_up_by_key(self):
+        # an FTS5 scan per update would make every write O(catalog size)
+        with engine.connect() as connection:
+            plan = " ".join(row[-1] for row in connection.execute(text(
+                f"EXPLAIN QUERY PLAN DELETE FROM {SEARCH_FTS_TABLE} WHERE rowid IN "
+                f"(SELECT key FROM {SEARCH_KEY_TABLE} WHERE shop_item_id IN ('a', 'b'))"
+            )))
+
+        self.assertIn("INDEX 0:=", plan)
+
+    async def test_rebuild_index(self):
+        await shop.create_one(self.db, item("rebuilt item"), OWNER_ID)
+        with engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {SEARCH_FTS_TABLE}"))
+        self.assertEqual(await self.names("rebuilt"), [])
+
+        await search.rebuild_index(self.db)
+
+        self.assertEqual(await self.names("rebuilt"), ["rebuilt item"])
+
+
+class SearchRouteTest(ApiTestCase):
+
+    async def test_search_returns_the_owners_matches(self):
+        headers = await self.sign_in()
+        for name in ("desk lamp", "desk chair", "floor lamp"):
+            response = await self.client.post("/shop/", json={"name": name, "description": "", "price": 1},
+                                              headers=headers)
+            self.assertEqual(response.status_code, 201)
+
+        response = await self.client.get("/shop/search", params={"q": "desk la"}, headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.json()], ["desk lamp"])
+
+    async def test_query_is_required(self):
+        headers = await self.sign_in()
+
+        response = await self.client.get("/shop/search", params={"q": ""}, headers=headers)
+
+        self.assertEqual(response.status_code, 400)
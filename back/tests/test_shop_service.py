@@ -0,0 +1,116 @@
+"""
+shop service helpers: keyset cursors, ETag headers and fields= projection
+"""
+import base64
+import json
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.exceptions import HTTPException
+
+from src.apps.shop.constants import ShopItemOrder
+from src.apps.shop.service.shop import RESPONSE_FIELDS, decode_cursor, encode_cursor, etag, etag_versions, \
+    parse_fields
+
+
+def raw_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+
+class CursorTest(unittest.TestCase):
+
+    def test_created_at_round_trip(self):
+        created_at = datetime(2024, 5, 17, 12, 30, 45, 123456)
+        row = SimpleNamespace(id="a1", created_at=created_at)
+
+        cursor = encode_cursor(ShopItemOrder.CREATED_AT, row)
+
+        self.assertEqual(decode_cursor(ShopItemOrder.CREATED_AT, cursor), (created_at, "a1"))
+
+    def test_price_round_trip(self):
+        row = SimpleNamespace(id="b2", price=1500)
+
+        cursor = encode_cursor(ShopItemOrder.PRICE, row)
+
+        self.assertEqual(decode_cursor(ShopItemOrder.PRICE, cursor), (1500, "b2"))
+
+    def test_cursor_is_url_safe_without_padding(self):
+        # ids chosen so the base64 output would contain padding and + / characters
+        for shop_item_id in ("?", "??", "???>", "~~~"):
+            cursor = encode_cursor(ShopItemOrder.PRICE, SimpleNamespace(id=shop_item_id, price=1))
+
+            self.assertNotIn("=", cursor)
+            self.assertNotIn("+", cursor)
+            self.assertNotIn("/", cursor)
+            self.assertEqual(decode_cursor(ShopItemOrder.PRICE, cursor), (1, shop_item_id))
+
+    def test_cursor_of_another_order_is_rejected(self):
+        cursor = encode_cursor(ShopItemOrder.PRICE, SimpleNamespace(id="a1", price=10))
+
+        with self.assertRaises(HTTPException) as caught:
+            decode_cursor(ShopItemOrder.CREATED_AT, cursor)
+        self.assertEqual(caught.exception.status_code, 400)
+
+    def test_malformed_cursors_are_rejected(self):
+        cursors = (
+            "not base64 !",
+            base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+            raw_cursor("price", 10),
+            raw_cursor("price", "10", "a1"),
+            raw_cursor("price", 1.5, "a1"),
+            raw_cursor("created_at", "yesterday", "a1"),
+            base64.urlsafe_b64encode(b'{"price": 1}').decode(),
+        )
+
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(HTTPException) as caught:
+                order = ShopItemOrder.CREATED_AT if "created_at" in cursor else ShopItemOrder.PRICE
+                decode_cursor(order, cursor)
+            self.assertEqual(caught.exception.status_code, 400)
+
+
+class EtagTest(unittest.TestCase):
+
+    def test_etag_is_the_quoted_version(self):
+        self.assertEqual(etag(SimpleNamespace(version=7)), '"7"')
+
+    def test_lists_every_strong_tag(self):
+        self.assertEqual(etag_versions('"1", "2",  "30"'), {1, 2, 30})
+
+    def test_star_matches_any_version(self):
+        self.assertIsNone(etag_versions("*"))
+        self.assertIsNone(etag_versions('"1", *'))
+
+    def test_weak_tags_only_count_for_weak_comparison(self):
+        self.assertEqual(etag_versions('W/"3", "4"'), {4})
+        self.assertEqual(etag_versions('W/"3", "4"', weak=True), {3, 4})
+
+    def test_tags_that_are_not_versions_are_ignored(self):
+        self.assertEqual(etag_versions('"abc", 5, "", "-1", "2'), set())
+
+    def test_if_match_of_the_current_etag_matches(self):
+        shop_item = SimpleNamespace(version=12)
+
+        self.assertLessEqual(etag_versions(etag(shop_item)), etag_versions(f'"11", {etag(shop_item)}'))
+
+
+class ParseFieldsTest(unittest.TestCase):
+
+    def test_no_fields_returns_every_response_field(self):
+        self.assertEqual(parse_fields(None), RESPONSE_FIELDS)
+        self.assertEqual(parse_fields(""), RESPONSE_FIELDS)
+
+    def test_id_is_always_included_in_response_order(self):
+        fields = parse_fields("price, name")
+
+        self.assertEqual(fields, tuple(field for field in RESPONSE_FIELDS if field in {"id", "name", "price"}))
+
+    def test_blank_and_repeated_entries_are_ignored(self):
+        self.assertEqual(parse_fields("name,,name, "), parse_fields("name"))
+
+    def test_unknown_field_is_rejected(self):
+        for fields in ("name,owner", "hashed_password", "NAME"):
+            with self.subTest(fields=fields), self.assertRaises(HTTPException) as caught:
+                parse_fields(fields)
+            self.assertEqual(caught.exception.status_code, 400)
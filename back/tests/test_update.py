@@ -0,0 +1,110 @@
+"""
+PATCH /shop/{id}: one UPDATE ... RETURNING, 404 / 409 / 412 on a miss, no write without fields
+"""
+from fastapi.exceptions import HTTPException
+
+from src.core.database import AsyncSessionLocal
+from src.apps.shop.model.schema.shop_item import ShopItemUpdateRequest
+from src.apps.shop.service import shop
+
+from .support import ApiTestCase
+
+MISSING_ID = "4f0e5a5e-0000-4000-8000-000000000000"
+
+
+class UpdateOneTest(ApiTestCase):
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.headers = await self.sign_in()
+        response = await self.client.post("/shop/", json={"name": "lamp", "description": "", "price": 10},
+                                          headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        listed = await self.client.get("/shop/", headers=self.headers)
+        self.shop_item_id = listed.json()[0]["id"]
+
+    async def patch(self, json: dict, shop_item_id: str = None, **headers):
+        return await self.client.patch(f"/shop/{shop_item_id or self.shop_item_id}", json=json,
+                                       headers={**self.headers, **headers})
+
+    async def test_returns_the_updated_item_and_its_etag(self):
+        response = await self.patch({"price": 20})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["price"], response.json()["name"]), (20, "lamp"))
+        self.assertEqual(response.headers["etag"], '"2"')
+
+        current = await self.client.get(f"/shop/{self.shop_item_id}", headers=self.headers)
+        self.assertEqual((current.json()["price"], current.headers["etag"]), (20, '"2"'))
+
+    async def test_missing_item(self):
+        for shop_item_id in (MISSING_ID, "not-an-id"):
+            with self.subTest(shop_item_id=shop_item_id):
+                response = await self.patch({"price": 20}, shop_item_id=shop_item_id)
+
+                self.assertEqual(response.status_code, 404)
+
+    async def test_item_of_another_owner_is_missing(self):
+        self.headers = await self.sign_in("other@example.com")
+
+        response = await self.patch({"price": 20})
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_disabled_item(self):
+        await self.patch({"disabled": True})
+
+        response = await self.patch({"price": 20})
+
+        self.assertEqual(response.status_code, 409)
+
+    async def test_if_match(self):
+        self.assertEqual((await self.patch({"price": 20}, **{"If-Match": '"1"'})).status_code, 200)
+        self.assertEqual((await self.patch({"price": 30}, **{"If-Match": '"1"'})).status_code, 412)
+        self.assertEqual((await self.patch({"price": 30}, **{"If-Match": '"1", "2"'})).status_code, 200)
+        self.assertEqual((await self.patch({"price": 40}, **{"If-Match": "*"})).status_code, 200)
+
+        current = await self.client.get(f"/shop/{self.shop_item_id}", headers=self.headers)
+        self.assertEqual((current.json()["price"], current.headers["etag"]), (40, '"4"'))
+
+    async def test_missing_and_disabled_win_over_if_match(self):
+        self.assertEqual((await self.patch({"price": 1}, shop_item_id=MISSING_ID, **{"If-Match": '"9"'})).status_code,
+                         404)
+        await self.patch({"disabled": True})
+        self.assertEqual((await self.patch({"price": 1}, **{"If-Match": '"9"'})).status_code, 409)
+
+    async def test_empty_patch_keeps_the_version(self):
+        response = await self.patch({})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], '"1"')
+        self.assertEqual(response.json()["price"], 10)
+
+        response = await self.patch({"price": None}, **{"If-Match": '"1"'})
+        self.assertEqual(response.headers["etag"], '"1"')
+
+    async def test_empty_patch_is_still_checked(self):
+        self.assertEqual((await self.patch({}, shop_item_id=MISSING_ID)).status_code, 404)
+        self.assertEqual((await self.patch({}, **{"If-Match": '"7"'})).status_code, 412)
+
+        await self.patch({"disabled": True})
+        self.assertEqual((await self.patch({})).status_code, 409)
+
+    async def test_bulk_row_without_fields_keeps_the_version(self):
+        response = await self.client.patch("/shop/bulk", json=[{"id": self.shop_item_id}], headers=self.headers)
+
+        self.assertEqual(response.json(), {"ids": [self.shop_item_id], "errors": []})
+        current = await self.client.get(f"/shop/{self.shop_item_id}", headers=self.headers)
+        self.assertEqual(current.headers["etag"], '"1"')
+
+    async def test_disabling_moves_the_item_to_the_disabled_count(self):
+        await self.patch({"disabled": True})
+
+        async with AsyncSessionLocal() as db:
+            self.assertEqual(await shop.counter.get(db, self.user_id), (1, 1))
+
+            # update_one only matches enabled rows, so a disabled item is never counted twice
+            with self.assertRaises(HTTPException) as caught:
+                await shop.update_one(db, self.shop_item_id, ShopItemUpdateRequest(disabled=True), self.user_id)
+            self.assertEqual(caught.exception.status_code, 409)
+            self.assertEqual(await shop.counter.get(db, self.user_id), (1, 1))